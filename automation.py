@@ -1,31 +1,224 @@
 """Button clicking automation for Umamusume."""
 
 import time
-import pyautogui
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
 from pathlib import Path
-from image_utils import ImageMatcher
+from image_utils import ImageMatcher, signature_distance
+from frame_source import FrameSource
+from input_backend import InputBackend, create_input_backend
+from signature_index import SignatureIndex, perceptual_hash
 
 
 class ButtonClicker:
     """Handles clicking buttons on screen."""
 
-    def __init__(self, templates_dir: str = "templates", confidence: float = 0.8, action_delay: float = 1.0):
+    # Mean gray level difference of frame signatures that counts as a screen change
+    CHANGE_THRESHOLD = 4.0
+    # Seconds between captures while waiting for a screen change
+    CHANGE_POLL_INTERVAL = 0.05
+    # Pixels around a clicked button watched for its own reaction
+    WATCH_PADDING = 10
+    # Seconds between full-frame checks for stop templates without a known region
+    BURST_FULL_CHECK_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        templates_dir: str = "templates",
+        confidence: float = 0.8,
+        action_delay: float = 1.0,
+        template_settings: Optional[Dict[str, Dict[str, Any]]] = None,
+        frame_source: Optional[FrameSource] = None,
+        methods: Optional[Sequence[str]] = None,
+        capture_rois: bool = False,
+        roi_padding: int = 40,
+        roi_full_scan_interval: float = 30.0,
+        use_opencl: bool = False,
+        input_backend: Optional[InputBackend] = None,
+        verify_clicks: bool = False,
+        click_timeout: float = 3.0,
+        click_retries: int = 1,
+        click_backoff: float = 2.0,
+        signature_index: Optional[SignatureIndex] = None
+    ):
         """
         Initialize the button clicker.
 
         Args:
             templates_dir: Directory containing template images
             confidence: Confidence threshold for image matching
-            action_delay: Delay after each click
+            action_delay: Delay after each click (without verify_clicks)
+            template_settings: Per-template overrides (thresholds, masks, requirements)
+            frame_source: Capture backend (default: picked automatically)
+            methods: Default matching methods (default: all; without 'color' only grayscale is captured)
+            capture_rois: Capture only each template's region of interest (configured or learned)
+            roi_padding: Pixels of slack around learned regions of interest
+            roi_full_scan_interval: Seconds between full-frame re-checks of learned regions
+            use_opencl: Match through OpenCL (cv2.UMat) when a device is available
+            input_backend: Click backend (default: picked automatically)
+            verify_clicks: After a click, wait until the screen changes instead of sleeping action_delay
+            click_timeout: Maximum seconds to wait for the screen to change after a click
+            click_retries: Extra clicks when the screen does not react (with verify_clicks)
+            click_backoff: Factor the wait grows by on every extra click
+            signature_index: Optional SignatureIndex; buttons cached for a recognized screen
+                are clicked without template matching
         """
         self.templates_dir = Path(templates_dir)
-        self.matcher = ImageMatcher(confidence)
+        self.matcher = ImageMatcher(
+            confidence, template_settings, frame_source, methods,
+            capture_rois, roi_padding, roi_full_scan_interval, use_opencl
+        )
         self.action_delay = action_delay
+        self.input = input_backend or create_input_backend()
+        self.verify_clicks = verify_clicks
+        self.click_timeout = click_timeout
+        self.click_retries = click_retries
+        self.click_backoff = click_backoff
+        self.signature_index = signature_index
+
+        # Extra attempts (button not found, or no reaction) since start, for run statistics
+        self.retries = 0
+        # Time-to-react per clicked button (seconds) and clicks that got no reaction
+        self.reaction_times: Dict[str, List[float]] = {}
+        self.unanswered_clicks: Dict[str, int] = {}
+
+    def _signatures(
+        self,
+        region: Optional[Tuple[int, int, int, int]],
+        watch: Optional[Tuple[int, int, int, int]]
+    ) -> List[Tuple[Optional[Tuple[int, int, int, int]], np.ndarray]]:
+        """Signatures of the whole frame and (if given) the watched area, from the current frame."""
+        areas = [None] + ([watch] if watch else [])
+        return [(area, self.matcher.frame_signature(region, area)) for area in areas]
+
+    def wait_for_change(
+        self,
+        before: List[Tuple[Optional[Tuple[int, int, int, int]], np.ndarray]],
+        region: Optional[Tuple[int, int, int, int]] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Wait until any watched area differs from its signature.
+
+        Args:
+            before: (sub_region, signature) pairs taken before the click
+            region: Capture region the signatures were taken from
+            timeout: Maximum seconds to wait (default: click_timeout)
+
+        Returns:
+            Seconds until the change was seen, or None on timeout
+        """
+        start = time.monotonic()
+        deadline = start + (self.click_timeout if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            time.sleep(self.CHANGE_POLL_INTERVAL)
+            self.matcher.clear_cache()
+            for area, signature in before:
+                if signature_distance(signature, self.matcher.frame_signature(region, area)) >= self.CHANGE_THRESHOLD:
+                    return time.monotonic() - start
+        return None
+
+    def click_and_verify(
+        self,
+        x: int,
+        y: int,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        watch: Optional[Tuple[int, int, int, int]] = None,
+        label: str = "position"
+    ) -> bool:
+        """
+        Click and wait until the UI reacts, clicking again if it does not.
+
+        The whole frame and the clicked area are watched: a button that
+        only changes its own look (pressed state, toggles) counts as a
+        reaction too. Each retry waits click_backoff times longer.
 
-        # Set PyAutoGUI settings
-        pyautogui.FAILSAFE = True  # Move mouse to top-left corner to abort
-        pyautogui.PAUSE = 0.1
+        Without verify_clicks this is a plain click followed by action_delay.
+
+        Args:
+            x: X coordinate
+            y: Y coordinate
+            region: Capture region (the same one the button was found in)
+            watch: Optional (x, y, w, h) inside the frame around the clicked button
+            label: Name the reaction time is recorded under
+
+        Returns:
+            True if the screen reacted (always True without verify_clicks)
+        """
+        if not self.verify_clicks:
+            self.input.click(x, y)
+            time.sleep(self.action_delay)
+            return True
+
+        before = self._signatures(region, watch)
+        timeout = self.click_timeout
+        for attempt in range(self.click_retries + 1):
+            self.input.click(x, y)
+            reaction = self.wait_for_change(before, region, timeout)
+            if reaction is not None:
+                self.reaction_times.setdefault(label, []).append(reaction)
+                return True
+            if attempt < self.click_retries:
+                print(f"  No reaction after {timeout:.1f}s, clicking again ({attempt + 1}/{self.click_retries})")
+                self.retries += 1
+                timeout *= self.click_backoff
+
+        print(f"  ⚠️  Screen did not react to clicking {label}")
+        self.unanswered_clicks[label] = self.unanswered_clicks.get(label, 0) + 1
+        return False
+
+    def reaction_summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize recorded time-to-react per clicked button.
+
+        Returns:
+            Dict of label -> {count, median, max, missed} (times in seconds)
+        """
+        summary = {}
+        for label in sorted(set(self.reaction_times) | set(self.unanswered_clicks)):
+            times = self.reaction_times.get(label, [])
+            summary[label] = {
+                'count': len(times),
+                'median': float(np.median(times)) if times else 0.0,
+                'max': max(times, default=0.0),
+                'missed': self.unanswered_clicks.get(label, 0),
+            }
+        return summary
+
+    def _find_button(
+        self,
+        template_name: str,
+        region: Optional[Tuple[int, int, int, int]] = None
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Locate a button on the current frame, using the signature index when possible.
+
+        Buttons found by matching on a recognized screen are added to its entry.
+
+        Args:
+            template_name: Name of the template image file
+            region: Optional region to search
+
+        Returns:
+            (x, y, width, height) in screen coordinates, or None if not found
+        """
+        template_path = str(self.templates_dir / template_name)
+        if self.signature_index is None:
+            return self.matcher.find_on_screen(template_path, region)
+
+        origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+        frame_hash = perceptual_hash(self.matcher.get_frame_views(region)['grayscale'])
+        entry = self.signature_index.lookup(frame_hash)
+        if entry is not None and template_name in entry['buttons']:
+            x, y, w, h = entry['buttons'][template_name]
+            return (x + origin_x, y + origin_y, w, h)
+
+        location = self.matcher.find_on_screen(template_path, region)
+        if location and entry is not None:
+            x, y, w, h = location
+            box = [x - origin_x, y - origin_y, w, h]
+            self.signature_index.add(frame_hash, entry['screen'], {template_name: box})
+        return location
 
     def click_button_with_retry(
         self,
@@ -39,12 +232,14 @@ class ButtonClicker:
 
         Args:
             template_name: Name of the template image file
-            max_retries: Maximum number of retry attempts
+            max_retries: Maximum number of attempts to find the button
             retry_delay: Delay between retries in seconds
             region: Optional region to search
 
         Returns:
-            True if button was found and clicked, False otherwise
+            True if button was found and clicked (and, with verify_clicks, the
+            screen reacted), False otherwise. A found button is clicked at most
+            once here (click_and_verify does its own re-clicks).
         """
         template_path = str(self.templates_dir / template_name)
 
@@ -52,30 +247,126 @@ class ButtonClicker:
             # Clear cache for fresh screenshot
             self.matcher.clear_cache()
 
-            # Find the button
-            center = self.matcher.find_center(template_path, region)
+            # Find the button (by the cached position if this exact screen is known)
+            location = self._find_button(template_name, region)
 
-            if center:
-                x, y = center
+            if location:
+                bx, by, bw, bh = location
+                x, y = bx + bw // 2, by + bh // 2
                 print(f"  Clicking {template_name} at ({x}, {y})")
-                pyautogui.click(x, y)
-                time.sleep(self.action_delay)
-                return True
+
+                # Watch the button itself (in frame coordinates) as well as the whole frame
+                origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+                pad = self.WATCH_PADDING
+                watch = (bx - origin_x - pad, by - origin_y - pad, bw + 2 * pad, bh + 2 * pad)
+                if self.click_and_verify(x, y, region, watch, template_name):
+                    return True
+                # click_and_verify already re-clicked; the game may have taken a click we
+                # could not see, so clicking the same button again risks a double click
+                print(f"  ✗ {template_name} was clicked but the screen never reacted")
+                return False
 
             if attempt < max_retries - 1:
                 print(f"  Button not found, retrying... ({attempt + 1}/{max_retries})")
+                self.retries += 1
                 time.sleep(retry_delay)
 
         print(f"  ✗ Failed to find {template_name} after {max_retries} attempts")
         return False
 
-    def click_at_position(self, x: int, y: int):
+    def burst_click(
+        self,
+        template_name: str,
+        stop_templates: Sequence[str],
+        region: Optional[Tuple[int, int, int, int]] = None,
+        interval: float = 0.1,
+        repress_after: float = 0.5,
+        idle_timeout: float = 10.0,
+        max_duration: float = 300.0,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Tuple[int, Optional[str]]:
+        """
+        Keep clicking a button the moment it (re)appears until a stop template shows up.
+
+        Only the area around the button is matched each tick (and, with
+        capture_rois, only that area is captured). Stop templates are
+        checked in their configured or learned region every tick; without
+        one they are checked against the whole frame every
+        BURST_FULL_CHECK_INTERVAL seconds.
+
+        Args:
+            template_name: Button to keep pressing (e.g. fast_forward.png)
+            stop_templates: Templates that end the burst (e.g. the race result's buttons)
+            region: Optional region to search
+            interval: Seconds between ticks
+            repress_after: Click again if the button is still visible this long after a click
+            idle_timeout: Give up after the button has not been seen for this long
+            max_duration: Give up after this long regardless
+            should_stop: Optional callback; the burst ends when it returns True
+
+        Returns:
+            (presses, name of the stop template that was seen or None if the burst ended otherwise)
+        """
+        template_path = str(self.templates_dir / template_name)
+        self.matcher.clear_cache()
+        location = self.matcher.find_on_screen(template_path, region)
+        if not location:
+            return 0, None
+
+        origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+        pad = self.matcher.roi_padding
+        bx, by, bw, bh = location
+        area = (bx - origin_x - pad, by - origin_y - pad, bw + 2 * pad, bh + 2 * pad)
+
+        start = last_seen = time.monotonic()
+        last_full_check = 0.0
+        last_click = None
+        presses = 0
+        while True:
+            tick = time.monotonic()
+            if should_stop and should_stop():
+                return presses, None
+            if tick - start >= max_duration or tick - last_seen >= idle_timeout:
+                print(f"  Burst on {template_name} ended after {presses} presses (button gone)")
+                return presses, None
+
+            self.matcher.clear_cache()
+            full_check = tick - last_full_check >= self.BURST_FULL_CHECK_INTERVAL
+            for stop_template in stop_templates:
+                stop_path = str(self.templates_dir / stop_template)
+                if not full_check and self.matcher.get_roi(stop_path) is None:
+                    continue
+                if self.matcher.find_on_screen(stop_path, region):
+                    print(f"  Burst on {template_name}: {presses} presses until {stop_template}")
+                    return presses, stop_template
+            if full_check:
+                last_full_check = tick
+
+            match = self.matcher.find_in_area(template_path, region, area)
+            if match:
+                last_seen = tick
+                if last_click is None or tick - last_click >= repress_after:
+                    x, y, w, h = match
+                    self.input.click(x + w // 2, y + h // 2)
+                    last_click = tick
+                    presses += 1
+            else:
+                # Pressed: click again as soon as it comes back
+                last_click = None
+
+            time.sleep(max(0.0, tick + interval - time.monotonic()))
+
+    def click_at_position(self, x: int, y: int, region: Optional[Tuple[int, int, int, int]] = None) -> bool:
         """
         Click at a specific screen position.
 
         Args:
             x: X coordinate
             y: Y coordinate
+            region: Region watched for the screen change (with verify_clicks)
+
+        Returns:
+            True if the screen reacted (always True without verify_clicks)
         """
-        pyautogui.click(x, y)
-        time.sleep(self.action_delay)
+        self.matcher.clear_cache()
+        return self.click_and_verify(x, y, region)
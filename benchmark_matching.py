@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Benchmark matching engines against the plain NumPy path on saved screenshots."""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+
+from debug_detection import collect_frames
+from image_utils import ImageMatcher, opencl_available
+from screen_detector import merge_template_settings
+
+
+def plain_matcher(config: Dict[str, Any], template_paths: List[Path]) -> Optional[ImageMatcher]:
+    """The default engine: cv2.matchTemplate on NumPy arrays."""
+    return ImageMatcher(
+        config.get('confidence_threshold', 0.8),
+        merge_template_settings(config.get('template_settings')),
+        methods=config.get('matching_methods')
+    )
+
+
+def opencl_matcher(config: Dict[str, Any], template_paths: List[Path]) -> Optional[ImageMatcher]:
+    """cv2.matchTemplate on cv2.UMat through OpenCL (None without a device)."""
+    if not opencl_available():
+        return None
+    return ImageMatcher(
+        config.get('confidence_threshold', 0.8),
+        merge_template_settings(config.get('template_settings')),
+        methods=config.get('matching_methods'),
+        use_opencl=True
+    )
+
+
+def fft_matcher(config: Dict[str, Any], template_paths: List[Path]) -> Optional[ImageMatcher]:
+    """Every template through the FFT engine (frame spectra shared across templates)."""
+    settings = merge_template_settings(config.get('template_settings'))
+    for path in template_paths:
+        settings[path.name] = {**settings.get(path.name, {}), 'engine': 'fft'}
+    return ImageMatcher(
+        config.get('confidence_threshold', 0.8),
+        settings,
+        methods=config.get('matching_methods')
+    )
+
+
+def orb_matcher(config: Dict[str, Any], template_paths: List[Path]) -> Optional[ImageMatcher]:
+    """Every template through ORB keypoints (one feature extraction per frame)."""
+    settings = merge_template_settings(config.get('template_settings'))
+    for path in template_paths:
+        settings[path.name] = {**settings.get(path.name, {}), 'engine': 'orb'}
+    return ImageMatcher(
+        config.get('confidence_threshold', 0.8),
+        settings,
+        methods=config.get('matching_methods')
+    )
+
+
+# Engine name -> factory(config, template paths) returning a matcher (or None if unavailable here)
+ENGINES: Dict[str, Callable[[Dict[str, Any], List[Path]], Optional[ImageMatcher]]] = {
+    'plain': plain_matcher,
+    'opencl': opencl_matcher,
+    'fft': fft_matcher,
+    'orb': orb_matcher,
+}
+
+# Engines that compute the plain engine's TM_CCOEFF_NORMED scores (others only compare locations:
+# orb correlates the area its keypoints point at, on the same scale but not the same value)
+CORRELATION_ENGINES = ('plain', 'opencl', 'fft')
+
+
+def run_engine(
+    matcher: ImageMatcher,
+    template_paths: List[Path],
+    frames: List[np.ndarray],
+    repeats: int
+) -> Dict[str, Any]:
+    """
+    Time one engine and record its best score and location per template and frame.
+
+    Args:
+        matcher: Matcher to benchmark
+        template_paths: Template bank
+        frames: BGR frames
+        repeats: Timing repeats (median per frame is reported)
+
+    Returns:
+        Dict with 'ms' (median per frame), 'scores' (T, F) and 'locs' (T, F, 2); NaN/-1 where a template does not fit
+    """
+    templates = [matcher.load_template(str(path)) for path in template_paths]
+    scores = np.full((len(templates), len(frames)), np.nan, dtype=np.float32)
+    locs = np.full((len(templates), len(frames), 2), -1, dtype=np.int32)
+    timings = []
+
+    for repeat in range(repeats):
+        for j, frame in enumerate(frames):
+            start = time.perf_counter()
+            matcher.set_frame(frame)
+            views = matcher.get_frame_views()
+            results = [matcher.score_views(views, template) for template in templates]
+            timings.append(time.perf_counter() - start)
+
+            if repeat == 0:
+                for i, methods_results in enumerate(results):
+                    if methods_results:
+                        _, score, loc = max(methods_results, key=lambda result: result[1])
+                        scores[i, j] = score
+                        locs[i, j] = loc[:2]  # ORB also reports the box size
+
+    matcher.set_frame(None)
+    return {'ms': float(np.median(timings)) * 1000, 'scores': scores, 'locs': locs}
+
+
+def compare(
+    baseline: Dict[str, Any],
+    other: Dict[str, Any],
+    present: float,
+    tolerance: int = 2
+) -> Tuple[float, float]:
+    """
+    Compare an engine's results with the baseline.
+
+    Args:
+        baseline: run_engine result of the reference engine
+        other: run_engine result to compare
+        present: Baseline score from which a template counts as visible in a frame
+        tolerance: Pixels two locations may differ by
+
+    Returns:
+        (largest absolute score difference, fraction of visible templates found at the same place)
+    """
+    valid = ~np.isnan(baseline['scores']) & ~np.isnan(other['scores'])
+    if not valid.any():
+        return 0.0, 1.0
+    diff = float(np.abs(baseline['scores'][valid] - other['scores'][valid]).max())
+
+    visible = valid & (np.nan_to_num(baseline['scores'], nan=-1.0) >= present)
+    if not visible.any():
+        return diff, 1.0
+    distance = np.abs(baseline['locs'] - other['locs']).max(axis=2)[visible]
+    return diff, float((distance <= tolerance).mean())
+
+
+def main():
+    """Benchmark matching engines on saved screenshots."""
+    parser = argparse.ArgumentParser(description="Benchmark template matching engines")
+    parser.add_argument("frames", nargs="?", default="examples",
+                        help="Screenshot directory, image or video (default: examples)")
+    parser.add_argument("--config", default="config.yaml", help="Path to configuration file")
+    parser.add_argument("--templates", default="templates", help="Templates directory")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help=f"Comma-separated engines to run (default: {','.join(ENGINES)})")
+    parser.add_argument("--repeats", type=int, default=3, help="Timing repeats per frame")
+    args = parser.parse_args()
+
+    config = {}
+    if Path(args.config).exists():
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+
+    frames = []
+    for _, frame in collect_frames(Path(args.frames)):
+        if isinstance(frame, str):
+            frame = cv2.imread(frame, cv2.IMREAD_COLOR)
+        if frame is not None:
+            frames.append(frame)
+    template_paths = sorted(Path(args.templates).glob("*.png"))
+    if not frames or not template_paths:
+        print("✗ Need at least one frame and one template")
+        return
+
+    print("=" * 70)
+    print("MATCHING BENCHMARK")
+    print("=" * 70)
+    print(f"Frames: {len(frames)}   Templates: {len(template_paths)}   Repeats: {args.repeats}")
+    print()
+
+    baseline = None
+    print(f"{'engine':10s} {'ms/frame':>9s} {'speedup':>8s} {'max |Δscore|':>13s} {'same loc':>9s}")
+    for name in args.engines.split(","):
+        name = name.strip()
+        if name not in ENGINES:
+            print(f"{name:10s} unknown engine (available: {', '.join(ENGINES)})")
+            continue
+        matcher = ENGINES[name](config, template_paths)
+        if matcher is None:
+            print(f"{name:10s} skipped (not available on this machine)")
+            continue
+
+        result = run_engine(matcher, template_paths, frames, args.repeats)
+        if baseline is None:
+            baseline = result
+        diff, same_loc = compare(baseline, result, config.get('confidence_threshold', 0.8))
+        diff_text = f"{diff:13.4f}" if name in CORRELATION_ENGINES else f"{'n/a':>13s}"
+        print(f"{name:10s} {result['ms']:9.2f} {baseline['ms'] / result['ms']:7.2f}x "
+              f"{diff_text} {same_loc * 100:8.1f}%")
+
+    print()
+    print("Scores and locations are compared with the first engine listed; 'same loc' counts")
+    print("templates the first engine finds (score >= confidence_threshold).")
+
+
+if __name__ == "__main__":
+    main()
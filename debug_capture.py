@@ -0,0 +1,135 @@
+"""Debug screenshots off the hot path: background writer with an in-memory ring buffer."""
+
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# File extension -> cv2.imwrite quality flag
+QUALITY_FLAGS = {
+    'jpg': cv2.IMWRITE_JPEG_QUALITY,
+    'webp': cv2.IMWRITE_WEBP_QUALITY,
+    'png': None,
+}
+
+
+class DebugRecorder:
+    """
+    Keep debug screenshots without stalling the automation loop.
+
+    record() only downscales the frame it is given (the one detection
+    already captured) and hands it on; encoding and disk writes happen on
+    a background thread. The write queue is bounded: if the disk cannot
+    keep up, frames are dropped rather than blocking the loop.
+
+    With ring_seconds > 0 frames are only kept in memory for that long and
+    written when flush() is called (after a failure), so a long healthy
+    run leaves nothing on disk. With ring_seconds = 0 every frame is written.
+    """
+
+    def __init__(
+        self,
+        directory: Path = Path("debug_screenshots"),
+        scale: float = 0.5,
+        image_format: str = "jpg",
+        quality: int = 80,
+        ring_seconds: float = 30.0,
+        queue_size: int = 16
+    ):
+        """
+        Args:
+            directory: Where screenshots are written
+            scale: Downscale factor applied before storing (1.0 = full size)
+            image_format: 'jpg', 'webp' or 'png'
+            quality: JPEG/WebP quality (0-100)
+            ring_seconds: Seconds of frames kept in memory until a failure (0 = write every frame)
+            queue_size: Frames that may wait for the writer before new ones are dropped
+        """
+        if image_format not in QUALITY_FLAGS:
+            raise ValueError(f"Unknown debug image format: {image_format} (use {', '.join(QUALITY_FLAGS)})")
+        self.directory = Path(directory)
+        self.scale = scale
+        self.image_format = image_format
+        self.params = [QUALITY_FLAGS[image_format], quality] if QUALITY_FLAGS[image_format] else []
+        self.ring_seconds = ring_seconds
+        self.dropped = 0
+
+        self._ring = deque()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._write_frames, daemon=True)
+        self._writer.start()
+
+    def record(self, frame: np.ndarray, label: str):
+        """
+        Keep a frame (the caller may reuse its buffer right after this returns).
+
+        Args:
+            frame: BGR frame
+            label: Short name used in the file name (e.g. the screen being handled)
+        """
+        now = time.time()
+        if self.scale != 1.0:
+            # The resize doubles as the copy out of the capture buffers
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+
+        if self.ring_seconds <= 0:
+            self._enqueue((self.directory, now, label, frame), block=False)
+            return
+
+        self._ring.append((now, label, frame))
+        while self._ring and self._ring[0][0] < now - self.ring_seconds:
+            self._ring.popleft()
+
+    def flush(self, reason: str):
+        """
+        Write the ring buffer's frames into their own folder.
+
+        Args:
+            reason: Short description used in the folder name (e.g. the screen that failed)
+        """
+        if not self._ring:
+            return
+        folder = self.directory / f"failure_{time.strftime('%Y%m%d_%H%M%S')}_{reason}"
+        print(f"  Saving last {len(self._ring)} debug frames to {folder}/")
+        while self._ring:
+            timestamp, label, frame = self._ring.popleft()
+            # Not on the hot path any more - wait for room instead of dropping
+            self._enqueue((folder, timestamp, label, frame), block=True)
+
+    def _enqueue(self, item, block: bool):
+        try:
+            self._queue.put(item, block=block)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_frames(self):
+        """Writer thread: encode and save queued frames."""
+        sequence = 0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            folder, timestamp, label, frame = item
+            try:
+                folder.mkdir(parents=True, exist_ok=True)
+                stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(timestamp))
+                millis = int(timestamp * 1000) % 1000
+                sequence += 1
+                filename = folder / f"debug_{label}_{stamp}_{millis:03d}_{sequence:05d}.{self.image_format}"
+                cv2.imwrite(str(filename), frame, self.params)
+            except Exception as e:
+                print(f"Error saving debug screenshot: {e}")
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Write what is still queued and stop the writer thread."""
+        self._queue.put(None)
+        self._writer.join(timeout)
+        if self.dropped:
+            print(f"Debug capture dropped {self.dropped} frames (disk too slow)")
@@ -1,23 +1,322 @@
 #!/usr/bin/env python3
 """Debug tool to see what templates are matching and where."""
 
+import argparse
+import base64
+import html
+import json
+import os
+import time
 import yaml
 import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from screen_detector import ScreenDetector, GameScreen
-from image_utils import ImageMatcher, take_screenshot
+from image_utils import build_frame_views, take_screenshot
 import cv2
 import numpy as np
 
-def main():
-    """Debug screen detection."""
+# Match box colors for visualizations (BGR)
+COLORS = [
+    (0, 255, 0),    # Green
+    (255, 0, 0),    # Blue
+    (0, 0, 255),    # Red
+    (255, 255, 0),  # Cyan
+    (255, 0, 255),  # Magenta
+    (0, 255, 255),  # Yellow
+]
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.webm', '.mov')
+
+# Per-process detector for batch mode (templates are loaded once per worker)
+_worker_detector = None
+_worker_templates = []
+
+
+def draw_matches(screenshot_cv: np.ndarray, matches: List[Dict[str, Any]]) -> np.ndarray:
+    """Draw numbered match boxes onto a copy of the screenshot."""
+    vis = screenshot_cv.copy()
+
+    for i, match in enumerate(matches):
+        x, y = match['location']
+        w, h = match['size']
+        color = COLORS[i % len(COLORS)]
+
+        # Draw rectangle
+        cv2.rectangle(vis, (x, y), (x + w, y + h), color, 3)
+
+        # Add label
+        label = f"{i+1}. {match['name'][:20]}"
+        cv2.putText(vis, label, (x, y - 10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+    return vis
+
+
+def _init_worker(templates_dir: str, confidence: float, template_settings: Dict[str, Any],
+                 methods: Optional[Sequence[str]] = None):
+    """Create the per-process detector and load the template bank once."""
+    global _worker_detector, _worker_templates
+    # Parallelism comes from the process pool - avoid oversubscribing cores
+    cv2.setNumThreads(1)
+    _worker_detector = ScreenDetector(templates_dir, confidence, template_settings, methods=methods)
+    _worker_templates = []
+    for template_path in sorted(Path(templates_dir).glob("*.png")):
+        try:
+            _worker_detector.matcher.load_template(str(template_path))
+            _worker_templates.append(str(template_path))
+        except ValueError:
+            continue
 
-    # Load config
-    with open('config.yaml', 'r') as f:
-        config = yaml.safe_load(f)
+
+def analyze_frame(task: Tuple[str, Any], thumb_width: int = 360) -> Dict[str, Any]:
+    """
+    Score every template against one frame and run the screen detector on it.
+
+    Runs inside a worker process. Frame views are built once and shared by
+    the template scoring and the detector.
+
+    Args:
+        task: (name, frame) where frame is an image path or a BGR array
+        thumb_width: Width of the JPEG thumbnail in the report
+
+    Returns:
+        JSON-serializable result for the report
+    """
+    name, frame = task
+    matcher = _worker_detector.matcher
+    start = time.perf_counter()
+
+    screenshot_cv = cv2.imread(frame, cv2.IMREAD_COLOR) if isinstance(frame, str) else frame
+    if screenshot_cv is None:
+        return {'frame': name, 'error': 'could not load image'}
+
+    views = build_frame_views(screenshot_cv)
+    matcher.set_frame(screenshot_cv, views)
+
+    templates = []
+    matches = []
+    for template_path in _worker_templates:
+        template = matcher.load_template(template_path)
+        methods_results = matcher.score_views(views, template, methods=matcher.METHODS)
+        if not methods_results:
+            continue
+
+        active_methods = template['methods'] or matcher.methods
+        active_results = [r for r in methods_results if r[0] in active_methods] or methods_results
+        best_method, max_val, max_loc = max(active_results, key=lambda x: x[1])
+        threshold = matcher.get_confidence(template_path)
+        entry = {
+            'name': Path(template_path).name,
+            'scores': {method: round(float(score), 4) for method, score, _ in methods_results},
+            'best_method': best_method,
+            'confidence': round(float(max_val), 4),
+            'threshold': threshold,
+            'matched': bool(max_val >= threshold),
+            'location': [int(max_loc[0]), int(max_loc[1])],
+            'size': [int(v) for v in (max_loc[2:] if len(max_loc) == 4 else template['color'].shape[1::-1])],
+        }
+        templates.append(entry)
+        if entry['matched']:
+            matches.append(entry)
+
+        # Let the detector reuse this result instead of matching again
+        match = (*entry['location'], *entry['size']) if entry['matched'] else None
+        matcher.cache_match(template_path, match)
+
+    match_ms = (time.perf_counter() - start) * 1000
+    detected = _worker_detector.detect_current_screen()
+    matcher.set_frame(None)
+
+    matches.sort(key=lambda m: m['confidence'], reverse=True)
+    vis = draw_matches(screenshot_cv, matches)
+    scale = min(1.0, thumb_width / vis.shape[1])
+    if scale < 1.0:
+        vis = cv2.resize(vis, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, thumb = cv2.imencode('.jpg', vis, [cv2.IMWRITE_JPEG_QUALITY, 75])
+
+    return {
+        'frame': name,
+        'detected': detected.value,
+        'matches': [m['name'] for m in matches],
+        'templates': templates,
+        'match_ms': round(match_ms, 1),
+        'total_ms': round((time.perf_counter() - start) * 1000, 1),
+        'thumbnail': base64.b64encode(thumb.tobytes()).decode('ascii'),
+    }
+
+
+def collect_frames(source: Path, every: int = 1):
+    """
+    Yield (name, frame) tasks from a screenshot directory or a recorded video.
+
+    Image files are passed by path (workers load them); video frames are
+    decoded here and passed as arrays.
+
+    Args:
+        source: Directory (searched recursively), single image, or video file
+        every: Only use every Nth video frame
+    """
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                yield (str(path.relative_to(source)), str(path))
+    elif source.suffix.lower() in VIDEO_EXTENSIONS:
+        capture = cv2.VideoCapture(str(source))
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % every == 0:
+                yield (f"{source.name}#{index:06d}", frame)
+            index += 1
+        capture.release()
+    else:
+        yield (source.name, str(source))
+
+
+def write_report(results: List[Dict[str, Any]], output_dir: Path, source: Path, elapsed: float):
+    """Write report.json and a self-contained report.html with thumbnails."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    screen_counts = {}
+    for result in results:
+        screen = result.get('detected', 'error')
+        screen_counts[screen] = screen_counts.get(screen, 0) + 1
+
+    summary = {
+        'source': str(source),
+        'frames': len(results),
+        'elapsed_s': round(elapsed, 2),
+        'screens': screen_counts,
+    }
+
+    json_results = [{k: v for k, v in r.items() if k != 'thumbnail'} for r in results]
+    with open(output_dir / "report.json", 'w', encoding='utf-8') as f:
+        json.dump({'summary': summary, 'frames': json_results}, f, indent=2, ensure_ascii=False)
+
+    rows = []
+    for result in results:
+        if 'error' in result:
+            rows.append(f"<tr><td>{html.escape(result['frame'])}</td><td colspan=3>{result['error']}</td></tr>")
+            continue
+        unknown = ' class="unknown"' if result['detected'] == GameScreen.UNKNOWN.value else ''
+        top_templates = sorted(result['templates'], key=lambda t: t['confidence'], reverse=True)[:8]
+        scores = "".join(
+            f"<li class=\"{'hit' if t['matched'] else 'miss'}\">{html.escape(t['name'])}: "
+            f"{t['confidence']:.3f} / {t['threshold']:.2f} ({t['best_method']})</li>"
+            for t in top_templates
+        )
+        rows.append(
+            f"<tr{unknown}><td>{html.escape(result['frame'])}<br><small>{result['total_ms']} ms</small></td>"
+            f"<td><b>{result['detected']}</b></td>"
+            f"<td><img src=\"data:image/jpeg;base64,{result['thumbnail']}\"></td>"
+            f"<td><ol>{scores}</ol></td></tr>"
+        )
+
+    counts = ", ".join(f"{screen}: {count}" for screen, count in sorted(screen_counts.items()))
+    page = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Detection report</title>
+<style>
+body {{ font-family: sans-serif; }}
+td {{ vertical-align: top; border-bottom: 1px solid #ccc; padding: 4px; }}
+tr.unknown {{ background: #fee; }}
+li.hit {{ color: #080; font-weight: bold; }}
+</style></head><body>
+<h1>Detection report</h1>
+<p>{html.escape(str(source))} - {len(results)} frames in {elapsed:.1f}s</p>
+<p>{html.escape(counts)}</p>
+<table><tr><th>Frame</th><th>Detected</th><th>Matches</th><th>Top scores (score / threshold)</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+    with open(output_dir / "report.html", 'w', encoding='utf-8') as f:
+        f.write(page)
+
+    return summary
+
+
+def run_batch(config: Dict[str, Any], source: Path, output_dir: Path, workers: Optional[int], every: int):
+    """
+    Non-interactive mode: analyze a whole screenshot directory or recording in parallel.
+
+    Args:
+        config: Loaded config.yaml
+        source: Directory, image or video to analyze
+        output_dir: Where to write report.json / report.html
+        workers: Number of worker processes (default: CPU count)
+        every: Only use every Nth video frame
+    """
+    confidence = config.get('confidence_threshold', 0.8)
+    template_settings = config.get('template_settings') or {}
+    workers = workers or os.cpu_count() or 1
+
+    print("=" * 70)
+    print("SCREEN DETECTION DEBUG TOOL - BATCH MODE")
+    print("=" * 70)
+    print()
+    print(f"Source:  {source}")
+    print(f"Workers: {workers}")
+    print()
+
+    def report_progress(result: Dict[str, Any]):
+        detected = result.get('detected', 'error')
+        marker = "✗" if detected in (GameScreen.UNKNOWN.value, 'error') else "✓"
+        print(f"{marker} {result['frame']:50s} {detected:25s} {result.get('total_ms', 0):7.1f} ms")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=("templates", confidence, template_settings, config.get('matching_methods'))
+    ) as pool:
+        # Keep only a few frames in flight: decoded video frames are not read
+        # (and held in memory) faster than the workers analyze them
+        max_pending = 2 * workers
+        pending = {}
+        for index, task in enumerate(collect_frames(source, every)):
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results.append((pending.pop(future), future.result()))
+                    report_progress(results[-1][1])
+            pending[pool.submit(analyze_frame, task)] = index
+        for future in wait(pending).done:
+            results.append((pending[future], future.result()))
+            report_progress(results[-1][1])
+    elapsed = time.perf_counter() - start
+    # Back into frame order for the report
+    results = [result for _, result in sorted(results, key=lambda item: item[0])]
+
+    if not results:
+        print(f"✗ No frames found in {source}")
+        return
+
+    summary = write_report(results, output_dir, source, elapsed)
+
+    print()
+    print("=" * 70)
+    print("SUMMARY")
+    print("=" * 70)
+    print()
+    print(f"Frames analyzed: {summary['frames']} in {summary['elapsed_s']}s")
+    for screen, count in sorted(summary['screens'].items(), key=lambda item: -item[1]):
+        print(f"  {screen:30s} {count}")
+    print()
+    print(f"Report: {output_dir / 'report.html'}")
+    print(f"        {output_dir / 'report.json'}")
+
+
+def run_interactive(config: Dict[str, Any]):
+    """Debug screen detection on the live screen."""
 
     confidence = config.get('confidence_threshold', 0.8)
     search_region = config.get('search_region', None)
+    template_settings = config.get('template_settings') or {}
 
     print("=" * 70)
     print("SCREEN DETECTION DEBUG TOOL")
@@ -37,8 +336,9 @@ def main():
     print()
 
     # Initialize detector and matcher
-    detector = ScreenDetector(confidence=confidence)
-    matcher = ImageMatcher(confidence=confidence)
+    detector = ScreenDetector(confidence=confidence, template_settings=template_settings,
+                              methods=config.get('matching_methods'))
+    matcher = detector.matcher
 
     # Take screenshot
     print("Taking screenshot...")
@@ -51,8 +351,8 @@ def main():
     print(f"✓ Saved screenshot to: debug_current_screen.png")
     print()
 
-    # Convert screenshot to grayscale for matching
-    screenshot_gray = cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY)
+    # Color, grayscale and edge views are shared by every template
+    views = build_frame_views(screenshot_cv)
 
     # Test all templates
     templates_dir = Path("templates")
@@ -68,54 +368,48 @@ def main():
     for template_path in all_templates:
         template_name = template_path.name
 
-        # Load template
-        template = cv2.imread(str(template_path))
-        if template is None:
+        # Load template (with its mask, if any)
+        try:
+            template = matcher.load_template(str(template_path))
+        except ValueError:
             continue
 
-        # Convert template to grayscale
-        template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
-
-        # Try multiple matching methods
-        methods_results = []
-
-        # Method 1: Grayscale
-        result_gray = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val_gray, _, max_loc_gray = cv2.minMaxLoc(result_gray)
-        methods_results.append(('gray', max_val_gray, max_loc_gray))
-
-        # Method 2: Color
-        result_color = cv2.matchTemplate(screenshot_cv, template, cv2.TM_CCOEFF_NORMED)
-        _, max_val_color, _, max_loc_color = cv2.minMaxLoc(result_color)
-        methods_results.append(('color', max_val_color, max_loc_color))
-
-        # Method 3: Edges
-        screenshot_edges = cv2.Canny(screenshot_gray, 50, 150)
-        template_edges = cv2.Canny(template_gray, 50, 150)
-        result_edges = cv2.matchTemplate(screenshot_edges, template_edges, cv2.TM_CCOEFF_NORMED)
-        _, max_val_edges, _, max_loc_edges = cv2.minMaxLoc(result_edges)
-        methods_results.append(('edges', max_val_edges, max_loc_edges))
+        # Try all matching methods (grayscale, color, edges), even ones a template skips
+        methods_results = matcher.score_views(views, template, methods=matcher.METHODS)
+        if not methods_results:
+            continue
+        scores = {method: score for method, score, _ in methods_results}
 
-        # Use best result
-        best_method, max_val, max_loc = max(methods_results, key=lambda x: x[1])
+        # Use best result among the methods the detector actually runs for this template
+        # (ORB only scores the grayscale view, whatever 'methods' says)
+        active_methods = template['methods'] or matcher.methods
+        active_results = [r for r in methods_results if r[0] in active_methods] or methods_results
+        best_method, max_val, max_loc = max(active_results, key=lambda x: x[1])
+        threshold = matcher.get_confidence(str(template_path))
 
         # Check if it matches
-        matched = max_val >= confidence
+        matched = max_val >= threshold
 
         status = "✓ MATCH" if matched else "✗ no match"
         color = "\033[92m" if matched else "\033[91m"
         reset = "\033[0m"
 
         # Show which method worked best and all scores
-        method_scores = f"[G:{max_val_gray:.2f} C:{max_val_color:.2f} E:{max_val_edges:.2f}]"
-        print(f"{color}{status}{reset} {template_name:40s} best: {best_method:5s} {max_val:.3f} {method_scores}")
+        method_scores = "[" + " ".join(
+            f"{method[0].upper()}:{scores[method]:.2f}" if method in scores else f"{method[0].upper()}:-"
+            for method in matcher.METHODS
+        ) + "]"
+        mask_note = " masked" if template['mask'] is not None else ""
+        print(f"{color}{status}{reset} {template_name:40s} best: {best_method:9s} {max_val:.3f} "
+              f"(thr {threshold:.2f}{mask_note}) {method_scores}")
 
         if matched:
             matches.append({
                 'name': template_name,
                 'confidence': max_val,
-                'location': max_loc,
-                'size': (template.shape[1], template.shape[0])
+                'location': max_loc[:2],
+                # ORB reports the (possibly scaled) size it found
+                'size': tuple(max_loc[2:]) if len(max_loc) == 4 else (template['color'].shape[1], template['color'].shape[0])
             })
 
     print()
@@ -141,29 +435,7 @@ def main():
 
         # Create visualization
         print("Creating visualization...")
-        vis = screenshot_cv.copy()
-
-        colors = [
-            (0, 255, 0),    # Green
-            (255, 0, 0),    # Blue
-            (0, 0, 255),    # Red
-            (255, 255, 0),  # Cyan
-            (255, 0, 255),  # Magenta
-            (0, 255, 255),  # Yellow
-        ]
-
-        for i, match in enumerate(matches):
-            x, y = match['location']
-            w, h = match['size']
-            color = colors[i % len(colors)]
-
-            # Draw rectangle
-            cv2.rectangle(vis, (x, y), (x + w, y + h), color, 3)
-
-            # Add label
-            label = f"{i+1}. {match['name'][:20]}"
-            cv2.putText(vis, label, (x, y - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        vis = draw_matches(screenshot_cv, matches)
 
         cv2.imwrite('debug_matches_visualization.png', vis)
         print(f"✓ Saved visualization to: debug_matches_visualization.png")
@@ -203,5 +475,26 @@ def main():
     print("Open these images to see what the automation is detecting!")
     print()
 
+def main():
+    """Debug screen detection (interactive, or batch over saved screenshots)."""
+    parser = argparse.ArgumentParser(description="Debug template matching and screen detection")
+    parser.add_argument("--config", default="config.yaml", help="Path to configuration file")
+    parser.add_argument("--batch", metavar="PATH",
+                        help="Analyze a screenshot directory, image or recorded video instead of the live screen")
+    parser.add_argument("--output", default="debug_report", help="Report directory for --batch")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --batch (default: all CPUs)")
+    parser.add_argument("--every", type=int, default=1, help="Only analyze every Nth frame of a video")
+    args = parser.parse_args()
+
+    # Load config
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+
+    if args.batch:
+        run_batch(config, Path(args.batch), Path(args.output), args.workers, max(1, args.every))
+    else:
+        run_interactive(config)
+
+
 if __name__ == "__main__":
     main()
@@ -1,11 +1,565 @@
 #!/usr/bin/env python3
-"""Copy all button templates from examples/button templates/ to templates/."""
+"""Extract button templates: copy them into templates/, auto-crop minimal unique crops, or analyze the bank."""
 
+import argparse
+import hashlib
 import shutil
+import time
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+
+
+# Pairs at or above this similarity are reported
+DEFAULT_SIMILARITY = 0.85
+
+# Similar pairs at or above this are the same image (redundant); below it they
+# are different buttons that look alike (confusable)
+REDUNDANT_SIMILARITY = 0.97
+
+# Templates below these are reported as weakly discriminative
+MIN_TEXTURE_STD = 12.0
+MIN_EDGE_DENSITY = 0.03
+
+
+def template_similarity(a: np.ndarray, b: np.ndarray) -> Tuple[float, str]:
+    """
+    Similarity between two grayscale templates.
+
+    Two measures are tried and the higher one is returned:
+      - containment: the smaller template matched inside the larger one
+        (catches crops of the same button with different padding)
+      - rescaled: the larger template resized to the smaller one's size
+        (catches the same icon saved at different scales)
+
+    Returns:
+        (score, how) where score is TM_CCOEFF_NORMED in [-1, 1]
+    """
+    small, large = (a, b) if a.size <= b.size else (b, a)
+    results = []
+
+    if small.shape[0] <= large.shape[0] and small.shape[1] <= large.shape[1]:
+        _, score, _, _ = cv2.minMaxLoc(cv2.matchTemplate(large, small, cv2.TM_CCOEFF_NORMED))
+        results.append((score, 'contains'))
+
+    # Only compare rescaled versions of roughly the same aspect ratio
+    aspect_small = small.shape[1] / small.shape[0]
+    aspect_large = large.shape[1] / large.shape[0]
+    if 0.8 <= aspect_small / aspect_large <= 1.25:
+        resized = cv2.resize(large, (small.shape[1], small.shape[0]), interpolation=cv2.INTER_AREA)
+        _, score, _, _ = cv2.minMaxLoc(cv2.matchTemplate(resized, small, cv2.TM_CCOEFF_NORMED))
+        results.append((score, 'rescaled'))
+
+    return max(results) if results else (-1.0, 'n/a')
+
+
+def measure_matching_cost(template: np.ndarray, frame_size: Tuple[int, int], repeats: int = 3) -> Dict[str, float]:
+    """
+    Measure how long one template adds to a detection tick.
+
+    Matches the template with the three methods ImageMatcher runs (grayscale,
+    color, edges) against a random frame of the given size.
+
+    Args:
+        template: BGR template
+        frame_size: (width, height) of the searched frame (search_region size)
+        repeats: Timing repeats (best is kept)
+
+    Returns:
+        Dict with 'ms' (measured per tick) and 'mops' (estimated multiply-adds, millions)
+    """
+    frame_w, frame_h = frame_size
+    h, w = template.shape[:2]
+    if h > frame_h or w > frame_w:
+        return {'ms': 0.0, 'mops': 0.0}
+
+    frame = np.random.RandomState(0).randint(0, 255, (frame_h, frame_w, 3), dtype=np.uint8)
+    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    frame_edges = cv2.Canny(frame_gray, 50, 150)
+    template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    template_edges = cv2.Canny(template_gray, 50, 150)
+
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        cv2.matchTemplate(frame_gray, template_gray, cv2.TM_CCOEFF_NORMED)
+        cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+        cv2.matchTemplate(frame_edges, template_edges, cv2.TM_CCOEFF_NORMED)
+        best = min(best, time.perf_counter() - start)
+
+    # Sliding-window positions x template pixels x (gray + 3 color channels + edges)
+    positions = (frame_w - w + 1) * (frame_h - h + 1)
+    return {'ms': best * 1000, 'mops': positions * w * h * 5 / 1e6}
+
+
+def used_templates() -> Dict[str, str]:
+    """
+    Map template file name -> what uses it during automation.
+
+    Covers templates the ScreenDetector checks every tick and templates the
+    handlers in umamusume_autoplay.py click.
+    """
+    import re
+    from screen_detector import ScreenDetector
+
+    used = {}
+    for screen, templates in ScreenDetector().screen_templates.items():
+        for name in templates:
+            used[name] = screen.value
+
+    source = Path(__file__).with_name("umamusume_autoplay.py").read_text(encoding='utf-8')
+    for name in re.findall(r'^\s*"([^"#]+\.png)"', source, flags=re.MULTILINE):
+        used.setdefault(name, "clicked")
+    return used
+
+
+def analyze_templates(
+    template_dirs: List[Path],
+    frame_size: Tuple[int, int],
+    similarity_threshold: float = DEFAULT_SIMILARITY,
+    frames_dir: Optional[Path] = None,
+    confidence: float = 0.8
+) -> Dict[str, Any]:
+    """
+    Find redundant and weakly discriminative templates and what each one costs.
+
+    Args:
+        template_dirs: Directories of templates to analyze together
+        frame_size: (width, height) of the searched frame, for cost measurement
+        similarity_threshold: Pairs at or above this are reported (as redundant from
+            REDUNDANT_SIMILARITY, as confusable below it)
+        frames_dir: Optional screenshots; reports how many frames each template matches
+        confidence: Threshold used when counting frame matches
+
+    Returns:
+        Dict with 'templates' (per-template stats), 'duplicates' (identical files)
+        and 'similar' (near-duplicate pairs)
+    """
+    bank = []
+    by_hash = {}
+    duplicates = []
+    for template_dir in template_dirs:
+        for path in sorted(template_dir.glob("*.png")):
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            digest = hashlib.sha1(image.tobytes() + bytes(str(image.shape), 'ascii')).hexdigest()
+            if digest in by_hash:
+                duplicates.append((by_hash[digest], path))
+                continue
+            by_hash[digest] = path
+            bank.append((path, image, cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)))
+
+    used = used_templates()
+    stats = {}
+    for path, image, gray in bank:
+        edges = cv2.Canny(gray, 50, 150)
+        stats[path] = {
+            'size': (image.shape[1], image.shape[0]),
+            'texture': float(gray.std()),
+            'edge_density': float(np.count_nonzero(edges)) / edges.size,
+            'used_by': used.get(path.name) if path.parent.name == 'templates' else None,
+            'frame_matches': None,
+            **measure_matching_cost(image, frame_size),
+        }
+
+    similar = []
+    for i in range(len(bank)):
+        for j in range(i + 1, len(bank)):
+            score, how = template_similarity(bank[i][2], bank[j][2])
+            if score >= similarity_threshold:
+                similar.append((bank[i][0], bank[j][0], score, how))
+    similar.sort(key=lambda pair: -pair[2])
+
+    if frames_dir is not None:
+        frames = [cv2.imread(str(p), cv2.IMREAD_GRAYSCALE) for p in sorted(frames_dir.rglob("*.png"))]
+        frames = [f for f in frames if f is not None]
+        for path, _, gray in bank:
+            hits = 0
+            for frame in frames:
+                if gray.shape[0] <= frame.shape[0] and gray.shape[1] <= frame.shape[1]:
+                    _, score, _, _ = cv2.minMaxLoc(cv2.matchTemplate(frame, gray, cv2.TM_CCOEFF_NORMED))
+                    hits += score >= confidence
+            stats[path]['frame_matches'] = (hits, len(frames))
+
+    return {'templates': stats, 'duplicates': duplicates, 'similar': similar}
+
+
+def print_analysis(analysis: Dict[str, Any], frame_size: Tuple[int, int]):
+    """Print the template bank analysis."""
+    stats = analysis['templates']
+
+    print("=" * 70)
+    print("TEMPLATE BANK ANALYSIS")
+    print("=" * 70)
+    print()
+    print(f"Matching cost measured against a {frame_size[0]}x{frame_size[1]} frame (3 methods)")
+    print()
+    print(f"{'template':58s} {'size':>9s} {'ms/tick':>8s} {'Mops':>8s}  used by")
+
+    total_detector = 0.0
+    for path, info in sorted(stats.items(), key=lambda item: -item[1]['ms']):
+        size = f"{info['size'][0]}x{info['size'][1]}"
+        used_by = info['used_by'] or "-"
+        if info['used_by'] and info['used_by'] != "clicked":
+            total_detector += info['ms']
+        print(f"{str(path):58s} {size:>9s} {info['ms']:8.1f} {info['mops']:8.0f}  {used_by}")
+    print()
+    print(f"Detector templates cost up to {total_detector:.1f} ms per tick (all screens checked)")
+    print()
+
+    print("=" * 70)
+    print("IDENTICAL FILES")
+    print("=" * 70)
+    print()
+    if not analysis['duplicates']:
+        print("None")
+    for original, duplicate in analysis['duplicates']:
+        print(f"  {duplicate}  ==  {original}")
+    print()
+
+    print("=" * 70)
+    print("NEAR-DUPLICATES (redundant candidates)")
+    print("=" * 70)
+    print()
+    redundant = [pair for pair in analysis['similar'] if pair[2] >= REDUNDANT_SIMILARITY]
+    if not redundant:
+        print("None")
+    for a, b, score, how in redundant:
+        # Suggest dropping the more expensive one unless automation needs it
+        keep, drop = sorted((a, b), key=lambda p: (not stats[p]['used_by'], stats[p]['ms']))
+        print(f"  {score:.3f} ({how:8s}) {a}  ~  {b}")
+        if stats[drop]['used_by']:
+            print(f"           both in use - consider sharing one template")
+        else:
+            print(f"           keep {keep.name}, drop {drop.name} ({stats[drop]['ms']:.1f} ms/tick when loaded)")
+    print()
+
+    print("=" * 70)
+    print("CONFUSABLE PAIRS (similar, but not the same image)")
+    print("=" * 70)
+    print()
+    confusable = [pair for pair in analysis['similar'] if pair[2] < REDUNDANT_SIMILARITY]
+    if not confusable:
+        print("None")
+    for a, b, score, how in confusable:
+        print(f"  {score:.3f} ({how:8s}) {a.name}  ~  {b.name}")
+        print(f"           confidence must stay above {score:.2f} or mask the shared background")
+    print()
+
+    print("=" * 70)
+    print("WEAKLY DISCRIMINATIVE")
+    print("=" * 70)
+    print()
+    weak = 0
+    for path, info in sorted(stats.items()):
+        reasons = []
+        if info['texture'] < MIN_TEXTURE_STD:
+            reasons.append(f"low texture (std {info['texture']:.1f})")
+        if info['edge_density'] < MIN_EDGE_DENSITY:
+            reasons.append(f"few edges ({info['edge_density']:.1%})")
+        if info['frame_matches'] and info['frame_matches'][1]:
+            hits, total = info['frame_matches']
+            if hits > max(1, total // 4):
+                reasons.append(f"matches {hits}/{total} frames")
+        if reasons:
+            weak += 1
+            print(f"  {path}: {', '.join(reasons)}")
+    if not weak:
+        print("None")
+    print()
+
+
+def _peak_outside(result: np.ndarray, exclude: Optional[Tuple[int, int]], radius: Tuple[int, int]) -> float:
+    """Highest score in a match result, ignoring a window around the excluded location."""
+    if exclude is None:
+        return float(result.max())
+    masked = result.copy()
+    x, y = exclude
+    rx, ry = radius
+    masked[max(0, y - ry):y + ry + 1, max(0, x - rx):x + rx + 1] = -1.0
+    return float(masked.max())
+
+
+def crop_is_discriminative(
+    crop: np.ndarray,
+    location: Tuple[int, int],
+    source: np.ndarray,
+    positives: List[np.ndarray],
+    negatives: List[np.ndarray],
+    confidence: float,
+    margin: float
+) -> Tuple[bool, float, float]:
+    """
+    Check that a crop still identifies its button uniquely.
+
+    The crop must match every positive frame at >= confidence, while its best
+    score anywhere else (other places in the source frame, and every negative
+    frame) must stay below both confidence and the lowest positive score minus
+    margin.
+
+    Args:
+        crop: Grayscale candidate template
+        location: (x, y) of the crop in the source frame
+        source: Grayscale source screenshot
+        positives: Other grayscale frames that show the same button
+        negatives: Grayscale frames that must not match
+        confidence: Detection threshold
+        margin: Required gap between positive and negative scores
+
+    Returns:
+        (ok, lowest positive score, highest negative score)
+    """
+    h, w = crop.shape
+    radius = (max(2, w // 4), max(2, h // 4))
+
+    source_result = cv2.matchTemplate(source, crop, cv2.TM_CCOEFF_NORMED)
+    min_positive = float(source_result[location[1], location[0]])
+    max_negative = _peak_outside(source_result, location, radius)
+
+    for frame in positives:
+        if h <= frame.shape[0] and w <= frame.shape[1]:
+            min_positive = min(min_positive, float(cv2.matchTemplate(frame, crop, cv2.TM_CCOEFF_NORMED).max()))
+
+    for frame in negatives:
+        if h <= frame.shape[0] and w <= frame.shape[1]:
+            max_negative = max(max_negative, float(cv2.matchTemplate(frame, crop, cv2.TM_CCOEFF_NORMED).max()))
+            if max_negative >= confidence:
+                break
+
+    ok = (
+        min_positive >= confidence
+        and max_negative < confidence
+        and min_positive - max_negative >= margin
+    )
+    return ok, min_positive, max_negative
+
+
+def autocrop_button(
+    source: np.ndarray,
+    box: Tuple[int, int, int, int],
+    positives: List[np.ndarray],
+    negatives: List[np.ndarray],
+    confidence: float = 0.8,
+    margin: float = 0.1,
+    min_size: int = 16
+) -> Optional[Tuple[Tuple[int, int, int, int], float, float]]:
+    """
+    Find the smallest crop inside an approximate box that still matches uniquely.
+
+    Greedy search: repeatedly try moving each edge of the box inwards by a
+    step. While the crop is not yet unique, keep the move that widens the
+    positive/negative gap the most; once it is, keep the move that removes
+    the most area while it stays unique. The step is halved when no edge
+    can move.
+
+    Args:
+        source: Grayscale source screenshot
+        box: Approximate (x, y, w, h) of the button in the source
+        positives: Other grayscale frames showing the same button
+        negatives: Grayscale frames that must not match
+        confidence: Detection threshold the crop must satisfy
+        margin: Required gap between positive and negative scores
+        min_size: Smallest allowed crop width/height
+
+    Returns:
+        ((x, y, w, h), lowest positive score, highest negative score), or None if
+        no crop inside the box is discriminative
+    """
+    x, y, w, h = box
+    x, y = max(0, x), max(0, y)
+    w = min(w, source.shape[1] - x)
+    h = min(h, source.shape[0] - y)
+
+    def check(cx, cy, cw, ch):
+        crop = source[cy:cy + ch, cx:cx + cw]
+        if crop.std() < 1.0:
+            return False, 0.0, 1.0
+        return crop_is_discriminative(crop, (cx, cy), source, positives, negatives, confidence, margin)
+
+    # (dx, dy, dw, dh) for moving the left, top, right and bottom edge inwards
+    def moves(step):
+        return ((step, 0, -step, 0), (0, step, 0, -step), (0, 0, -step, 0), (0, 0, 0, -step))
+
+    ok, min_positive, max_negative = check(x, y, w, h)
+
+    # Phase 1: a loose box may include background shared with other screens -
+    # shrink towards the most discriminative part until the crop is unique
+    step = max(2, min(w, h) // 4)
+    while not ok:
+        if step < 1:
+            return None
+        best = None
+        for dx, dy, dw, dh in moves(step):
+            cw, ch = w + dw, h + dh
+            if cw < min_size or ch < min_size:
+                continue
+            result = check(x + dx, y + dy, cw, ch)
+            key = (result[0], result[1] - result[2])
+            if best is None or key > best[0]:
+                best = (key, (x + dx, y + dy, cw, ch), result)
+
+        if best is None or best[0][1] <= min_positive - max_negative:
+            step //= 2
+            continue
+        (x, y, w, h), (ok, min_positive, max_negative) = best[1], best[2]
+
+    # Phase 2: remove as much area as possible while the crop stays unique
+    step = max(2, min(w, h) // 4)
+    while step >= 1:
+        best = None
+        for dx, dy, dw, dh in moves(step):
+            cw, ch = w + dw, h + dh
+            if cw < min_size or ch < min_size:
+                continue
+            result = check(x + dx, y + dy, cw, ch)
+            if result[0]:
+                # Prefer the move that removes the most area, then the larger margin
+                removed = w * h - cw * ch
+                key = (removed, result[1] - result[2])
+                if best is None or key > best[0]:
+                    best = (key, (x + dx, y + dy, cw, ch), result)
+
+        if best is None:
+            step //= 2
+            continue
+        (x, y, w, h), (_, min_positive, max_negative) = best[1], best[2]
+
+    return (x, y, w, h), min_positive, max_negative
+
+
+def autocrop(args):
+    """
+    Crop optimized templates from full screenshots plus approximate boxes.
+
+    The boxes file (YAML) maps output template names to a source screenshot
+    and an approximate box; optional 'positives' lists other screenshots that
+    show the same button:
+
+        tojiru_button.png:
+          screenshot: examples/old/Screenshot_20260216_121819.png
+          box: [180, 700, 300, 100]
+          positives: [examples/old/pasted file (4).png]
+    """
+    with open(args.autocrop, 'r', encoding='utf-8') as f:
+        buttons = yaml.safe_load(f) or {}
+
+    confidence = 0.8
+    config_path = Path(args.config)
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            confidence = (yaml.safe_load(f) or {}).get('confidence_threshold', confidence)
+    confidence = args.confidence or confidence
+
+    # Every full screenshot is a negative unless listed as a positive for the button
+    frame_paths = [p for p in sorted(Path(args.frames or "examples").rglob("*.png"))
+                   if "button templates" not in p.parts]
+    frames = {}
+    for path in frame_paths:
+        image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            frames[path.resolve()] = image
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 70)
+    print("AUTO-CROPPING TEMPLATES")
+    print("=" * 70)
+    print()
+    print(f"Uniqueness checked against {len(frames)} screenshots (confidence {confidence}, margin {args.margin})")
+    print()
+
+    for name, spec in buttons.items():
+        source_path = Path(spec['screenshot'])
+        source_color = cv2.imread(str(source_path), cv2.IMREAD_COLOR)
+        if source_color is None:
+            print(f"✗ {name}: could not load {source_path}")
+            continue
+        source = cv2.cvtColor(source_color, cv2.COLOR_BGR2GRAY)
+
+        excluded = {source_path.resolve()} | {Path(p).resolve() for p in spec.get('positives', [])}
+        positives = [frames[p] for p in excluded if p in frames and p != source_path.resolve()]
+        negatives = [frame for path, frame in frames.items() if path not in excluded]
+
+        box = tuple(spec['box'])
+        result = autocrop_button(source, box, positives, negatives, confidence, args.margin, args.min_size)
+        if result is None:
+            print(f"✗ {name}: no unique crop inside the box - enlarge it or list more positives")
+            continue
+
+        (x, y, w, h), min_positive, max_negative = result
+        crop = source_color[y:y + h, x:x + w]
+        cv2.imwrite(str(output_dir / name), crop)
+
+        frame_size = (source.shape[1], source.shape[0])
+        before = measure_matching_cost(source_color[box[1]:box[1] + box[3], box[0]:box[0] + box[2]], frame_size)
+        after = measure_matching_cost(crop, frame_size)
+        area = 100.0 * (w * h) / (box[2] * box[3])
+        print(f"✓ {name:40s} {box[2]}x{box[3]} -> {w}x{h} at ({x}, {y}) = {area:.0f}% area")
+        print(f"  scores: positive {min_positive:.3f}, best negative {max_negative:.3f}; "
+              f"cost {before['ms']:.1f} -> {after['ms']:.1f} ms/tick")
+
+    print()
+    print(f"Templates saved to: {output_dir.absolute()}/")
+
+
+def analyze(args):
+    """Run the template bank analysis from command line arguments."""
+    frame_size = tuple(args.frame_size) if args.frame_size else None
+    confidence = 0.8
+    config_path = Path(args.config)
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        confidence = config.get('confidence_threshold', confidence)
+        if frame_size is None and config.get('search_region'):
+            frame_size = tuple(config['search_region'][2:4])
+    frame_size = frame_size or (1920, 1080)
+
+    template_dirs = [Path(d) for d in args.analyze] or [Path("templates"), Path("examples/button templates")]
+    template_dirs = [d for d in template_dirs if d.exists()]
+    frames_dir = Path(args.frames) if args.frames else None
+
+    analysis = analyze_templates(template_dirs, frame_size, args.similarity, frames_dir, confidence)
+    print_analysis(analysis, frame_size)
 
 
 def main():
+    """Copy templates, or analyze the template bank with --analyze."""
+    parser = argparse.ArgumentParser(description="Extract and analyze button templates")
+    parser.add_argument("--analyze", nargs="*", metavar="DIR",
+                        help="Analyze template directories for redundancy and cost "
+                             "(default: templates/ and examples/button templates/)")
+    parser.add_argument("--frames", help="Screenshot directory: match counts for --analyze, "
+                                          "negatives for --autocrop (default: examples/)")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY,
+                        help="Similarity from which template pairs are reported by --analyze "
+                             f"(redundant from {REDUNDANT_SIMILARITY}, confusable below)")
+    parser.add_argument("--frame-size", type=int, nargs=2, metavar=("W", "H"),
+                        help="Frame size for cost measurement (default: search_region size)")
+    parser.add_argument("--config", default="config.yaml", help="Path to configuration file")
+    parser.add_argument("--autocrop", metavar="BOXES_YAML",
+                        help="Crop minimal unique templates from screenshots using approximate boxes")
+    parser.add_argument("--output", default="templates_cropped", help="Output directory for --autocrop")
+    parser.add_argument("--confidence", type=float, help="Threshold crops must satisfy (default: from config)")
+    parser.add_argument("--margin", type=float, default=0.1,
+                        help="Required gap between positive and negative scores for --autocrop")
+    parser.add_argument("--min-size", type=int, default=16, help="Smallest crop width/height for --autocrop")
+    args = parser.parse_args()
+
+    if args.autocrop:
+        autocrop(args)
+    elif args.analyze is not None:
+        analyze(args)
+    else:
+        extract()
+
+
+def extract():
     """Copy all .png files from examples/button templates/ to templates/."""
 
     # Create templates directory
@@ -0,0 +1,161 @@
+"""Frequency-domain template correlation sharing one frame transform across templates."""
+
+from typing import Any, Dict, Tuple
+
+import cv2
+import numpy as np
+
+
+def _planes(image: np.ndarray) -> list:
+    """Split an image into float64 channel planes."""
+    image = image.astype(np.float64)
+    return cv2.split(image) if image.ndim == 3 else [image]
+
+
+def _window_sums(integral: np.ndarray, h: int, w: int) -> np.ndarray:
+    """Per-channel sum of every h x w window from an (H+1, W+1, C) integral image."""
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+class FFTCorrelator:
+    """
+    Template matching through the FFT, with frame spectra computed once per frame.
+
+    cv2.matchTemplate transforms the frame again for every template. Here
+    every frame view (and crop) is transformed once and every template
+    that uses this engine reuses that spectrum: each match then costs one
+    spectrum product and one inverse transform. Template spectra are
+    cached per transform size.
+
+    Results follow OpenCV's definitions: TM_CCOEFF_NORMED for unmasked
+    templates (window statistics from integral images) and masked
+    TM_CCORR_NORMED for masked ones, so scores agree with the spatial
+    engine to within floating point error.
+    """
+
+    def __init__(self):
+        """Initialize with an empty per-frame cache."""
+        self._frames = {}
+
+    def clear(self):
+        """Forget frame spectra (call whenever a new frame is captured)."""
+        self._frames = {}
+
+    def _frame(self, view: np.ndarray) -> Dict[str, Any]:
+        """Per-view cache entry: transform size, channel planes and lazily computed spectra."""
+        key = (view.__array_interface__['data'][0], view.shape, view.strides)
+        entry = self._frames.get(key)
+        if entry is None:
+            frame_h, frame_w = view.shape[:2]
+            entry = {
+                'view': view,
+                'size': (cv2.getOptimalDFTSize(frame_h), cv2.getOptimalDFTSize(frame_w)),
+                'planes': _planes(view),
+            }
+            self._frames[key] = entry
+        return entry
+
+    @staticmethod
+    def _spectrum(plane: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+        """Forward transform of a plane zero-padded to size (packed CCS format)."""
+        padded = np.zeros(size, dtype=np.float64)
+        padded[:plane.shape[0], :plane.shape[1]] = plane
+        return cv2.dft(padded)
+
+    def _frame_spectra(self, entry: Dict[str, Any], squared: bool = False) -> list:
+        """Spectra of the frame's channel planes (or of their squares), computed once."""
+        name = 'spectra_sq' if squared else 'spectra'
+        if name not in entry:
+            planes = [plane * plane for plane in entry['planes']] if squared else entry['planes']
+            entry[name] = [self._spectrum(plane, entry['size']) for plane in planes]
+        return entry[name]
+
+    def _correlate(self, frame_spectra: list, template_spectra: list, size: Tuple[int, int]) -> np.ndarray:
+        """Cross-correlation summed over channels (full transform-sized output)."""
+        total = None
+        for frame_spectrum, template_spectrum in zip(frame_spectra, template_spectra):
+            product = cv2.mulSpectrums(frame_spectrum, template_spectrum, 0, conjB=True)
+            total = product if total is None else total + product
+        return cv2.idft(total, flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+
+    def _template_entry(
+        self,
+        template: Dict[str, Any],
+        method: str,
+        size: Tuple[int, int]
+    ) -> Dict[str, Any]:
+        """Template spectra and norm for a transform size, cached in the template dict."""
+        cache = template.setdefault('fft', {})
+        key = (method, size)
+        if key not in cache:
+            planes = _planes(template[method])
+            mask = template['mask']
+            if mask is None:
+                # TM_CCOEFF: correlate with the zero-mean template
+                planes = [plane - plane.mean() for plane in planes]
+                cache[key] = {
+                    'spectra': [self._spectrum(plane, size) for plane in planes],
+                    'norm': float(np.sqrt(sum((plane * plane).sum() for plane in planes))),
+                }
+            else:
+                mask_planes = _planes(template['mask_bgr'] if method == 'color' else mask)
+                mask_planes = [(plane > 0).astype(np.float64) for plane in mask_planes]
+                masked = [plane * mask_plane for plane, mask_plane in zip(planes, mask_planes)]
+                cache[key] = {
+                    'spectra': [self._spectrum(plane, size) for plane in masked],
+                    'mask_spectra': [self._spectrum(plane, size) for plane in mask_planes],
+                    'norm': float(np.sqrt(sum((plane * plane).sum() for plane in masked))),
+                }
+        return cache[key]
+
+    def match(self, view: np.ndarray, template: Dict[str, Any], method: str) -> np.ndarray:
+        """
+        Match one template plane against a frame view.
+
+        Args:
+            view: Frame view (grayscale, color or edges; may be a crop)
+            template: Template as returned by ImageMatcher.load_template
+            method: Which view/template plane is matched
+
+        Returns:
+            float32 result map like cv2.matchTemplate's (frame - template + 1 in each dimension)
+        """
+        entry = self._frame(view)
+        size = entry['size']
+        h, w = template[method].shape[:2]
+        frame_h, frame_w = view.shape[:2]
+        out_h, out_w = frame_h - h + 1, frame_w - w + 1
+        cached = self._template_entry(template, method, size)
+
+        numerator = self._correlate(self._frame_spectra(entry), cached['spectra'], size)[:out_h, :out_w]
+
+        if template['mask'] is not None:
+            # Masked TM_CCORR_NORMED: sum(I * T * M) / (sqrt(sum(I^2 * M)) * |T * M|)
+            window = self._correlate(self._frame_spectra(entry, squared=True), cached['mask_spectra'], size)
+            window = window[:out_h, :out_w]
+            # Pixels are integers, so the masked energy is either 0 or >= 1; anything
+            # below 0.5 is transform noise over a black window and scores 0
+            result = np.zeros_like(numerator)
+            lit = window >= 0.5
+            result[lit] = numerator[lit] / (np.sqrt(window[lit]) * cached['norm'])
+            return result.astype(np.float32)
+
+        # TM_CCOEFF_NORMED, normalized the way OpenCV does it
+        if cached['norm'] < np.finfo(np.float64).eps:
+            return np.ones((out_h, out_w), dtype=np.float32)
+        if 'integral' not in entry:
+            entry['integral'] = cv2.integral2(entry['view'], sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        sums, squares = entry['integral']
+        channels = len(entry['planes'])
+        window_sum = _window_sums(sums.reshape(sums.shape[0], sums.shape[1], channels), h, w)
+        window_sq = _window_sums(squares.reshape(squares.shape[0], squares.shape[1], channels), h, w)
+        # Window variance (times N), summed over channels: sum(Q_c - S_c^2 / N)
+        variance = (window_sq - window_sum * window_sum / (h * w)).sum(axis=2)
+
+        threshold = np.sqrt(np.maximum(variance, 0)) * cached['norm']
+        result = np.zeros_like(numerator)
+        inside = np.abs(numerator) < threshold
+        result[inside] = numerator[inside] / threshold[inside]
+        clipped = ~inside & (np.abs(numerator) < threshold * 1.125)
+        result[clipped] = np.sign(numerator[clipped])
+        return result.astype(np.float32)
@@ -0,0 +1,425 @@
+"""Screen capture backends that write frames into preallocated buffers."""
+
+import os
+import re
+import subprocess
+import threading
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameViews(Mapping):
+    """
+    Color/grayscale/edge views of a frame, each derived on first access.
+
+    Lets a detection pass that only needs grayscale never pay for the
+    color plane (and vice versa).
+    """
+
+    def __init__(
+        self,
+        loaders: Dict[str, Callable[[], np.ndarray]],
+        crop: Optional[Tuple[int, int, int, int]] = None
+    ):
+        """
+        Args:
+            loaders: View name -> function producing the full view
+            crop: Optional (x0, y0, x1, y1) applied to every view
+        """
+        self._loaders = loaders
+        self._crop = crop
+        self._cache = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._cache:
+            view = self._loaders[name]()
+            if self._crop:
+                x0, y0, x1, y1 = self._crop
+                view = view[y0:y1, x0:x1]
+            self._cache[name] = view
+        return self._cache[name]
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def crop(self, x0: int, y0: int, x1: int, y1: int) -> 'FrameViews':
+        """Lazy views of a sub-rectangle (no pixels are copied)."""
+        return FrameViews({name: (lambda name=name: self[name]) for name in self._loaders}, (x0, y0, x1, y1))
+
+
+class FrameBuffers:
+    """
+    Preallocated arrays for one frame and its derived views.
+
+    Arrays are allocated once per resolution and reused for every frame, so
+    steady-state capture and matching allocate (almost) nothing per tick.
+    Anything that must outlive the current frame has to copy it.
+
+    Backends hand over the raw capture (e.g. BGRX from X11) with set_raw();
+    the color and grayscale planes are converted from it only when first
+    needed, so grayscale-only matching never produces a color plane.
+    """
+
+    def __init__(self):
+        """Initialize empty buffers (allocated on first use)."""
+        self.shape = None
+        self._bgr = None
+        self._gray = None
+        self._edges = None
+        self._raw = None
+        self._raw_codes = None
+        self._valid = set()
+        self._scratch = {}
+
+    def ensure(self, width: int, height: int):
+        """
+        Make sure the buffers match a resolution, reallocating only when it changes.
+
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+        """
+        if self.shape == (height, width):
+            return
+        self.shape = (height, width)
+        self._bgr = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._edges = np.empty((height, width), dtype=np.uint8)
+        self._scratch = {}
+        self._valid = set()
+
+    def set_raw(self, raw: np.ndarray, color_code: int, gray_code: int):
+        """
+        Use a raw capture as the current frame; planes are derived lazily.
+
+        Args:
+            raw: Captured pixels (kept by reference until the next frame)
+            color_code: cv2.cvtColor code converting raw to BGR
+            gray_code: cv2.cvtColor code converting raw to grayscale
+        """
+        self.ensure(raw.shape[1], raw.shape[0])
+        self._raw = raw
+        self._raw_codes = (color_code, gray_code)
+        self._valid = set()
+
+    def color(self) -> np.ndarray:
+        """BGR view of the current frame (converted once per frame, only if needed)."""
+        if 'color' not in self._valid:
+            cv2.cvtColor(self._raw, self._raw_codes[0], dst=self._bgr)
+            self._valid.add('color')
+        return self._bgr
+
+    def gray(self) -> np.ndarray:
+        """Grayscale view of the current frame (straight from the raw capture)."""
+        if 'grayscale' not in self._valid:
+            if 'color' in self._valid:
+                cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY, dst=self._gray)
+            else:
+                cv2.cvtColor(self._raw, self._raw_codes[1], dst=self._gray)
+            self._valid.add('grayscale')
+        return self._gray
+
+    def edges(self) -> np.ndarray:
+        """Canny edge view of the current frame (computed once per frame)."""
+        if 'edges' not in self._valid:
+            cv2.Canny(self.gray(), 50, 150, self._edges)
+            self._valid.add('edges')
+        return self._edges
+
+    def views(self) -> FrameViews:
+        """Lazy color, grayscale and edge views, as used by ImageMatcher."""
+        return FrameViews({
+            'color': self.color,
+            'grayscale': self.gray,
+            'edges': self.edges,
+        })
+
+    def scratch(self, shape: Tuple[int, ...], dtype=np.float32) -> np.ndarray:
+        """
+        Reusable scratch array (e.g. matchTemplate results), one per shape.
+
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+
+        Returns:
+            Array with undefined contents
+        """
+        key = (shape, np.dtype(dtype).str)
+        buffer = self._scratch.get(key)
+        if buffer is None:
+            buffer = np.empty(shape, dtype=dtype)
+            self._scratch[key] = buffer
+        return buffer
+
+
+class FrameSource:
+    """Base class for screen capture backends."""
+
+    name = "base"
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]], buffers: FrameBuffers):
+        """
+        Capture the screen (or a region of it) into buffers.
+
+        Implementations call buffers.set_raw() with the captured pixels;
+        color and grayscale planes are derived from them on demand.
+
+        Args:
+            region: Optional (x, y, width, height) to capture
+            buffers: Buffers to write the frame into
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release backend resources."""
+
+
+class ScreenshotFrameSource(FrameSource):
+    """
+    Capture through take_screenshot (pyautogui on X11, grim on Wayland).
+
+    The backend hands over a PIL image, so one copy out of PIL remains;
+    color and grayscale conversions write straight into the preallocated
+    buffers.
+    """
+
+    name = "screenshot"
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]], buffers: FrameBuffers):
+        from image_utils import take_screenshot
+
+        screenshot = take_screenshot(region=region)
+        if screenshot.mode != 'RGB':
+            screenshot = screenshot.convert('RGB')
+        buffers.set_raw(np.asarray(screenshot), cv2.COLOR_RGB2BGR, cv2.COLOR_RGB2GRAY)
+
+
+class XlibFrameSource(FrameSource):
+    """
+    Capture directly from the X server with python-xlib.
+
+    The raw ZPixmap data (BGRX) is viewed without copying; grayscale is
+    converted straight from it (4 bytes in, 1 out per pixel) and the BGR
+    plane only when a template needs color - no PIL image, no scrot
+    subprocess and no PNG encode/decode.
+    """
+
+    name = "xlib"
+
+    def __init__(self, display_name: Optional[str] = None):
+        """
+        Open the X display.
+
+        Args:
+            display_name: X display (default: $DISPLAY)
+        """
+        from Xlib import X, display
+
+        self._zpixmap = X.ZPixmap
+        self._display = display.Display(display_name)
+        self._root = self._display.screen().root
+        geometry = self._root.get_geometry()
+        self.screen_size = (geometry.width, geometry.height)
+
+    def _get_raw(self, region: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
+        """Fetch the region as an (h, w, 4) BGRX view over the X reply data."""
+        x, y, w, h = region or (0, 0, *self.screen_size)
+        reply = self._root.get_image(x, y, w, h, self._zpixmap, 0xffffffff)
+        data = np.frombuffer(reply.data, dtype=np.uint8)
+        if data.size < w * h * 4:
+            raise RuntimeError(f"Unsupported X visual ({reply.depth}-bit); use capture_backend: screenshot")
+        # Rows may be padded - slice them to width without copying
+        stride = data.size // h
+        return data.reshape(h, stride)[:, :w * 4].reshape(h, w, 4)
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]], buffers: FrameBuffers):
+        buffers.set_raw(self._get_raw(region), cv2.COLOR_BGRA2BGR, cv2.COLOR_BGRA2GRAY)
+
+    def close(self):
+        self._display.close()
+
+
+class FfmpegFrameSource(FrameSource):
+    """
+    Capture from a long-lived ffmpeg x11grab process streaming raw frames.
+
+    A reader thread copies frames from the pipe into a small ring of
+    preallocated slots and only ever publishes the newest one, so stale
+    frames are dropped instead of queueing up. grab() is a single memcpy
+    of the newest frame (or of the requested region of it) - no subprocess
+    or image encoding per tick.
+
+    Works against any X display, including a headless Xvfb one.
+    """
+
+    name = "ffmpeg"
+
+    # Slots in the ring: one being written, one published, one being copied by grab()
+    RING_SIZE = 3
+
+    def __init__(self, display_name: Optional[str] = None, framerate: int = 30, timeout: float = 5.0):
+        """
+        Start the ffmpeg stream.
+
+        Args:
+            display_name: X display (default: $DISPLAY)
+            framerate: Frames per second requested from ffmpeg
+            timeout: Seconds to wait for the stream to start (and for each frame)
+        """
+        self.display_name = display_name or os.environ.get('DISPLAY', ':0')
+        self.framerate = framerate
+        self.timeout = timeout
+        self.screen_size = None
+
+        self._lock = threading.Condition()
+        self._slots = []
+        self._latest = None
+        self._reading = None
+        self._frame_id = 0
+        self._error = None
+
+        self._process = subprocess.Popen(
+            self._command(), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        threading.Thread(target=self._read_log, daemon=True).start()
+        threading.Thread(target=self._read_frames, daemon=True).start()
+
+        with self._lock:
+            if not self._lock.wait_for(lambda: self._latest is not None or self._error, timeout):
+                self.close()
+                raise RuntimeError("ffmpeg did not deliver a frame in time")
+            if self._error:
+                self.close()
+                raise RuntimeError(self._error)
+
+    def _command(self) -> List[str]:
+        """ffmpeg command line streaming the whole screen as raw BGRX frames to stdout."""
+        return [
+            'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'info', '-nostats',
+            '-f', 'x11grab', '-framerate', str(self.framerate), '-draw_mouse', '0',
+            '-i', self.display_name,
+            '-pix_fmt', 'bgr0', '-f', 'rawvideo', '-',
+        ]
+
+    def _read_log(self):
+        """Drain ffmpeg's log, picking the frame size from the output stream description."""
+        size_pattern = re.compile(r'Video: rawvideo.*?, (\d+)x(\d+)')
+        last_line = ""
+        for raw_line in self._process.stderr:
+            line = raw_line.decode('utf-8', 'replace').strip()
+            last_line = line or last_line
+            match = size_pattern.search(line) if self.screen_size is None else None
+            if match:
+                width, height = int(match.group(1)), int(match.group(2))
+                with self._lock:
+                    self._slots = [np.empty((height, width, 4), dtype=np.uint8) for _ in range(self.RING_SIZE)]
+                    self.screen_size = (width, height)
+                    self._lock.notify_all()
+
+        with self._lock:
+            self._error = self._error or f"ffmpeg exited: {last_line}"
+            self._lock.notify_all()
+
+    def _read_frames(self):
+        """Read frames from the pipe into the ring, publishing each completed one as the latest."""
+        with self._lock:
+            if not self._lock.wait_for(lambda: self.screen_size is not None or self._error, self.timeout):
+                self._error = "could not determine the ffmpeg frame size"
+            if self._error:
+                self._lock.notify_all()
+                return
+
+        stdout = self._process.stdout
+        while True:
+            with self._lock:
+                slot = next(i for i in range(self.RING_SIZE) if i not in (self._latest, self._reading))
+            data = memoryview(self._slots[slot]).cast('B')
+
+            filled = 0
+            while filled < len(data):
+                count = stdout.readinto(data[filled:])
+                if not count:
+                    return  # Stream ended; _read_log reports why
+                filled += count
+
+            with self._lock:
+                self._latest = slot
+                self._frame_id += 1
+                self._lock.notify_all()
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]], buffers: FrameBuffers):
+        with self._lock:
+            if self._error:
+                raise RuntimeError(self._error)
+            self._reading = self._latest
+        try:
+            frame = self._slots[self._reading]
+            if region:
+                x, y, w, h = region
+                frame = frame[y:y + h, x:x + w]
+            # Copy out of the ring; the slot gets reused for a newer frame
+            raw = buffers.scratch(frame.shape, np.uint8)
+            np.copyto(raw, frame)
+        finally:
+            with self._lock:
+                self._reading = None
+        buffers.set_raw(raw, cv2.COLOR_BGRA2BGR, cv2.COLOR_BGRA2GRAY)
+
+    def wait_for_frame(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a frame newer than the current latest one arrives.
+
+        Args:
+            timeout: Seconds to wait (default: the source's timeout)
+
+        Returns:
+            True if a new frame arrived
+        """
+        with self._lock:
+            frame_id = self._frame_id
+            self._lock.wait_for(lambda: self._frame_id != frame_id or self._error, timeout or self.timeout)
+            return self._frame_id != frame_id
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+
+def create_frame_source(backend: str = "auto") -> FrameSource:
+    """
+    Create a capture backend.
+
+    Args:
+        backend: 'xlib', 'ffmpeg', 'screenshot' or 'auto' (xlib on X11 when
+                 available, otherwise take_screenshot)
+
+    Returns:
+        FrameSource instance
+    """
+    if backend == "screenshot":
+        return ScreenshotFrameSource()
+    if backend == "xlib":
+        return XlibFrameSource()
+    if backend == "ffmpeg":
+        return FfmpegFrameSource()
+    if backend != "auto":
+        raise ValueError(f"Unknown capture backend: {backend}")
+
+    session_type = os.environ.get('XDG_SESSION_TYPE', '').lower()
+    if session_type != 'wayland' and os.environ.get('DISPLAY'):
+        try:
+            return XlibFrameSource()
+        except Exception as e:
+            print(f"Xlib capture unavailable ({e}), falling back to screenshots")
+    return ScreenshotFrameSource()
@@ -4,8 +4,12 @@ import cv2
 import numpy as np
 import pyautogui
 import os
-from typing import Optional, Tuple
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from pathlib import Path
+from frame_source import FrameBuffers, FrameSource, FrameViews, create_frame_source
+from fft_matching import FFTCorrelator
+from orb_matching import ORBMatcher
 
 
 def take_screenshot(region: Optional[Tuple[int, int, int, int]] = None):
@@ -35,29 +39,174 @@ def take_screenshot(region: Optional[Tuple[int, int, int, int]] = None):
     return pyautogui.screenshot(region=region)
 
 
+def build_frame_views(screenshot_cv: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Build the color, grayscale and edge views used for matching.
+
+    Args:
+        screenshot_cv: BGR screenshot
+
+    Returns:
+        Dict with 'color', 'grayscale' and 'edges' images
+    """
+    screenshot_gray = cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY)
+    return {
+        'color': screenshot_cv,
+        'grayscale': screenshot_gray,
+        'edges': cv2.Canny(screenshot_gray, 50, 150),
+    }
+
+
+def opencl_available() -> bool:
+    """
+    Enable OpenCV's OpenCL path if a usable device exists.
+
+    Returns:
+        True if cv2.UMat operations will run through OpenCL
+    """
+    try:
+        if not cv2.ocl.haveOpenCL():
+            return False
+        cv2.ocl.setUseOpenCL(True)
+        return cv2.ocl.useOpenCL()
+    except cv2.error:
+        return False
+
+
+def signature_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Mean absolute difference between two frame signatures (0-255).
+
+    Args:
+        a: Signature from ImageMatcher.frame_signature
+        b: Signature from ImageMatcher.frame_signature
+
+    Returns:
+        Average per-pixel gray level difference
+    """
+    return float(cv2.absdiff(a, b).mean())
+
+
 class ImageMatcher:
     """Handles image matching and screen recognition."""
 
-    def __init__(self, confidence: float = 0.8):
+    # Matching methods tried for every template, in order
+    METHODS = ('grayscale', 'color', 'edges')
+    # Per-template 'engine' setting: spatial cv2.matchTemplate, FFT correlation or ORB keypoints
+    ENGINES = ('template', 'fft', 'orb')
+
+    # (width, height) of frame signatures used to detect screen changes
+    SIGNATURE_SIZE = (64, 36)
+
+    def __init__(
+        self,
+        confidence: float = 0.8,
+        template_settings: Optional[Dict[str, Dict[str, Any]]] = None,
+        frame_source: Optional[FrameSource] = None,
+        methods: Optional[Sequence[str]] = None,
+        capture_rois: bool = False,
+        roi_padding: int = 40,
+        roi_full_scan_interval: float = 30.0,
+        use_opencl: bool = False
+    ):
         """
         Initialize the image matcher.
 
         Args:
             confidence: Minimum confidence threshold for matches (0.0 to 1.0)
+            template_settings: Optional per-template overrides keyed by template file name.
+                Supported keys:
+                  confidence - threshold for this template (overrides the global one)
+                  methods    - subset of METHODS to run (default: all of them)
+                  mask       - mask image (relative to the template's folder) or a list of
+                               [x, y, w, h] rectangles to ignore inside the template
+                  requires   - templates that must also be visible for a match to count;
+                               each entry is a file name or {template, region} where region
+                               is [dx, dy, w, h] relative to this template's match
+                  roi        - [x, y, w, h] (relative to the search region) where the template
+                               can appear; only that area is searched
+                  engine     - 'template' (cv2.matchTemplate, default), 'fft' (correlation
+                               against a frame spectrum shared by all 'fft' templates) or
+                               'orb' (keypoint matching, robust to scaling; falls back to
+                               'template' for templates with too few keypoints)
+            frame_source: Capture backend (default: picked automatically on first capture)
+            methods: Default methods for templates without a 'methods' setting (default: all).
+                Without 'color', frames are only ever converted to grayscale.
+            capture_rois: Capture only the ROIs of templates instead of the whole region.
+                Templates without a configured 'roi' learn one from their first full-frame match.
+            roi_padding: Pixels added around a learned ROI on every side
+            roi_full_scan_interval: Seconds after which a template with a learned ROI is
+                searched in the full frame once more (in case the button moved)
+            use_opencl: Match through OpenCV's OpenCL path (cv2.UMat), keeping frames and
+                templates on the OpenCL device. Falls back to NumPy when no device exists.
         """
+        unknown = set(methods or []) - set(self.METHODS)
+        if unknown:
+            raise ValueError(f"Unknown matching methods: {sorted(unknown)}")
+
         self.confidence = confidence
+        self.template_settings = template_settings or {}
+        self.frame_source = frame_source
+        self.methods = tuple(methods or self.METHODS)
+        self.capture_rois = capture_rois
+        self.roi_padding = roi_padding
+        self.roi_full_scan_interval = roi_full_scan_interval
+        self.use_opencl = use_opencl and opencl_available()
+        if use_opencl and not self.use_opencl:
+            print("OpenCL not available, matching on the CPU")
+        self._umat_views = {}
+        self._fft = FFTCorrelator()
+        self._orb = ORBMatcher()
+        self._buffers = FrameBuffers()
+        self._roi_buffers = {}
+        self._roi_views = {}
+        self._learned_rois = {}
+        self._last_full_scan = {}
         self._screenshot_cache = None
         self._cache_region = None
+        self._frame_views = {}
+        self._match_cache = {}
+        self._accepted_matches = {}
+        self._template_cache = {}
+        self._pinned_frame = None
 
     def clear_cache(self):
         """Clear the screenshot cache."""
+        if self._pinned_frame is not None:
+            # Same frame until set_frame() is called again - cached results stay valid
+            return
         self._screenshot_cache = None
         self._cache_region = None
+        self._frame_views = {}
+        self._roi_views = {}
+        self._umat_views = {}
+        self._fft.clear()
+        self._orb.clear()
+        self._match_cache = {}
+        self._accepted_matches = {}
+
+    def set_frame(self, screenshot_cv: Optional[np.ndarray], views: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Match against a given frame (e.g. a saved screenshot) instead of capturing.
+
+        Args:
+            screenshot_cv: BGR frame to use, or None to go back to live capture
+            views: Optional precomputed views of the frame (see build_frame_views)
+        """
+        self._pinned_frame = None
+        self.clear_cache()
+        if screenshot_cv is not None:
+            self._pinned_frame = screenshot_cv
+            self._frame_views = views or {}
 
     def _get_screenshot(self, region: Optional[Tuple[int, int, int, int]] = None, grayscale: bool = True):
         """
         Get screenshot with caching support.
 
+        Live frames are captured into preallocated buffers that are reused
+        for every frame; callers that keep a frame beyond the current
+        detection cycle must copy it. Only the requested plane is converted.
+
         Args:
             region: Optional region to capture
             grayscale: Whether to convert to grayscale
@@ -65,27 +214,468 @@ class ImageMatcher:
         Returns:
             OpenCV format screenshot (BGR or GRAY)
         """
-        # Cache key includes both region and grayscale setting
-        cache_key = (region, grayscale)
+        if self._pinned_frame is not None:
+            # Pinned frames are already cropped to the region
+            if grayscale:
+                return self.get_frame_views(region)['grayscale']
+            return self._pinned_frame
+
+        self._capture(region)
+        return self._buffers.gray() if grayscale else self._buffers.color()
+
+    def _capture(self, region: Optional[Tuple[int, int, int, int]] = None):
+        """Capture a new frame into the buffers unless the current one is still valid."""
+        if self._screenshot_cache is not None and self._cache_region == region:
+            return
+
+        if self.frame_source is None:
+            self.frame_source = create_frame_source()
+
+        # Derived views and match results belong to the old frame (ROI results
+        # from this detection cycle, taken before the first full capture, stay valid)
+        if self._screenshot_cache is not None:
+            self._match_cache = {}
+            self._accepted_matches = {}
+            self._roi_views = {}
+
+        self.frame_source.grab(region, self._buffers)
+        self._screenshot_cache = self._buffers  # The frame itself lives in the buffers
+        self._cache_region = region
+        self._frame_views = {}
+        self._umat_views = {}
+        self._fft.clear()
+        self._orb.clear()
+
+    def _get_roi_views(
+        self,
+        region: Optional[Tuple[int, int, int, int]],
+        sub_region: Tuple[int, int, int, int]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Capture just one rectangle of the search region (once per detection cycle).
 
-        # Check if we can use cached screenshot
-        if self._screenshot_cache is not None and self._cache_region == cache_key:
-            return self._screenshot_cache
+        Each ROI keeps its own preallocated buffers, so ROI captures are as
+        allocation-free as full ones.
 
-        # Take new screenshot
-        screenshot = take_screenshot(region=region)
-        screenshot_np = np.array(screenshot)
-        screenshot_cv = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR)
+        Args:
+            region: Search region (absolute screen coordinates) or None for the full screen
+            sub_region: (x, y, w, h) relative to the search region, already clamped
+
+        Returns:
+            Lazy views of the captured rectangle
+        """
+        if sub_region not in self._roi_views:
+            origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+            x, y, w, h = sub_region
+            absolute = (origin_x + x, origin_y + y, w, h)
+
+            if self.frame_source is None:
+                self.frame_source = create_frame_source()
+            buffers = self._roi_buffers.setdefault(sub_region, FrameBuffers())
+            self.frame_source.grab(absolute, buffers)
+            self._roi_views[sub_region] = buffers.views()
+        return self._roi_views[sub_region]
+
+    def get_roi(self, template_path: str) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Get the area a template is searched in (relative to the search region).
 
-        # Convert to grayscale if requested
-        if grayscale:
-            screenshot_cv = cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY)
+        Args:
+            template_path: Path to the template image
+
+        Returns:
+            (x, y, w, h) from the 'roi' setting or learned from an earlier match,
+            or None to search the whole region
+        """
+        roi = self.get_template_settings(template_path).get('roi')
+        if roi:
+            return tuple(roi)
+        return self._learned_rois.get(template_path) if self.capture_rois else None
 
-        # Cache it
-        self._screenshot_cache = screenshot_cv
-        self._cache_region = cache_key
+    def forget_rois(self):
+        """Drop learned regions of interest so every template is searched in the whole region again."""
+        self._learned_rois = {}
+        self._last_full_scan = {}
+
+    def _learn_roi(
+        self,
+        template_path: str,
+        match: Tuple[int, int, int, int],
+        frame_size: Tuple[int, int]
+    ):
+        """Remember where a template was found (padded) so later searches can capture only that area."""
+        x, y, w, h = match
+        pad = self.roi_padding
+        frame_w, frame_h = frame_size
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(frame_w, x + w + pad), min(frame_h, y + h + pad)
+        self._learned_rois[template_path] = (x0, y0, x1 - x0, y1 - y0)
+
+    def get_frame_views(self, region: Optional[Tuple[int, int, int, int]] = None) -> Dict[str, np.ndarray]:
+        """
+        Get the color, grayscale and edge views of the current frame.
+
+        Each view is computed once per frame, on first use, and shared by
+        every template - a pass that only uses grayscale never converts the
+        frame to color.
+
+        Args:
+            region: Optional region to capture
+
+        Returns:
+            Mapping with 'color', 'grayscale' and 'edges' images
+        """
+        if self._pinned_frame is not None:
+            if not self._frame_views:
+                self._frame_views = build_frame_views(self._pinned_frame)
+            return self._frame_views
+
+        self._capture(region)
+        if not self._frame_views:
+            self._frame_views = self._buffers.views()
+        return self._frame_views
+
+    def get_template_settings(self, template_path: str) -> Dict[str, Any]:
+        """Get the per-template settings for a template (empty dict if none)."""
+        return self.template_settings.get(Path(template_path).name, {})
+
+    def get_confidence(self, template_path: str) -> float:
+        """Get the confidence threshold that applies to a template."""
+        return self.get_template_settings(template_path).get('confidence', self.confidence)
+
+    def _load_mask(self, template_path: str, template: np.ndarray, alpha: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Build the match mask for a template.
+
+        Transparent pixels of the template are always masked out. The 'mask'
+        setting can add a mask image (white = compare, black = ignore) or a
+        list of [x, y, w, h] rectangles to ignore.
+
+        Returns:
+            uint8 mask (255 = compare) or None if every pixel is compared
+        """
+        h, w = template.shape[:2]
+        mask = None
+
+        if alpha is not None and alpha.min() < 255:
+            mask = np.where(alpha > 0, 255, 0).astype(np.uint8)
+
+        mask_setting = self.get_template_settings(template_path).get('mask')
+        if isinstance(mask_setting, str):
+            mask_path = Path(template_path).parent / mask_setting
+            mask_img = cv2.imread(str(mask_path), cv2.IMREAD_GRAYSCALE)
+            if mask_img is None:
+                raise ValueError(f"Could not load mask: {mask_path}")
+            if mask_img.shape != (h, w):
+                raise ValueError(f"Mask {mask_path} does not match template size {w}x{h}")
+            mask_img = np.where(mask_img > 127, 255, 0).astype(np.uint8)
+            mask = mask_img if mask is None else cv2.bitwise_and(mask, mask_img)
+        elif mask_setting:
+            if mask is None:
+                mask = np.full((h, w), 255, dtype=np.uint8)
+            for x, y, rw, rh in mask_setting:
+                mask[y:y + rh, x:x + rw] = 0
+
+        return mask
+
+    def load_template(self, template_path: str) -> Dict[str, Any]:
+        """
+        Load a template and its derived images (cached per path).
+
+        Returns:
+            Dict with 'color', 'grayscale', 'edges' images, an optional 'mask',
+            the 'methods' to run (None = all) and the matching 'engine'
+        """
+        if template_path in self._template_cache:
+            return self._template_cache[template_path]
+
+        raw = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+        if raw is None:
+            raise ValueError(f"Could not load template: {template_path}")
+
+        alpha = None
+        if raw.ndim == 2:
+            template = cv2.cvtColor(raw, cv2.COLOR_GRAY2BGR)
+        elif raw.shape[2] == 4:
+            template = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR)
+            alpha = raw[:, :, 3]
+        else:
+            template = raw
+
+        template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        mask = self._load_mask(template_path, template, alpha)
+        template_edges = cv2.Canny(template_gray, 50, 150)
+        if mask is not None:
+            template_edges = cv2.bitwise_and(template_edges, mask)
+
+        methods = self.get_template_settings(template_path).get('methods')
+        unknown = set(methods or []) - set(self.METHODS)
+        if unknown:
+            raise ValueError(f"Unknown matching methods for {template_path}: {sorted(unknown)}")
+        engine = self.get_template_settings(template_path).get('engine', 'template')
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown matching engine for {template_path}: {engine}")
+
+        loaded = {
+            'color': template,
+            'grayscale': template_gray,
+            'edges': template_edges,
+            'mask': mask,
+            'mask_bgr': cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR) if mask is not None else None,
+            'methods': methods,
+            'engine': engine,
+        }
+        self._template_cache[template_path] = loaded
+        return loaded
+
+    def score_views(
+        self,
+        views: Dict[str, np.ndarray],
+        template: Dict[str, Any],
+        methods: Optional[Sequence[str]] = None
+    ) -> List[Tuple[str, float, Tuple[int, int]]]:
+        """
+        Run every matching method of a template against a set of frame views.
+
+        Unmasked templates use TM_CCOEFF_NORMED; masked templates use
+        TM_CCORR_NORMED, which supports masks for both gray and color input.
+
+        Args:
+            views: Frame views as returned by get_frame_views
+            template: Template as returned by load_template
+            methods: Methods to run (default: the template's 'methods' setting, else self.methods)
+
+        Returns:
+            List of (method, score, (x, y)), empty if the template does not fit
+        """
+        frame_h, frame_w = views['grayscale'].shape[:2]
+        h, w = template['grayscale'].shape[:2]
+        if h > frame_h or w > frame_w:
+            return []
+
+        if template['engine'] == 'fft':
+            return self._score_views_fft(views, template, methods)
+        if template['engine'] == 'orb' and self._orb.usable(template):
+            # Keypoints come from the grayscale view only; the location is a full (x, y, w, h) box
+            score, box = self._orb.match(views['grayscale'], template)
+            return [('grayscale', score, box)]
+        if self.use_opencl:
+            return self._score_views_opencl(views, template, methods)
+
+        mask = template['mask']
+        methods_results = []
+        # All methods produce a result of the same size - reuse one scratch array
+        result = self._buffers.scratch((frame_h - h + 1, frame_w - w + 1))
+
+        for method in methods or template.get('methods') or self.methods:
+            if mask is None:
+                cv2.matchTemplate(views[method], template[method], cv2.TM_CCOEFF_NORMED, result)
+            else:
+                method_mask = template['mask_bgr'] if method == 'color' else mask
+                cv2.matchTemplate(views[method], template[method], cv2.TM_CCORR_NORMED, result, method_mask)
+                # Flat frame areas divide by zero under a mask
+                np.nan_to_num(result, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            methods_results.append((method, max_val, max_loc))
+
+        return methods_results
+
+    def _score_views_fft(
+        self,
+        views: Dict[str, np.ndarray],
+        template: Dict[str, Any],
+        methods: Optional[Sequence[str]] = None
+    ) -> List[Tuple[str, float, Tuple[int, int]]]:
+        """score_views through the FFT engine (frame spectra are shared by all templates)."""
+        methods_results = []
+        for method in methods or template.get('methods') or self.methods:
+            result = self._fft.match(views[method], template, method)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            methods_results.append((method, max_val, max_loc))
+        return methods_results
+
+    def _umat_view(self, views: Dict[str, np.ndarray], method: str) -> 'cv2.UMat':
+        """
+        OpenCL copy of a frame view, uploaded once per frame.
+
+        Views are keyed by the address and shape of their pixels, so crops of
+        the same frame get their own entry and the uploads are dropped
+        whenever a new frame is captured. Edges are computed on the device
+        from the uploaded grayscale view.
+        """
+        source = views['grayscale'] if method == 'edges' else views[method]
+        key = (method, source.__array_interface__['data'][0], source.shape, source.strides)
+        umat = self._umat_views.get(key)
+        if umat is None:
+            if method == 'edges':
+                umat = cv2.Canny(self._umat_view(views, 'grayscale'), 50, 150)
+            else:
+                umat = cv2.UMat(np.ascontiguousarray(source))
+            self._umat_views[key] = umat
+        return umat
+
+    def _score_views_opencl(
+        self,
+        views: Dict[str, np.ndarray],
+        template: Dict[str, Any],
+        methods: Optional[Sequence[str]] = None
+    ) -> List[Tuple[str, float, Tuple[int, int]]]:
+        """score_views on OpenCL: frames and templates stay on the device, only maxima come back."""
+        if 'umat' not in template:
+            template['umat'] = {name: cv2.UMat(template[name]) for name in self.METHODS}
+            if template['mask'] is not None:
+                template['umat']['mask'] = cv2.UMat(template['mask'])
+                template['umat']['mask_bgr'] = cv2.UMat(template['mask_bgr'])
+        device = template['umat']
+
+        methods_results = []
+        for method in methods or template.get('methods') or self.methods:
+            frame_view = self._umat_view(views, method)
+            if template['mask'] is None:
+                result = cv2.matchTemplate(frame_view, device[method], cv2.TM_CCOEFF_NORMED)
+            else:
+                method_mask = device['mask_bgr'] if method == 'color' else device['mask']
+                # NaNs from flat areas have to be cleared on the host
+                result = cv2.matchTemplate(frame_view, device[method], cv2.TM_CCORR_NORMED, mask=method_mask).get()
+                np.nan_to_num(result, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            methods_results.append((method, max_val, max_loc))
+
+        return methods_results
+
+    def _match_template(
+        self,
+        template_path: str,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        sub_region: Optional[Tuple[int, int, int, int]] = None
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Match a template against the current frame, without requirement checks.
 
-        return screenshot_cv
+        Results are cached per frame, so templates that are checked again
+        (e.g. as a requirement of another template) cost nothing extra.
+
+        Args:
+            template_path: Path to the template image
+            region: Capture region of the frame
+            sub_region: Optional (x, y, w, h) inside the frame to restrict the search to; with
+                capture_rois only this rectangle is captured (unless the full frame already was)
+
+        Returns:
+            (x, y, width, height) in frame coordinates if matched, None otherwise
+        """
+        cache_key = (template_path, sub_region)
+        if cache_key in self._match_cache:
+            return self._match_cache[cache_key]
+
+        offset_x = offset_y = 0
+        if sub_region is None:
+            views = self.get_frame_views(region)
+        else:
+            # Clamp to the search region (its size is known up front when one is configured)
+            offset_x = max(0, sub_region[0])
+            offset_y = max(0, sub_region[1])
+            end_x = sub_region[0] + sub_region[2]
+            end_y = sub_region[1] + sub_region[3]
+            if region:
+                end_x = min(end_x, region[2])
+                end_y = min(end_y, region[3])
+
+            frame_ready = self._pinned_frame is not None or self._screenshot_cache is not None
+            rect = (offset_x, offset_y, end_x - offset_x, end_y - offset_y)
+            roi_wanted = self.capture_rois or rect in self._roi_views  # e.g. already grabbed by area_signature
+            if roi_wanted and not frame_ready and end_x > offset_x and end_y > offset_y:
+                # Grab just this rectangle instead of the whole region
+                views = self._get_roi_views(region, rect)
+            else:
+                full_views = self.get_frame_views(region)
+                frame_h, frame_w = full_views['grayscale'].shape[:2]
+                views = FrameViews({name: (lambda name=name: full_views[name]) for name in full_views},
+                                   (offset_x, offset_y, min(frame_w, end_x), min(frame_h, end_y)))
+
+        template = self.load_template(template_path)
+        methods_results = self.score_views(views, template)
+
+        match = None
+        if methods_results:
+            # Use the best result from all methods
+            best_method, max_val, max_loc = max(methods_results, key=lambda x: x[1])
+
+            # For debugging: show which method worked
+            # print(f"  {template_path}: {best_method}={max_val:.3f}")
+
+            # Check if confidence threshold is met
+            if max_val >= self.get_confidence(template_path):
+                # ORB reports the box it found (possibly scaled); the others the top-left corner
+                w, h = max_loc[2:] if len(max_loc) == 4 else template['grayscale'].shape[1::-1]
+                match = (max_loc[0] + offset_x, max_loc[1] + offset_y, w, h)
+
+        self._match_cache[cache_key] = match
+        return match
+
+    def cache_match(self, template_path: str, match: Optional[Tuple[int, int, int, int]]):
+        """
+        Record an externally computed match result for the current frame.
+
+        Lets tools that already scored a template on this frame (e.g. batch
+        debugging) run the detector without matching the template again.
+        Requirements are still checked when the template is looked up.
+
+        Args:
+            template_path: Path to the template image
+            match: (x, y, width, height) in frame coordinates, or None if not found
+        """
+        self._match_cache[(template_path, None)] = match
+        # find_on_screen searches the template's region of interest when it has one
+        roi = self.get_roi(template_path)
+        if roi is not None:
+            self._match_cache[(template_path, roi)] = match
+
+    def matched_templates(self) -> Dict[str, List[int]]:
+        """
+        Templates found by find_on_screen on the current frame so far.
+
+        Only matches that passed their 'requires' check are included.
+
+        Returns:
+            Dict of template file name -> [x, y, width, height] in frame coordinates
+        """
+        return {Path(template_path).name: list(match)
+                for template_path, match in self._accepted_matches.items()}
+
+    def _requirements_met(
+        self,
+        template_path: str,
+        match: Tuple[int, int, int, int],
+        region: Optional[Tuple[int, int, int, int]] = None
+    ) -> bool:
+        """
+        Check the 'requires' setting of a matched template against the same frame.
+
+        Args:
+            template_path: Path of the matched template
+            match: Match of the template in frame coordinates
+            region: Capture region of the frame
+
+        Returns:
+            True if every required template is also present
+        """
+        template_dir = Path(template_path).parent
+        for requirement in self.get_template_settings(template_path).get('requires', []):
+            if isinstance(requirement, str):
+                requirement = {'template': requirement}
+
+            required_path = str(template_dir / requirement['template'])
+
+            sub_region = self.get_roi(required_path)
+            if requirement.get('region'):
+                dx, dy, w, h = requirement['region']
+                sub_region = (match[0] + dx, match[1] + dy, w, h)
+
+            if not self._match_template(required_path, region, sub_region):
+                return False
+
+        return True
 
     def find_on_screen(
         self,
@@ -105,59 +695,119 @@ class ImageMatcher:
             Tuple of (x, y, width, height) if found, None otherwise
         """
         try:
-            # Get screenshot (always get color version for multi-method matching)
-            screenshot_cv = self._get_screenshot(region, grayscale=False)
-
-            # Load template
-            template = cv2.imread(template_path)
-            if template is None:
-                raise ValueError(f"Could not load template: {template_path}")
-
-            # Try multiple matching methods and take the best result
-            methods_results = []
-
-            # Method 1: Grayscale matching (good for brightness-independent matching)
-            screenshot_gray = cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY)
-            template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
-            result_gray = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
-            _, max_val_gray, _, max_loc_gray = cv2.minMaxLoc(result_gray)
-            methods_results.append(('grayscale', max_val_gray, max_loc_gray))
-
-            # Method 2: Color matching (good for colored buttons)
-            result_color = cv2.matchTemplate(screenshot_cv, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val_color, _, max_loc_color = cv2.minMaxLoc(result_color)
-            methods_results.append(('color', max_val_color, max_loc_color))
-
-            # Method 3: Edge detection matching (good for shape-based matching)
-            screenshot_edges = cv2.Canny(screenshot_gray, 50, 150)
-            template_edges = cv2.Canny(template_gray, 50, 150)
-            result_edges = cv2.matchTemplate(screenshot_edges, template_edges, cv2.TM_CCOEFF_NORMED)
-            _, max_val_edges, _, max_loc_edges = cv2.minMaxLoc(result_edges)
-            methods_results.append(('edges', max_val_edges, max_loc_edges))
+            roi = self.get_roi(template_path)
+            if roi and template_path in self._learned_rois:
+                # Re-check the whole region now and then in case the button moved
+                last_scan = self._last_full_scan.get(template_path, 0.0)
+                if time.monotonic() - last_scan >= self.roi_full_scan_interval:
+                    roi = None
+
+            match = self._match_template(template_path, region, roi)
+            if roi is None and self.capture_rois:
+                self._last_full_scan[template_path] = time.monotonic()
+                if match and not self.get_template_settings(template_path).get('roi'):
+                    frame_h, frame_w = self.get_frame_views(region)['grayscale'].shape[:2]
+                    self._learn_roi(template_path, match, (frame_w, frame_h))
+
+            if match is None or not self._requirements_met(template_path, match, region):
+                return None
+            self._accepted_matches[template_path] = match
 
-            # Use the best result from all methods
-            best_method, max_val, max_loc = max(methods_results, key=lambda x: x[1])
+            x, y, w, h = match
 
-            # For debugging: show which method worked
-            # print(f"  {template_path}: {best_method}={max_val:.3f}")
+            # Adjust coordinates if region was specified
+            if region:
+                x += region[0]
+                y += region[1]
 
-            # Check if confidence threshold is met
-            if max_val >= self.confidence:
-                x, y = max_loc
-                h, w = template.shape[:2]
+            return (x, y, w, h)
 
-                # Adjust coordinates if region was specified
-                if region:
-                    x += region[0]
-                    y += region[1]
+        except Exception as e:
+            print(f"Error finding image: {e}")
+            return None
 
-                return (x, y, w, h)
+    def area_signature(
+        self,
+        region: Optional[Tuple[int, int, int, int]],
+        area: Tuple[int, int, int, int],
+        size: Tuple[int, int] = (24, 12)
+    ) -> np.ndarray:
+        """
+        Tiny grayscale thumbnail of one area, grabbing only that area.
 
-            return None
+        Unlike frame_signature this never captures the whole region (unless
+        a full frame is already cached this cycle), whatever capture_rois is.
 
-        except Exception as e:
-            print(f"Error finding image: {e}")
+        Args:
+            region: Capture region
+            area: (x, y, w, h) inside the frame
+            size: (width, height) of the thumbnail
+
+        Returns:
+            uint8 array (compare with signature_distance)
+        """
+        x0, y0 = max(0, area[0]), max(0, area[1])
+        x1, y1 = area[0] + area[2], area[1] + area[3]
+        if region:
+            x1, y1 = min(x1, region[2]), min(y1, region[3])
+
+        if self._pinned_frame is not None or self._screenshot_cache is not None:
+            gray = self.get_frame_views(region)['grayscale'][y0:y1, x0:x1]
+        else:
+            gray = self._get_roi_views(region, (x0, y0, x1 - x0, y1 - y0))['grayscale']
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def find_in_area(
+        self,
+        template_path: str,
+        region: Optional[Tuple[int, int, int, int]],
+        area: Tuple[int, int, int, int]
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Find a template inside one small area of the frame only.
+
+        With capture_rois (and no full frame captured yet this cycle) only
+        the area itself is grabbed.
+
+        Args:
+            template_path: Path to the template image
+            region: Capture region
+            area: (x, y, w, h) inside the frame to search
+
+        Returns:
+            Tuple of (x, y, width, height) in screen coordinates if found, None otherwise
+        """
+        match = self._match_template(template_path, region, area)
+        if match is None:
             return None
+        x, y, w, h = match
+        if region:
+            x += region[0]
+            y += region[1]
+        return (x, y, w, h)
+
+    def frame_signature(
+        self,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        sub_region: Optional[Tuple[int, int, int, int]] = None
+    ) -> np.ndarray:
+        """
+        Small grayscale thumbnail of the current frame, for cheap change detection.
+
+        Uses the cached frame if one was already captured this cycle.
+
+        Args:
+            region: Capture region
+            sub_region: Optional (x, y, w, h) inside the frame to summarize instead
+
+        Returns:
+            SIGNATURE_SIZE uint8 array (compare with signature_distance)
+        """
+        gray = self.get_frame_views(region)['grayscale']
+        if sub_region:
+            x, y, w, h = sub_region
+            gray = gray[max(0, y):y + h, max(0, x):x + w]
+        return cv2.resize(gray, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
 
     def find_center(
         self,
@@ -187,34 +837,37 @@ class ImageMatcher:
     def wait_for_image(
         self,
         template_path: str,
-        timeout: int = 10,
+        timeout: float = 10,
         check_interval: float = 0.5,
         region: Optional[Tuple[int, int, int, int]] = None
     ) -> Optional[Tuple[int, int, int, int]]:
         """
         Wait for an image to appear on screen.
 
+        The timeout is a deadline on the monotonic clock, so slow matching
+        does not stretch it.
+
         Args:
             template_path: Path to the template image
             timeout: Maximum time to wait in seconds
-            check_interval: Time between checks in seconds
+            check_interval: Time between the starts of two checks in seconds
             region: Optional region to search
 
         Returns:
             Match location if found within timeout, None otherwise
         """
-        import time
-
-        elapsed = 0
-        while elapsed < timeout:
+        deadline = time.monotonic() + timeout
+        while True:
+            poll_start = time.monotonic()
+            self.clear_cache()
             match = self.find_on_screen(template_path, region)
             if match:
                 return match
 
-            time.sleep(check_interval)
-            elapsed += check_interval
-
-        return None
+            now = time.monotonic()
+            if now >= deadline:
+                return None
+            time.sleep(max(0.0, min(poll_start + check_interval, deadline) - now))
 
 
 def save_screenshot(filename: str, region: Optional[Tuple[int, int, int, int]] = None):
@@ -0,0 +1,119 @@
+"""Mouse input backends used to click buttons."""
+
+import os
+from typing import Optional
+
+
+class FailSafeError(Exception):
+    """Raised when the mouse is in the top-left corner (emergency stop)."""
+
+
+class InputBackend:
+    """Base class for input injection backends."""
+
+    name = "base"
+
+    def click(self, x: int, y: int):
+        """
+        Left-click at a screen position.
+
+        Args:
+            x: X coordinate
+            y: Y coordinate
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release backend resources."""
+
+
+class PyAutoGUIInput(InputBackend):
+    """Click through PyAutoGUI (works on X11, Windows and macOS)."""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        """Configure PyAutoGUI's fail-safe and per-call pause."""
+        import pyautogui
+
+        self._pyautogui = pyautogui
+        pyautogui.FAILSAFE = True  # Move mouse to top-left corner to abort
+        pyautogui.PAUSE = 0.1
+
+    def click(self, x: int, y: int):
+        try:
+            self._pyautogui.click(x, y)
+        except self._pyautogui.FailSafeException as e:
+            # Same stop as the XTest backend's corner check
+            raise FailSafeError("Mouse moved to the top-left corner - stopping") from e
+
+
+class XTestInput(InputBackend):
+    """
+    Inject clicks directly with the X11 XTEST extension (python-xlib).
+
+    Sends motion, press and release in one round trip to the X server,
+    without PyAutoGUI's per-call pause. Keeps PyAutoGUI's fail-safe:
+    moving the mouse to the top-left corner stops the automation.
+    """
+
+    name = "xtest"
+
+    def __init__(self, display_name: Optional[str] = None):
+        """
+        Open the X display and check for the XTEST extension.
+
+        Args:
+            display_name: X display (default: $DISPLAY)
+        """
+        from Xlib import X, display
+        from Xlib.ext import xtest
+
+        self._X = X
+        self._xtest = xtest
+        self._display = display.Display(display_name)
+        if not self._display.has_extension('XTEST'):
+            self._display.close()
+            raise RuntimeError("X server does not support the XTEST extension")
+        self._root = self._display.screen().root
+
+    def click(self, x: int, y: int):
+        pointer = self._root.query_pointer()
+        if (pointer.root_x, pointer.root_y) == (0, 0):
+            raise FailSafeError("Mouse moved to the top-left corner - stopping")
+
+        X = self._X
+        self._xtest.fake_input(self._display, X.MotionNotify, x=int(x), y=int(y))
+        self._xtest.fake_input(self._display, X.ButtonPress, 1)
+        self._xtest.fake_input(self._display, X.ButtonRelease, 1)
+        self._display.sync()
+
+    def close(self):
+        self._display.close()
+
+
+def create_input_backend(backend: str = "auto") -> InputBackend:
+    """
+    Create an input backend.
+
+    Args:
+        backend: 'xtest', 'pyautogui' or 'auto' (xtest on X11 when available,
+                 otherwise pyautogui)
+
+    Returns:
+        InputBackend instance
+    """
+    if backend == "pyautogui":
+        return PyAutoGUIInput()
+    if backend == "xtest":
+        return XTestInput()
+    if backend != "auto":
+        raise ValueError(f"Unknown input backend: {backend}")
+
+    session_type = os.environ.get('XDG_SESSION_TYPE', '').lower()
+    if session_type != 'wayland' and os.environ.get('DISPLAY'):
+        try:
+            return XTestInput()
+        except Exception as e:
+            print(f"XTest input unavailable ({e}), falling back to PyAutoGUI")
+    return PyAutoGUIInput()
@@ -0,0 +1,159 @@
+"""ORB keypoint matching: one frame feature extraction serves every template."""
+
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# FLANN index parameters for binary (ORB) descriptors: locality-sensitive hashing
+FLANN_INDEX_LSH = 6
+LSH_INDEX_PARAMS = dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1)
+LSH_SEARCH_PARAMS = dict(checks=50)
+
+# Pixels of mirrored padding so keypoints along an image's edges are kept (>= edgeThreshold)
+BORDER = 16
+
+# Lowe's ratio test: best match must be clearly better than the second best
+RATIO_TEST = 0.75
+# Minimum RANSAC inliers before a template counts as found at all
+MIN_INLIERS = 6
+# Templates with fewer keypoints (small icons, short plain text) cannot be fitted
+# reliably - ImageMatcher matches them by correlation instead
+MIN_TEMPLATE_KEYPOINTS = 4 * MIN_INLIERS
+
+
+def _keypoints(orb: 'cv2.ORB', gray: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Keypoints (as an (N, 2) float array) and descriptors of an image, including its edges.
+
+    ORB ignores a band of edgeThreshold pixels along the border, which would
+    lose buttons at the edge of a cropped view and the outline of tightly
+    cropped templates, so the image is padded first.
+    """
+    padded = cv2.copyMakeBorder(gray, BORDER, BORDER, BORDER, BORDER, cv2.BORDER_REFLECT_101)
+    if mask is not None:
+        mask = cv2.copyMakeBorder(mask, BORDER, BORDER, BORDER, BORDER, cv2.BORDER_CONSTANT, value=255)
+    keypoints, descriptors = orb.detectAndCompute(padded, mask)
+    points = np.float32([kp.pt for kp in keypoints]).reshape(-1, 2) - BORDER
+    return points, descriptors
+
+
+def _create_orb(nfeatures: int) -> 'cv2.ORB':
+    """ORB detector with a small patch so button-sized templates still get keypoints."""
+    return cv2.ORB_create(nfeatures=nfeatures, edgeThreshold=15, patchSize=15, fastThreshold=12)
+
+
+class ORBMatcher:
+    """
+    Find templates by ORB keypoints instead of sliding-window correlation.
+
+    Frame keypoints are extracted once per frame view and indexed with
+    FLANN (LSH); each template then only queries that index with its own
+    precomputed descriptors and fits a similarity transform with RANSAC.
+    This tolerates scaling and rotation (e.g. a different window size)
+    and does not cost O(frame area) per template.
+
+    The keypoints only locate the template. Its score is the normalized
+    correlation between the template and the frame area mapped back
+    through the fitted transform (undoing scale and rotation), so it is on
+    the same scale as the other engines and the usual confidence applies.
+    """
+
+    def __init__(self, frame_features: int = 5000, template_features: int = 500):
+        """
+        Args:
+            frame_features: Maximum keypoints extracted per frame
+            template_features: Maximum keypoints extracted per template
+        """
+        self._frame_orb = _create_orb(frame_features)
+        self._template_orb = _create_orb(template_features)
+        self._frames = {}
+
+    def clear(self):
+        """Forget frame keypoints (call whenever a new frame is captured)."""
+        self._frames = {}
+
+    def _frame(self, gray: np.ndarray) -> Dict[str, Any]:
+        """Keypoints, descriptors and LSH index of a grayscale frame view, computed once."""
+        key = (gray.__array_interface__['data'][0], gray.shape, gray.strides)
+        entry = self._frames.get(key)
+        if entry is None:
+            points, descriptors = _keypoints(self._frame_orb, gray)
+            index = None
+            if descriptors is not None and len(descriptors) >= 2:
+                index = cv2.FlannBasedMatcher(LSH_INDEX_PARAMS, LSH_SEARCH_PARAMS)
+                index.add([descriptors])
+                index.train()
+            entry = {
+                'points': points,
+                'index': index,
+            }
+            self._frames[key] = entry
+        return entry
+
+    def _template(self, template: Dict[str, Any]) -> Dict[str, Any]:
+        """Template keypoints and descriptors, cached in the template dict."""
+        if 'orb' not in template:
+            points, descriptors = _keypoints(self._template_orb, template['grayscale'], template['mask'])
+            template['orb'] = {
+                'points': points,
+                'descriptors': descriptors,
+            }
+        return template['orb']
+
+    def usable(self, template: Dict[str, Any]) -> bool:
+        """Whether a template has enough keypoints to be located by ORB."""
+        descriptors = self._template(template)['descriptors']
+        return descriptors is not None and len(descriptors) >= MIN_TEMPLATE_KEYPOINTS
+
+    def match(self, gray: np.ndarray, template: Dict[str, Any]) -> Tuple[float, Tuple[int, int, int, int]]:
+        """
+        Locate a template in a grayscale frame view.
+
+        Args:
+            gray: Grayscale frame view (may be a crop)
+            template: Template as returned by ImageMatcher.load_template
+
+        Returns:
+            (score, (x, y, w, h)) where the box bounds the template's corners as found in
+            the view (so it is scaled along with the template); (0.0, (0, 0, 0, 0)) if it
+            could not be located
+        """
+        not_found = 0.0, (0, 0, 0, 0)
+        features = self._template(template)
+        frame = self._frame(gray)
+        descriptors = features['descriptors']
+        if frame['index'] is None or descriptors is None or len(descriptors) < MIN_INLIERS:
+            return not_found
+
+        pairs = frame['index'].knnMatch(descriptors, k=2)
+        good = [pair[0] for pair in pairs
+                if len(pair) == 2 and pair[0].distance < RATIO_TEST * pair[1].distance]
+        if len(good) < MIN_INLIERS:
+            return not_found
+
+        source = features['points'][[m.queryIdx for m in good]]
+        target = frame['points'][[m.trainIdx for m in good]]
+        transform, inliers = cv2.estimateAffinePartial2D(source, target, method=cv2.RANSAC,
+                                                         ransacReprojThreshold=3.0)
+        if transform is None or int(inliers.sum()) < MIN_INLIERS:
+            return not_found
+
+        # Template corners mapped into the frame
+        h, w = template['grayscale'].shape[:2]
+        corners = cv2.transform(np.float32([[[0, 0]], [[w, 0]], [[0, h]], [[w, h]]]), transform).reshape(-1, 2)
+        x0, y0 = np.floor(corners.min(axis=0)).astype(int)
+        x1, y1 = np.ceil(corners.max(axis=0)).astype(int)
+        frame_h, frame_w = gray.shape[:2]
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(frame_w, x1), min(frame_h, y1)
+        if x1 <= x0 or y1 <= y0:
+            return not_found
+
+        # Frame area pulled back into template geometry, then compared like the other engines
+        patch = cv2.warpAffine(gray, transform, (w, h), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP)
+        if template['mask'] is None:
+            result = cv2.matchTemplate(patch, template['grayscale'], cv2.TM_CCOEFF_NORMED)
+        else:
+            result = cv2.matchTemplate(patch, template['grayscale'], cv2.TM_CCORR_NORMED, mask=template['mask'])
+        score = float(np.nan_to_num(result[0, 0]))
+        return score, (int(x0), int(y0), int(x1 - x0), int(y1 - y0))
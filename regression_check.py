@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Detection accuracy and latency regression check against golden labels."""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+
+from benchmark_matching import ENGINES
+from screen_detector import GameScreen, ScreenDetector
+
+# Fraction of the expected box a found button has to overlap (intersection over union)
+MIN_BUTTON_IOU = 0.5
+
+
+def box_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection over union of two (x, y, w, h) boxes."""
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+def load_golden(path: Path) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, float]]]:
+    """
+    Load the golden set.
+
+    Args:
+        path: golden_labels.yaml
+
+    Returns:
+        (frames, budgets): frames with 'image' (BGR), 'frame', 'screen' (GameScreen) and
+        optional 'button' ({'template', 'box'}); budgets keyed by mode ('default' applies to all)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        golden = yaml.safe_load(f)
+
+    frames = []
+    for entry in golden['frames']:
+        image = cv2.imread(str(path.parent / entry['frame']), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Cannot read golden frame {entry['frame']}")
+        frames.append({**entry, 'image': image, 'screen': GameScreen(entry['screen'])})
+    return frames, golden.get('budgets', {})
+
+
+def run_mode(
+    mode: str,
+    config: Dict[str, Any],
+    frames: List[Dict[str, Any]],
+    templates_dir: Path,
+    repeats: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Detect every golden frame with one matching engine.
+
+    Args:
+        mode: Engine name from benchmark_matching.ENGINES
+        config: Automation config
+        frames: Golden frames from load_golden
+        templates_dir: Templates directory
+        repeats: Timing repeats per frame (the median is used), after one untimed warm-up pass
+
+    Returns:
+        Dict with 'detected' (screen value per frame), 'button_hits' (bool or None per frame),
+        'ms' (per-frame median latency) - or None if the engine is unavailable here
+    """
+    detector = ScreenDetector(str(templates_dir), config.get('confidence_threshold', 0.8),
+                              config.get('template_settings'), methods=config.get('matching_methods'))
+    matcher = ENGINES[mode](config, sorted(templates_dir.glob("*.png")))
+    if matcher is None:
+        return None
+    detector.matcher = matcher
+
+    # Warm-up: load templates and build per-template caches (e.g. ORB keypoints) outside the timing
+    for entry in frames:
+        matcher.set_frame(entry['image'])
+        detector.detect_current_screen()
+
+    detected, button_hits, latencies = [], [], []
+    for entry in frames:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            matcher.set_frame(entry['image'])
+            screen = detector.detect_current_screen()
+            timings.append(time.perf_counter() - start)
+        detected.append(screen.value)
+        latencies.append(float(np.median(timings)) * 1000)
+
+        button = entry.get('button')
+        if button:
+            found = matcher.find_on_screen(str(templates_dir / button['template']))
+            button_hits.append(found is not None and box_iou(found, tuple(button['box'])) >= MIN_BUTTON_IOU)
+        else:
+            button_hits.append(None)
+
+    matcher.set_frame(None)
+    return {'detected': detected, 'button_hits': button_hits, 'ms': latencies}
+
+
+def summarize(frames: List[Dict[str, Any]], result: Dict[str, Any]) -> Dict[str, float]:
+    """Accuracy, button hit rate and latency percentiles of one mode."""
+    correct = [entry['screen'].value == detected for entry, detected in zip(frames, result['detected'])]
+    buttons = [hit for hit in result['button_hits'] if hit is not None]
+    return {
+        'accuracy': float(np.mean(correct)),
+        'button_hits': float(np.mean(buttons)) if buttons else 1.0,
+        'median_ms': float(np.median(result['ms'])),
+        'p95_ms': float(np.percentile(result['ms'], 95)),
+    }
+
+
+def print_confusion(frames: List[Dict[str, Any]], detected: List[str]):
+    """Print the confusion matrix (rows: expected, columns: detected)."""
+    labels = sorted({entry['screen'].value for entry in frames} | set(detected))
+    counts = np.zeros((len(labels), len(labels)), dtype=int)
+    for entry, screen in zip(frames, detected):
+        counts[labels.index(entry['screen'].value), labels.index(screen)] += 1
+
+    header = "expected \\ detected"
+    print(f"  {header:26s} " + " ".join(f"{i:>3d}" for i in range(len(labels))))
+    for i, label in enumerate(labels):
+        row = " ".join(f"{n:>3d}" if n else "  ." for n in counts[i])
+        print(f"  {i:>2d} {label:23s} {row}")
+
+
+def check_budget(
+    mode: str,
+    stats: Dict[str, float],
+    budgets: Dict[str, Dict[str, float]],
+    baseline: Optional[Dict[str, Dict[str, float]]],
+    latency_tolerance: float
+) -> List[str]:
+    """
+    Compare one mode's numbers with its budget and the baseline.
+
+    Args:
+        mode: Engine name
+        stats: summarize() result
+        budgets: Budgets from the golden file ('default' plus per-mode overrides)
+        baseline: Saved stats per mode from an earlier run (optional)
+        latency_tolerance: Fraction latency may grow over the baseline
+
+    Returns:
+        Human-readable violations (empty if the mode passes)
+    """
+    budget = {**budgets.get('default', {}), **budgets.get(mode, {})}
+    violations = []
+    if stats['accuracy'] < budget.get('min_accuracy', 1.0):
+        violations.append(f"accuracy {stats['accuracy']:.1%} < {budget.get('min_accuracy', 1.0):.1%}")
+    if stats['button_hits'] < budget.get('min_button_hits', 1.0):
+        violations.append(f"button hits {stats['button_hits']:.1%} < {budget.get('min_button_hits', 1.0):.1%}")
+    for key in ('median_ms', 'p95_ms'):
+        limit = budget.get(f"max_{key}")
+        if limit is not None and stats[key] > limit:
+            violations.append(f"{key} {stats[key]:.1f} > {limit:.1f}")
+
+    previous = (baseline or {}).get(mode)
+    if previous:
+        if stats['accuracy'] < previous['accuracy']:
+            violations.append(f"accuracy dropped from {previous['accuracy']:.1%}")
+        if stats['button_hits'] < previous['button_hits']:
+            violations.append(f"button hits dropped from {previous['button_hits']:.1%}")
+        if stats['median_ms'] > previous['median_ms'] * (1 + latency_tolerance):
+            violations.append(f"median latency grew from {previous['median_ms']:.1f} ms")
+    return violations
+
+
+def main():
+    """Run the golden set through every engine and fail on regressions."""
+    parser = argparse.ArgumentParser(description="Detection accuracy/latency regression check")
+    parser.add_argument("golden", nargs="?", default="golden_labels.yaml", help="Golden label file")
+    parser.add_argument("--config", default="config.yaml", help="Path to configuration file")
+    parser.add_argument("--templates", default="templates", help="Templates directory")
+    parser.add_argument("--modes", default=",".join(ENGINES),
+                        help=f"Comma-separated engines to check (default: {','.join(ENGINES)})")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats per frame (median is used)")
+    parser.add_argument("--baseline", help="Stats JSON of an earlier run to compare against")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write this run's stats as a new baseline")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25,
+                        help="Fraction median latency may grow over the baseline")
+    args = parser.parse_args()
+
+    config = {}
+    if Path(args.config).exists():
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+
+    frames, budgets = load_golden(Path(args.golden))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print("=" * 70)
+    print("DETECTION REGRESSION CHECK")
+    print("=" * 70)
+    print(f"Golden frames: {len(frames)}   Repeats: {args.repeats}")
+
+    all_stats = {}
+    failed = False
+    for mode in args.modes.split(","):
+        mode = mode.strip()
+        if mode not in ENGINES:
+            print(f"\n✗ Unknown mode {mode} (available: {', '.join(ENGINES)})")
+            failed = True
+            continue
+        result = run_mode(mode, config, frames, Path(args.templates), args.repeats)
+        print(f"\n[{mode}]")
+        if result is None:
+            print("  skipped (not available on this machine)")
+            continue
+
+        stats = summarize(frames, result)
+        all_stats[mode] = stats
+        print(f"  Accuracy {stats['accuracy']:.1%}   button boxes {stats['button_hits']:.1%}   "
+              f"latency median {stats['median_ms']:.1f} ms / p95 {stats['p95_ms']:.1f} ms")
+        print_confusion(frames, result['detected'])
+        for entry, detected in zip(frames, result['detected']):
+            if entry['screen'].value != detected:
+                print(f"  ✗ {entry['frame']}: expected {entry['screen'].value}, got {detected}")
+
+        violations = check_budget(mode, stats, budgets, baseline, args.latency_tolerance)
+        for violation in violations:
+            print(f"  ✗ REGRESSION: {violation}")
+        failed = failed or bool(violations)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(all_stats, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    print()
+    print("✗ Regressions found" if failed else "✓ All modes within budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
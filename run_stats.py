@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Persistent run statistics (SQLite) and a throughput report."""
+
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL
+);
+CREATE TABLE IF NOT EXISTS cycles (
+    run_id INTEGER NOT NULL,
+    cycle INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    screens INTEGER NOT NULL,
+    retries INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    tp_recoveries INTEGER NOT NULL,
+    completed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS visits (
+    run_id INTEGER NOT NULL,
+    cycle INTEGER NOT NULL,
+    screen TEXT NOT NULL,
+    next_screen TEXT,
+    started_at REAL NOT NULL,
+    seconds REAL NOT NULL,
+    retries INTEGER NOT NULL,
+    failures INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stuck (
+    run_id INTEGER NOT NULL,
+    screen TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    seconds REAL NOT NULL,
+    lost_seconds REAL NOT NULL,
+    steps TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visits_screen ON visits (screen);
+"""
+
+
+class RunStatsStore:
+    """
+    SQLite store for run, cycle and screen visit records.
+
+    Rows are buffered and written in one transaction once batch_size rows
+    are waiting or flush_interval seconds have passed, so the automation
+    loop does not pay for a disk sync on every screen.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 50, flush_interval: float = 30.0):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            batch_size: Buffered rows that trigger a write
+            flush_interval: Seconds after which buffered rows are written anyway
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(SCHEMA)
+        self._pending: Dict[str, List[Tuple]] = {}
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def start_run(self, started_at: float) -> int:
+        """Record a new run and return its id (written immediately)."""
+        with self._conn:
+            cursor = self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (started_at,))
+        return cursor.lastrowid
+
+    def end_run(self, run_id: int, ended_at: float):
+        """Flush buffered rows and mark a run as ended."""
+        self.flush()
+        with self._conn:
+            self._conn.execute("UPDATE runs SET ended_at = ? WHERE id = ?", (ended_at, run_id))
+
+    def add(self, table: str, row: Tuple):
+        """
+        Buffer a row for 'cycles', 'visits' or 'stuck' (columns in schema order).
+
+        Args:
+            table: Table name
+            row: Column values
+        """
+        self._pending.setdefault(table, []).append(row)
+        self._pending_rows += 1
+        if self._pending_rows >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows in one transaction."""
+        if self._pending_rows:
+            with self._conn:
+                for table, rows in self._pending.items():
+                    placeholders = ", ".join("?" * len(rows[0]))
+                    self._conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+            self._pending = {}
+            self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        """Run a read query (buffered rows are written first)."""
+        self.flush()
+        return self._conn.execute(sql, params).fetchall()
+
+    def dwell_times(self, percentile: float = 95.0, min_visits: int = 5) -> Dict[str, float]:
+        """
+        Usual time on each screen, from earlier visits that ended in another screen.
+
+        Args:
+            percentile: Percentile of the visit lengths used (nearest rank)
+            min_visits: Screens with fewer recorded visits are left out
+
+        Returns:
+            Screen value -> seconds
+        """
+        seconds: Dict[str, List[float]] = {}
+        for screen, length in self.query(
+                "SELECT screen, seconds FROM visits WHERE next_screen IS NOT NULL ORDER BY screen, seconds"):
+            seconds.setdefault(screen, []).append(length)
+        return {
+            screen: lengths[min(len(lengths) - 1, int(len(lengths) * percentile / 100))]
+            for screen, lengths in seconds.items() if len(lengths) >= min_visits
+        }
+
+    def close(self):
+        """Write buffered rows and close the database."""
+        self.flush()
+        self._conn.close()
+
+
+class RunRecorder:
+    """
+    Turns the automation loop's detections and actions into visit and cycle records.
+
+    A visit lasts from the first detection of a screen until a different
+    screen is detected, so its length covers handling, the game's reaction
+    and detection. A cycle ends each time cycle_screen (the training start)
+    is handled successfully; it counts as completed if the training's
+    completion screen was handled during it.
+    """
+
+    def __init__(
+        self,
+        store: RunStatsStore,
+        cycle_screen: str = "training_prep",
+        completion_screen: str = "training_complete",
+        tp_screen: str = "tp_recovery_confirm"
+    ):
+        """
+        Args:
+            store: Where records go
+            cycle_screen: Screen whose handling starts a new cycle
+            completion_screen: Screen whose handling marks the cycle's training as completed
+            tp_screen: Screen whose handling uses a TP recovery
+        """
+        self.store = store
+        self.cycle_screen = cycle_screen
+        self.completion_screen = completion_screen
+        self.tp_screen = tp_screen
+
+        now = time.time()
+        self.run_id = store.start_run(now)
+        self.cycle = 0
+        self._new_cycle(now)
+        self._visit = None
+
+    def _new_cycle(self, now: float):
+        self.cycle += 1
+        self._cycle_start = now
+        self._cycle_counts = {'screens': 0, 'retries': 0, 'failures': 0, 'tp_recoveries': 0, 'completed': 0}
+
+    def _end_cycle(self, now: float):
+        counts = self._cycle_counts
+        self.store.add('cycles', (
+            self.run_id, self.cycle, self._cycle_start, now, counts['screens'],
+            counts['retries'], counts['failures'], counts['tp_recoveries'], counts['completed']
+        ))
+
+    def _end_visit(self, now: float, next_screen: Optional[str]):
+        visit = self._visit
+        if visit is not None:
+            self.store.add('visits', (
+                self.run_id, visit['cycle'], visit['screen'], next_screen, visit['started_at'],
+                now - visit['started_at'], visit['retries'], visit['failures']
+            ))
+
+    def observe(self, screen: str):
+        """
+        Record a detection (call once per loop iteration).
+
+        Args:
+            screen: GameScreen value that was detected
+        """
+        if self._visit is not None and self._visit['screen'] == screen:
+            return
+        now = time.time()
+        self._end_visit(now, screen)
+        self._visit = {'screen': screen, 'cycle': self.cycle, 'started_at': now, 'retries': 0, 'failures': 0}
+        self._cycle_counts['screens'] += 1
+
+    def handled(self, screen: str, ok: bool, retries: int = 0):
+        """
+        Record the outcome of handling the current screen.
+
+        Args:
+            screen: GameScreen value that was handled
+            ok: Whether the handler succeeded
+            retries: Extra attempts the handler needed
+        """
+        counts = self._cycle_counts
+        counts['retries'] += retries
+        counts['failures'] += not ok
+        if self._visit is not None:
+            self._visit['retries'] += retries
+            self._visit['failures'] += not ok
+        if not ok:
+            return
+        if screen == self.completion_screen:
+            counts['completed'] = 1
+        elif screen == self.tp_screen:
+            counts['tp_recoveries'] += 1
+        elif screen == self.cycle_screen:
+            now = time.time()
+            if counts['screens'] <= 1 and not counts['completed']:
+                # The run started on the training start screen: nothing to record yet
+                self._cycle_start = now
+                return
+            self._end_cycle(now)
+            self._new_cycle(now)
+
+    def stuck(self, episode: Dict[str, Any]):
+        """
+        Record a stuck episode.
+
+        Args:
+            episode: Episode from Watchdog ('screen', 'started_at', 'seconds', 'lost', 'steps')
+        """
+        self.store.add('stuck', (
+            self.run_id, episode['screen'], episode['started_at'], episode['seconds'],
+            episode['lost'], ",".join(episode['steps'])
+        ))
+
+    def close(self):
+        """Write the open visit and cycle and end the run."""
+        now = time.time()
+        self._end_visit(now, None)
+        self._visit = None
+        if self._cycle_counts['screens']:
+            self._end_cycle(now)
+        self.store.end_run(self.run_id, now)
+
+
+def _hours(seconds: float) -> float:
+    return max(seconds, 1e-9) / 3600
+
+
+def report(store: RunStatsStore, runs: int = 10, top: int = 10):
+    """
+    Print recent runs, throughput per day, time per screen, the slowest transitions and stuck time.
+
+    Args:
+        store: Statistics store
+        runs: Number of recent runs listed
+        top: Number of slowest transitions listed
+    """
+    print("=" * 70)
+    print("RUN STATISTICS")
+    print("=" * 70)
+
+    print("\nRecent runs:")
+    print(f"  {'started':19s} {'hours':>6s} {'trainings':>9s} {'per hour':>8s} {'TP used':>7s} "
+          f"{'unknown':>8s} {'stuck':>8s} {'retries':>7s} {'failed':>6s}")
+    rows = store.query("""
+        SELECT r.id, r.started_at, COALESCE(r.ended_at, MAX(c.ended_at)),
+               SUM(c.completed), SUM(c.tp_recoveries), SUM(c.retries), SUM(c.failures),
+               (SELECT COALESCE(SUM(seconds), 0) FROM visits v WHERE v.run_id = r.id AND v.screen = 'unknown'),
+               (SELECT COALESCE(SUM(lost_seconds), 0) FROM stuck s WHERE s.run_id = r.id)
+        FROM runs r JOIN cycles c ON c.run_id = r.id
+        GROUP BY r.id ORDER BY r.started_at DESC LIMIT ?""", (runs,))
+    for _, started, ended, completed, tp_used, retries, failures, unknown, stuck in rows:
+        hours = _hours(ended - started)
+        print(f"  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started))} {hours:6.2f} {completed:9d} "
+              f"{completed / hours:8.2f} {tp_used:7d} {unknown / 60:7.1f}m {stuck / 60:7.1f}m "
+              f"{retries:7d} {failures:6d}")
+
+    print("\nThroughput by day:")
+    for day, seconds, completed, cycles in store.query("""
+            SELECT date(started_at, 'unixepoch', 'localtime') AS day,
+                   SUM(ended_at - started_at), SUM(completed), COUNT(*)
+            FROM cycles GROUP BY day ORDER BY day"""):
+        hours = _hours(seconds)
+        print(f"  {day}  {completed:4d} trainings in {hours:5.1f}h  ({completed / hours:5.2f}/hour, "
+              f"{cycles} cycles)")
+
+    print("\nTime per screen:")
+    for screen, visits, total, average, longest in store.query("""
+            SELECT screen, COUNT(*), SUM(seconds), AVG(seconds), MAX(seconds)
+            FROM visits GROUP BY screen ORDER BY SUM(seconds) DESC"""):
+        print(f"  {screen:30s} {visits:6d} visits {total / 60:8.1f}m total {average:6.1f}s avg {longest:7.1f}s max")
+
+    print("\nSlowest transitions (average time on a screen before the next one appeared):")
+    for screen, next_screen, visits, average in store.query("""
+            SELECT screen, next_screen, COUNT(*), AVG(seconds)
+            FROM visits WHERE next_screen IS NOT NULL
+            GROUP BY screen, next_screen ORDER BY AVG(seconds) DESC LIMIT ?""", (top,)):
+        print(f"  {screen:26s} → {next_screen:26s} {average:6.1f}s  ({visits} times)")
+
+    stuck = store.query("""
+        SELECT screen, COUNT(*), SUM(lost_seconds), MAX(seconds), MAX(LENGTH(steps) - LENGTH(REPLACE(steps, ',', '')) + 1)
+        FROM stuck GROUP BY screen ORDER BY SUM(lost_seconds) DESC""")
+    if stuck:
+        print("\nTime lost to stuck screens (beyond their usual time):")
+        for screen, episodes, lost, longest, steps in stuck:
+            print(f"  {screen:30s} {episodes:4d} times {lost / 60:8.1f}m lost {longest:7.1f}s longest "
+                  f"(up to {steps} recovery steps)")
+
+
+def main():
+    """Print the statistics report."""
+    parser = argparse.ArgumentParser(description="Show automation run statistics")
+    parser.add_argument("database", nargs="?", default="run_stats.sqlite", help="Statistics database")
+    parser.add_argument("--runs", type=int, default=10, help="Recent runs to list")
+    parser.add_argument("--top", type=int, default=10, help="Slowest transitions to list")
+    args = parser.parse_args()
+
+    if not Path(args.database).exists():
+        print(f"✗ {args.database} not found (enable stats_db in config.yaml and run the automation)")
+        return
+    store = RunStatsStore(Path(args.database))
+    report(store, args.runs, args.top)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Tiny NumPy screen classifier: guesses the GameScreen from a 64x36 thumbnail."""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from image_utils import ImageMatcher
+from screen_detector import GameScreen
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+
+def frame_features(gray_thumbnail: np.ndarray) -> np.ndarray:
+    """
+    Feature vector of a frame thumbnail.
+
+    Brightness and contrast are normalized away so dimmed overlays and
+    slightly different gamma still look alike.
+
+    Args:
+        gray_thumbnail: ImageMatcher.SIGNATURE_SIZE grayscale thumbnail
+
+    Returns:
+        float32 vector
+    """
+    features = gray_thumbnail.astype(np.float32).ravel()
+    features -= features.mean()
+    features /= features.std() + 1e-6
+    return features
+
+
+def thumbnail(frame: np.ndarray) -> np.ndarray:
+    """Grayscale thumbnail of a BGR frame, matching ImageMatcher.frame_signature."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, ImageMatcher.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+
+
+class ScreenClassifier:
+    """
+    Multinomial logistic regression over frame thumbnails (NumPy only).
+
+    Prediction is one standardization and one small matrix product, well
+    under a millisecond on any CPU. ScreenDetector uses the top guess to
+    decide which templates to confirm first.
+    """
+
+    def __init__(self, labels: List[str], mean: np.ndarray, std: np.ndarray,
+                 weights: np.ndarray, bias: np.ndarray):
+        """
+        Args:
+            labels: GameScreen values, one per class
+            mean: Feature means from training
+            std: Feature standard deviations from training
+            weights: (features, classes) weight matrix
+            bias: (classes,) bias vector
+        """
+        self.labels = labels
+        self.screens = [GameScreen(label) for label in labels]
+        self.mean = mean
+        self.std = std
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(
+        cls,
+        samples: List[Tuple[np.ndarray, GameScreen]],
+        epochs: int = 300,
+        learning_rate: float = 0.5,
+        l2: float = 1e-3
+    ) -> 'ScreenClassifier':
+        """
+        Train on (thumbnail, screen) samples with full-batch gradient descent.
+
+        Args:
+            samples: Grayscale thumbnails and their screens
+            epochs: Gradient descent steps
+            learning_rate: Step size
+            l2: Weight decay
+
+        Returns:
+            Trained classifier
+        """
+        labels = sorted({screen.value for _, screen in samples})
+        features = np.stack([frame_features(thumb) for thumb, _ in samples])
+        targets = np.array([labels.index(screen.value) for _, screen in samples])
+
+        mean = features.mean(axis=0)
+        std = features.std(axis=0) + 1e-6
+        x = (features - mean) / std
+        one_hot = np.eye(len(labels), dtype=np.float32)[targets]
+
+        # Balance classes so rare dialogs are not drowned out by common screens
+        counts = one_hot.sum(axis=0)
+        sample_weights = (len(samples) / (len(labels) * counts))[targets][:, np.newaxis]
+
+        weights = np.zeros((x.shape[1], len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(epochs):
+            probabilities = cls._softmax(x @ weights + bias)
+            error = (probabilities - one_hot) * sample_weights / len(samples)
+            weights -= learning_rate * (x.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        return cls(labels, mean.astype(np.float32), std.astype(np.float32), weights, bias)
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict(self, gray_thumbnail: np.ndarray) -> Tuple[GameScreen, float]:
+        """
+        Guess the screen of a frame.
+
+        Args:
+            gray_thumbnail: ImageMatcher.SIGNATURE_SIZE grayscale thumbnail
+
+        Returns:
+            (screen, probability)
+        """
+        x = (frame_features(gray_thumbnail) - self.mean) / self.std
+        probabilities = self._softmax(x @ self.weights + self.bias)
+        best = int(np.argmax(probabilities))
+        return self.screens[best], float(probabilities[best])
+
+    def save(self, path: Path):
+        """Save the model as .npz."""
+        np.savez_compressed(path, labels=np.array(self.labels), mean=self.mean, std=self.std,
+                            weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path: Path) -> 'ScreenClassifier':
+        """Load a model saved with save()."""
+        with np.load(path) as data:
+            return cls(data['labels'].tolist(), data['mean'], data['std'], data['weights'], data['bias'])
+
+
+def load_samples(sources: List[Path]) -> List[Tuple[np.ndarray, GameScreen]]:
+    """
+    Load labeled thumbnails.
+
+    Each source is either a directory with one sub-directory per screen
+    (named after the GameScreen value, e.g. race_completion/*.png) or a
+    batch report (debug_detection.py --batch .../report.json), whose
+    detected screens are used as labels.
+
+    Args:
+        sources: Directories and/or report.json files
+
+    Returns:
+        List of (thumbnail, screen)
+    """
+    screens = {screen.value: screen for screen in GameScreen}
+    samples = []
+
+    for source in sources:
+        if source.is_dir():
+            for screen_dir in sorted(source.iterdir()):
+                if screen_dir.is_dir() and screen_dir.name in screens:
+                    for path in sorted(screen_dir.rglob("*")):
+                        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+                            continue
+                        frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+                        if frame is not None:
+                            samples.append((thumbnail(frame), screens[screen_dir.name]))
+            continue
+
+        with open(source, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        frames_root = Path(report['summary']['source'])
+        labels = {entry['frame']: screens[entry['detected']] for entry in report['frames'] if 'detected' in entry}
+
+        if frames_root.is_file() and frames_root.suffix.lower() not in IMAGE_EXTENSIONS:
+            # Recorded video: frames are named <video>#<index>
+            wanted = {int(name.rsplit('#', 1)[1]): screen for name, screen in labels.items() if '#' in name}
+            capture = cv2.VideoCapture(str(frames_root))
+            index = 0
+            while wanted:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if index in wanted:
+                    samples.append((thumbnail(frame), wanted.pop(index)))
+                index += 1
+            capture.release()
+        else:
+            for name, screen in labels.items():
+                path = frames_root / name if frames_root.is_dir() else frames_root
+                frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+                if frame is not None:
+                    samples.append((thumbnail(frame), screen))
+
+    return samples
+
+
+def evaluate(model: ScreenClassifier, samples: List[Tuple[np.ndarray, GameScreen]]):
+    """Print accuracy and per-frame prediction time."""
+    correct = 0
+    start = time.perf_counter()
+    for thumb, screen in samples:
+        guess, _ = model.predict(thumb)
+        correct += guess == screen
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(samples)
+    print(f"  Accuracy: {correct}/{len(samples)} ({correct / len(samples) * 100:.1f}%), "
+          f"{elapsed_ms:.3f} ms per prediction")
+
+
+def main():
+    """Train or evaluate the screen classifier."""
+    parser = argparse.ArgumentParser(description="Train the tiny screen classifier")
+    parser.add_argument("sources", nargs="+",
+                        help="Labeled directories (<screen>/ sub-folders) and/or batch report.json files")
+    parser.add_argument("--output", default="screen_model.npz", help="Model file to write")
+    parser.add_argument("--evaluate", metavar="MODEL", help="Evaluate an existing model on the sources instead")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of samples held out for validation")
+    args = parser.parse_args()
+
+    samples = load_samples([Path(source) for source in args.sources])
+    if not samples:
+        print("✗ No labeled frames found")
+        sys.exit(1)
+
+    counts: Dict[str, int] = {}
+    for _, screen in samples:
+        counts[screen.value] = counts.get(screen.value, 0) + 1
+    print(f"Samples: {len(samples)}")
+    for label, count in sorted(counts.items()):
+        print(f"  {label:30s} {count}")
+
+    if args.evaluate:
+        model = ScreenClassifier.load(Path(args.evaluate))
+        evaluate(model, samples)
+        return
+
+    order = np.random.RandomState(0).permutation(len(samples))
+    split = int(len(samples) * args.holdout)
+    holdout = [samples[i] for i in order[:split]]
+    training = [samples[i] for i in order[split:]]
+
+    model = ScreenClassifier.train(training)
+    if holdout:
+        print("\nHeld-out validation:")
+        evaluate(model, holdout)
+
+    # Final model uses every sample
+    model = ScreenClassifier.train(samples)
+    model.save(Path(args.output))
+    print(f"\n✓ Saved {args.output} (set screen_classifier: {args.output} in config.yaml)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,36 @@
 """Screen detection for different Umamusume game states."""
 
+import time
 from enum import Enum
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
 from pathlib import Path
-from image_utils import ImageMatcher
+from image_utils import ImageMatcher, signature_distance
+from frame_source import FrameSource
+from signature_index import SignatureIndex, perceptual_hash
+
+
+# Built-in per-template settings (see ImageMatcher); config.yaml entries override these
+DEFAULT_TEMPLATE_SETTINGS = {
+    # The TP items header also shows up on other lists - only accept it
+    # if the 閉じる button is also present (unique to the TP screen)
+    "tp_recovery_header.png": {"requires": ["tojiru_button.png"]},
+}
+
+
+def merge_template_settings(overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge per-template settings from config on top of the built-in defaults.
+
+    Args:
+        overrides: template_settings section from config.yaml
+
+    Returns:
+        Combined settings keyed by template file name
+    """
+    merged = {name: dict(settings) for name, settings in DEFAULT_TEMPLATE_SETTINGS.items()}
+    for name, settings in (overrides or {}).items():
+        merged.setdefault(name, {}).update(settings or {})
+    return merged
 
 
 class GameScreen(Enum):
@@ -33,16 +60,60 @@ class GameScreen(Enum):
 class ScreenDetector:
     """Detects which screen is currently displayed."""
 
-    def __init__(self, templates_dir: str = "templates", confidence: float = 0.8):
+    # Mean gray level difference of an idle-watched area that counts as a change
+    IDLE_CHANGE_THRESHOLD = 4.0
+    # Animated screens never hash the same twice - indexing them only adds noise
+    UNINDEXED_SCREENS = (GameScreen.AUTO_PLAY_IN_PROGRESS, GameScreen.FAST_FORWARD_BUTTON, GameScreen.UNKNOWN)
+    # Screens shown together with higher-priority ones (see the priority order in
+    # _detect_by_templates): a guess is only trusted if none of these match as well
+    OUTRANKED_BY = {
+        GameScreen.RACE_COMPLETION: (GameScreen.TP_RECOVERY_ITEMS, GameScreen.RACE_RETRY),  # All show 閉じる
+        GameScreen.TRAINING_PREP: (GameScreen.TP_RECOVERY_CONFIRM,),  # TP dialog over training prep
+        GameScreen.OMAKASE_MENU: (GameScreen.TRAINING_PREP, GameScreen.TP_RECOVERY_CONFIRM),
+    }
+
+    def __init__(
+        self,
+        templates_dir: str = "templates",
+        confidence: float = 0.8,
+        template_settings: Optional[Dict[str, Dict[str, Any]]] = None,
+        frame_source: Optional[FrameSource] = None,
+        methods: Optional[Sequence[str]] = None,
+        capture_rois: bool = False,
+        roi_padding: int = 40,
+        roi_full_scan_interval: float = 30.0,
+        use_opencl: bool = False,
+        classifier: Optional[Any] = None,
+        classifier_confidence: float = 0.6,
+        signature_index: Optional[SignatureIndex] = None
+    ):
         """
         Initialize the screen detector.
 
         Args:
             templates_dir: Directory containing template images
             confidence: Confidence threshold for image matching
+            template_settings: Per-template overrides (thresholds, masks, requirements)
+            frame_source: Capture backend (default: picked automatically)
+            methods: Default matching methods (default: all; without 'color' only grayscale is captured)
+            capture_rois: Capture only each template's region of interest (configured or learned)
+            roi_padding: Pixels of slack around learned regions of interest
+            roi_full_scan_interval: Seconds between full-frame re-checks of learned regions
+            use_opencl: Match through OpenCL (cv2.UMat) when a device is available
+            classifier: Optional ScreenClassifier; its top guess is confirmed first and
+                the full template scan only runs when that fails
+            classifier_confidence: Minimum classifier probability for a guess to be tried
+            signature_index: Optional SignatureIndex; a confident hash hit returns its screen
+                without any template matching, and confirmed detections are added to it
         """
         self.templates_dir = Path(templates_dir)
-        self.matcher = ImageMatcher(confidence)
+        self.classifier = classifier
+        self.classifier_confidence = classifier_confidence
+        self.signature_index = signature_index
+        self.matcher = ImageMatcher(
+            confidence, merge_template_settings(template_settings), frame_source, methods,
+            capture_rois, roi_padding, roi_full_scan_interval, use_opencl
+        )
 
         # Template mappings for each screen
         self.screen_templates = {
@@ -68,7 +139,8 @@ class ScreenDetector:
 
     def detect_current_screen(
         self,
-        region: Optional[Tuple[int, int, int, int]] = None
+        region: Optional[Tuple[int, int, int, int]] = None,
+        full_scan: bool = False
     ) -> GameScreen:
         """
         Detect which screen is currently displayed.
@@ -76,16 +148,83 @@ class ScreenDetector:
 
         Args:
             region: Optional region to search
+            full_scan: Skip the signature index and classifier and search every template
+                in the whole region, forgetting learned regions of interest (for when
+                the fast paths may be wrong, e.g. the game seems stuck)
 
         Returns:
             The detected GameScreen
         """
         # Clear screenshot cache to get fresh screenshot for this detection cycle
         self.matcher.clear_cache()
+        if full_scan:
+            self.matcher.forget_rois()
+
+        if self.signature_index is None:
+            return self._detect_by_templates(region, full_scan)
+
+        # Fastest path: a screen seen before, recognized by its hash alone
+        frame_hash = perceptual_hash(self.matcher.get_frame_views(region)['grayscale'])
+        entry = None if full_scan else self.signature_index.lookup(frame_hash)
+        if entry is not None and self._verify_hit(entry, region):
+            # Seed the cached button positions so is_screen() on this frame needs no matching either
+            for name, box in entry['buttons'].items():
+                self.matcher.cache_match(str(self.templates_dir / name), tuple(box))
+            return GameScreen(entry['screen'])
+
+        screen = self._detect_by_templates(region, full_scan)
+        if screen not in self.UNINDEXED_SCREENS:
+            self.signature_index.add(frame_hash, screen.value, self.matcher.matched_templates())
+        return screen
+
+    def _verify_hit(
+        self,
+        entry: Dict[str, Any],
+        region: Optional[Tuple[int, int, int, int]] = None
+    ) -> bool:
+        """
+        Confirm a signature index hit before trusting it.
+
+        The screen's primary template has to be found again around its cached
+        box (a small area match), and no screen that outranks it on the same
+        frame (OUTRANKED_BY, e.g. race retry for race completion) may match.
+        Otherwise an entry recorded for the wrong one of two similar screens
+        would be returned forever.
+
+        Args:
+            entry: Entry returned by SignatureIndex.lookup
+            region: Capture region
+
+        Returns:
+            True if the entry's screen is confirmed on the current frame
+        """
+        screen = GameScreen(entry['screen'])
+        templates = self.screen_templates.get(screen)
+        box = entry['buttons'].get(templates[0]) if templates else None
+        if box is None:
+            return False
+        pad = self.matcher.roi_padding
+        x, y, w, h = box
+        area = (x - pad, y - pad, w + 2 * pad, h + 2 * pad)
+        if self.matcher.find_in_area(str(self.templates_dir / templates[0]), region, area) is None:
+            return False
+        return not any(self.is_screen(other, region) for other in self.OUTRANKED_BY.get(screen, ()))
+
+    def _detect_by_templates(
+        self,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        skip_classifier: bool = False
+    ) -> GameScreen:
+        """Detect the screen of the current frame by classifier guess and template matching."""
+        # Fast path: confirm the classifier's guess with just that screen's templates
+        if self.classifier is not None and not skip_classifier:
+            guess, probability = self.classifier.predict(self.matcher.frame_signature(region))
+            if (guess != GameScreen.UNKNOWN and probability >= self.classifier_confidence
+                    and self.is_screen(guess, region) and not self._outranked(guess, region)):
+                return guess
 
         # FIRST: Check if auto-play is in progress (must wait until it's done)
-        auto_play_template = str(self.templates_dir / "auto_play_inprogress.png")
-        if self.matcher.find_on_screen(auto_play_template, region):
+        if self.is_screen(GameScreen.AUTO_PLAY_IN_PROGRESS, region):
             return GameScreen.AUTO_PLAY_IN_PROGRESS
 
         # Priority order: Check dialogs/popups FIRST before background screens
@@ -119,13 +258,8 @@ class ScreenDetector:
             if screen in self.screen_templates:
                 for template in self.screen_templates[screen]:
                     template_path = str(self.templates_dir / template)
+                    # Requirements (e.g. TP header needs 閉じる) are checked by the matcher
                     if self.matcher.find_on_screen(template_path, region):
-                        # Special validation for TP_RECOVERY_ITEMS to avoid false positives
-                        if screen == GameScreen.TP_RECOVERY_ITEMS:
-                            # Only accept if the 閉じる button is also present (unique to TP screen)
-                            tojiru_path = str(self.templates_dir / "tojiru_button.png")
-                            if not self.matcher.find_on_screen(tojiru_path, region):
-                                continue  # False positive, skip this detection
                         return screen
 
         # Then check background screens
@@ -138,6 +272,16 @@ class ScreenDetector:
 
         return GameScreen.UNKNOWN
 
+    def _outranked(
+        self,
+        screen: GameScreen,
+        region: Optional[Tuple[int, int, int, int]] = None
+    ) -> bool:
+        """Whether auto-play or a higher-priority screen shown together with screen matches too."""
+        if screen != GameScreen.AUTO_PLAY_IN_PROGRESS and self.is_screen(GameScreen.AUTO_PLAY_IN_PROGRESS, region):
+            return True
+        return any(self.is_screen(other, region) for other in self.OUTRANKED_BY.get(screen, ()))
+
     def is_screen(
         self,
         screen: GameScreen,
@@ -166,7 +310,7 @@ class ScreenDetector:
     def wait_for_screen(
         self,
         screen: GameScreen,
-        timeout: int = 10,
+        timeout: float = 10,
         check_interval: float = 0.5,
         region: Optional[Tuple[int, int, int, int]] = None
     ) -> bool:
@@ -182,14 +326,90 @@ class ScreenDetector:
         Returns:
             True if screen appeared within timeout, False otherwise
         """
-        import time
+        return self.wait_for_any_screen([screen], timeout, check_interval, region) is not None
 
-        elapsed = 0
-        while elapsed < timeout:
-            if self.is_screen(screen, region):
-                return True
+    def wait_for_any_screen(
+        self,
+        screens: Sequence[GameScreen],
+        timeout: float = 10,
+        check_interval: float = 0.5,
+        region: Optional[Tuple[int, int, int, int]] = None
+    ) -> Optional[GameScreen]:
+        """
+        Wait until one of several screens appears.
 
-            time.sleep(check_interval)
-            elapsed += check_interval
+        Each poll takes one fresh capture that all candidates are matched
+        against. The timeout is a deadline on the monotonic clock, so slow
+        matching does not stretch it, and polls start check_interval apart
+        (not check_interval after the previous poll finished).
 
-        return False
+        Args:
+            screens: Screens to wait for, in priority order (first match wins within a poll)
+            timeout: Maximum time to wait in seconds
+            check_interval: Time between the starts of two polls in seconds
+            region: Optional region to search
+
+        Returns:
+            The screen that appeared, or None if none did before the deadline
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            poll_start = time.monotonic()
+            self.matcher.clear_cache()
+            for screen in screens:
+                if self.is_screen(screen, region):
+                    return screen
+
+            now = time.monotonic()
+            if now >= deadline:
+                return None
+            time.sleep(max(0.0, min(poll_start + check_interval, deadline) - now))
+
+    def wait_until_gone(
+        self,
+        screen: GameScreen,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        poll_interval: float = 2.0,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> float:
+        """
+        Idle until a long-lived screen (e.g. auto-play) is no longer shown.
+
+        Only the area around the screen's template is grabbed, and only
+        as a tiny thumbnail, every poll_interval seconds. The template is
+        matched again (in that area) only when the thumbnail changed, so an
+        unchanged indicator costs one small capture per poll.
+
+        Args:
+            screen: Screen that is currently shown
+            region: Optional region to search
+            poll_interval: Seconds between checks
+            should_stop: Optional callback; waiting ends when it returns True
+
+        Returns:
+            Seconds waited
+        """
+        start = time.monotonic()
+        template_path = str(self.templates_dir / self.screen_templates[screen][0])
+        location = self.matcher.find_on_screen(template_path, region)
+        if location is None:
+            return 0.0
+
+        origin_x, origin_y = (region[0], region[1]) if region else (0, 0)
+        pad = self.matcher.roi_padding
+        x, y, w, h = location
+        area = (x - origin_x - pad, y - origin_y - pad, w + 2 * pad, h + 2 * pad)
+        baseline = self.matcher.area_signature(region, area)
+
+        while not (should_stop and should_stop()):
+            time.sleep(poll_interval)
+            self.matcher.clear_cache()
+            signature = self.matcher.area_signature(region, area)
+            if signature_distance(signature, baseline) < self.IDLE_CHANGE_THRESHOLD:
+                continue
+            # Something moved - is the template still there (e.g. an animated indicator)?
+            if self.matcher.find_in_area(template_path, region, area) is None:
+                break
+            baseline = signature
+
+        return time.monotonic() - start
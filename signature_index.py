@@ -0,0 +1,176 @@
+"""Perceptual-hash index of known screens with cached button positions."""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Hash is the sign pattern of the HASH_SIZE x HASH_SIZE lowest DCT frequencies (256 bits)
+HASH_SIZE = 16
+
+
+def perceptual_hash(gray: np.ndarray) -> int:
+    """
+    DCT-based perceptual hash of a grayscale frame.
+
+    Args:
+        gray: Grayscale frame (any size)
+
+    Returns:
+        HASH_SIZE * HASH_SIZE bit hash as an int
+    """
+    small = cv2.resize(gray, (HASH_SIZE * 4, HASH_SIZE * 4), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])  # DC term skews the median
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree: finds all hashes within a Hamming distance without a full scan."""
+
+    def __init__(self):
+        """Initialize an empty tree."""
+        self._root = None
+
+    def add(self, key: int, value: Any):
+        """Insert a hash with its payload."""
+        if self._root is None:
+            self._root = (key, value, {})
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, value, {})
+                return
+            node = child
+
+    def search(self, key: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """
+        Find every entry within max_distance of key.
+
+        Returns:
+            List of (distance, payload), closest first
+        """
+        found = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node_key, value, children = stack.pop()
+            distance = hamming(key, node_key)
+            if distance <= max_distance:
+                found.append((distance, value))
+            # Triangle inequality: only children in this band can be close enough
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found, key=lambda item: item[0])
+
+
+class SignatureIndex:
+    """
+    Known screens by perceptual hash, with the buttons found on them.
+
+    Entries are added from confirmed detections (a template matched), so
+    the index grows while the automation runs. A lookup is a confident hit
+    only if the nearest entry is within max_distance and no entry of a
+    different screen is within conflict_distance - near-identical screens
+    that differ by one button (e.g. race result with or without もう一度)
+    then fall back to template matching.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_distance: int = 12,
+        conflict_distance: int = 24,
+        merge_distance: int = 4
+    ):
+        """
+        Args:
+            path: JSON file the index is loaded from and saved to (None = memory only)
+            max_distance: Bits a frame may differ from a known screen for a hit (of 256)
+            conflict_distance: Other screens within this distance make a hit ambiguous
+            merge_distance: New entries this close to an entry of the same screen are merged
+        """
+        self.path = Path(path) if path else None
+        self.max_distance = max_distance
+        self.conflict_distance = conflict_distance
+        self.merge_distance = merge_distance
+        self.entries: List[Dict[str, Any]] = []
+        self._tree = BKTree()
+        self._dirty = False
+
+        if self.path and self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for entry in json.load(f).get('entries', []):
+                    entry['hash'] = int(entry['hash'], 16)
+                    self._insert(entry)
+
+    def _insert(self, entry: Dict[str, Any]):
+        self.entries.append(entry)
+        self._tree.add(entry['hash'], entry)
+
+    def lookup(self, frame_hash: int) -> Optional[Dict[str, Any]]:
+        """
+        Find the known screen a frame hash belongs to.
+
+        Args:
+            frame_hash: perceptual_hash of the frame
+
+        Returns:
+            Entry dict ('screen', 'buttons' name -> [x, y, w, h], 'hits') on a confident hit, else None
+        """
+        nearby = self._tree.search(frame_hash, self.conflict_distance)
+        if not nearby or nearby[0][0] > self.max_distance:
+            return None
+        best = nearby[0][1]
+        if any(entry['screen'] != best['screen'] for _, entry in nearby):
+            return None
+        best['hits'] = best.get('hits', 0) + 1
+        return best
+
+    def add(
+        self,
+        frame_hash: int,
+        screen: str,
+        buttons: Optional[Dict[str, List[int]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Record a confirmed detection (merging into a close entry of the same screen).
+
+        Args:
+            frame_hash: perceptual_hash of the frame
+            screen: GameScreen value that was confirmed
+            buttons: Template name -> [x, y, w, h] (frame coordinates) found on it
+
+        Returns:
+            The new or updated entry
+        """
+        for distance, entry in self._tree.search(frame_hash, self.merge_distance):
+            if entry['screen'] == screen:
+                if buttons and any(entry['buttons'].get(name) != box for name, box in buttons.items()):
+                    entry['buttons'].update(buttons)
+                    self._dirty = True
+                return entry
+
+        entry = {'hash': frame_hash, 'screen': screen, 'buttons': dict(buttons or {}), 'hits': 0}
+        self._insert(entry)
+        self._dirty = True
+        return entry
+
+    def save(self):
+        """Write the index to its JSON file if anything was added."""
+        if not self.path or not self._dirty:
+            return
+        entries = [{**entry, 'hash': f"{entry['hash']:x}"} for entry in self.entries]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'hash_bits': HASH_SIZE * HASH_SIZE, 'entries': entries}, f, indent=1, ensure_ascii=False)
+        self._dirty = False
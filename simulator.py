@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Headless game simulator: plays back a screen graph for end-to-end throughput runs."""
+
+import argparse
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+
+from frame_source import FrameBuffers, FrameSource
+from image_utils import ImageMatcher
+from input_backend import InputBackend
+from run_stats import RunStatsStore
+from screen_detector import merge_template_settings
+
+# Canvas color around pasted screen crops
+BACKGROUND = (40, 40, 40, 255)
+
+
+class SimulatedGame:
+    """
+    A screen graph played back in (real) time.
+
+    Every state shows one frame. Clicking inside one of a state's buttons
+    moves to that button's next state after its latency (the old frame
+    stays visible meanwhile, like a slow game); states with 'after' move
+    on by themselves. A cycle is counted each time the start state is
+    entered again.
+
+    The game keeps the numbers a throughput run needs: clicks, clicks
+    that hit nothing, and how long each ready screen waited for the bot.
+    """
+
+    def __init__(
+        self,
+        states: Dict[str, Dict[str, Any]],
+        start: str,
+        screen_size: Tuple[int, int],
+        origin: Tuple[int, int] = (0, 0)
+    ):
+        """
+        Args:
+            states: State name -> {'frame': BGRA canvas, 'buttons': [{'box', 'next', 'latency', 'template'}],
+                'after': seconds or None, 'next': state after 'after', 'latency': seconds}
+            start: Name of the first state (re-entering it completes a cycle)
+            screen_size: (width, height) of the simulated screen
+            origin: Screen position of the simulated screen's top-left corner
+        """
+        self.states = states
+        self.start = start
+        self.screen_size = screen_size
+        self.origin = origin
+        self._lock = threading.Lock()
+        self.on_cycle = None
+
+        self.started_at = time.monotonic()
+        self.cycles = 0
+        self.clicks = 0
+        self.missed_clicks = 0
+        self.early_clicks = 0
+        # State -> visits and seconds the ready screen waited for a click
+        self.visits: Dict[str, int] = {start: 1}
+        self.waiting: Dict[str, float] = {}
+        self.state = start
+        self.entered_at = self.started_at
+        self._pending = None
+
+    def _enter(self, state: str, now: float):
+        """Switch to a state (caller holds the lock)."""
+        if state == self.start:
+            self.cycles += 1
+            if self.on_cycle:
+                self.on_cycle(self.cycles)
+        self.state = state
+        self.entered_at = now
+        self._pending = None
+        self.visits[state] = self.visits.get(state, 0) + 1
+
+    def _advance(self, now: float):
+        """Apply transitions that are due by now."""
+        while True:
+            if self._pending is not None:
+                target, due = self._pending
+                if now < due:
+                    return
+                self._enter(target, due)
+                continue
+            after = self.states[self.state].get('after')
+            if after is None or now < self.entered_at + after:
+                return
+            self._enter(self.states[self.state]['next'], self.entered_at + after)
+
+    def frame(self) -> np.ndarray:
+        """BGRA canvas of the screen currently shown."""
+        with self._lock:
+            self._advance(time.monotonic())
+            return self.states[self.state]['frame']
+
+    def click(self, x: int, y: int):
+        """
+        Click at a screen position.
+
+        Args:
+            x: Screen X coordinate
+            y: Screen Y coordinate
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._advance(now)
+            self.clicks += 1
+            if self._pending is not None:
+                # The game is already busy with a transition
+                self.early_clicks += 1
+                return
+
+            local_x, local_y = x - self.origin[0], y - self.origin[1]
+            for button in self.states[self.state]['buttons']:
+                bx, by, bw, bh = button['box']
+                if bx <= local_x < bx + bw and by <= local_y < by + bh:
+                    self.waiting[self.state] = self.waiting.get(self.state, 0.0) + now - self.entered_at
+                    self._pending = (button['next'], now + button['latency'])
+                    return
+            self.missed_clicks += 1
+
+    def report(self) -> Dict[str, Any]:
+        """Throughput numbers of the run so far."""
+        elapsed = time.monotonic() - self.started_at
+        return {
+            'elapsed': elapsed,
+            'cycles': self.cycles,
+            'cycles_per_hour': self.cycles / elapsed * 3600 if elapsed else 0.0,
+            'clicks': self.clicks,
+            'clicks_per_cycle': self.clicks / self.cycles if self.cycles else float('nan'),
+            'missed_clicks': self.missed_clicks,
+            'early_clicks': self.early_clicks,
+            'visits': dict(self.visits),
+            'waiting': dict(self.waiting),
+        }
+
+
+class SimulatedFrameSource(FrameSource):
+    """Capture backend showing the simulated game (the rest of the desktop is black)."""
+
+    name = "simulator"
+
+    def __init__(self, game: SimulatedGame):
+        """
+        Args:
+            game: Game to show
+        """
+        self.game = game
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]], buffers: FrameBuffers):
+        canvas = self.game.frame()
+        origin_x, origin_y = self.game.origin
+        screen_w, screen_h = self.game.screen_size
+        x, y, w, h = region or (origin_x, origin_y, screen_w, screen_h)
+
+        raw = buffers.scratch((h, w, 4), np.uint8)
+        raw[:] = 0
+        # Overlap of the requested region and the simulated screen
+        x0, y0 = max(x, origin_x), max(y, origin_y)
+        x1, y1 = min(x + w, origin_x + screen_w), min(y + h, origin_y + screen_h)
+        if x1 > x0 and y1 > y0:
+            raw[y0 - y:y1 - y, x0 - x:x1 - x] = canvas[y0 - origin_y:y1 - origin_y, x0 - origin_x:x1 - origin_x]
+        buffers.set_raw(raw, cv2.COLOR_BGRA2BGR, cv2.COLOR_BGRA2GRAY)
+
+
+class SimulatedInput(InputBackend):
+    """Click backend delivering clicks to the simulated game."""
+
+    name = "simulator"
+
+    def __init__(self, game: SimulatedGame):
+        """
+        Args:
+            game: Game to click
+        """
+        self.game = game
+
+    def click(self, x: int, y: int):
+        self.game.click(x, y)
+
+
+def load_game(
+    graph_path: Path,
+    config: Dict[str, Any],
+    templates_dir: Path = Path("templates")
+) -> SimulatedGame:
+    """
+    Build a game from a screen graph file (see simulation.yaml).
+
+    Buttons given by 'template' are located in their state's frame with
+    the matcher, so the graph only needs explicit boxes for buttons that
+    have no template.
+
+    Args:
+        graph_path: Screen graph YAML
+        config: Automation config (search_region places the simulated screen; template settings apply)
+        templates_dir: Templates directory
+
+    Returns:
+        SimulatedGame in its start state
+    """
+    with open(graph_path, 'r', encoding='utf-8') as f:
+        graph = yaml.safe_load(f)
+
+    region = config.get('search_region')
+    origin = (region[0], region[1]) if region else (0, 0)
+    screen_w, screen_h = (region[2], region[3]) if region else graph.get('screen_size', [540, 960])
+    default_latency = graph.get('latency', 0.5)
+
+    matcher = ImageMatcher(
+        config.get('confidence_threshold', 0.8),
+        merge_template_settings(config.get('template_settings'))
+    )
+
+    states = {}
+    for name, spec in graph['states'].items():
+        image = cv2.imread(str(graph_path.parent / spec['frame']), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"State {name}: cannot read {spec['frame']}")
+        image = image[:screen_h, :screen_w]
+        img_h, img_w = image.shape[:2]
+        # Crops are pasted onto the canvas (centered unless 'at' is given)
+        at_x, at_y = spec.get('at', [(screen_w - img_w) // 2, (screen_h - img_h) // 2])
+        canvas = np.empty((screen_h, screen_w, 4), dtype=np.uint8)
+        canvas[:] = BACKGROUND
+        canvas[at_y:at_y + img_h, at_x:at_x + img_w] = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+
+        buttons = []
+        matcher.set_frame(image)
+        for button in spec.get('buttons', []):
+            box = button.get('box')
+            if box is None:
+                box = matcher.find_on_screen(str(templates_dir / button['template']))
+                if box is None:
+                    raise ValueError(f"State {name}: {button['template']} not found in {spec['frame']}")
+            buttons.append({
+                'template': button.get('template'),
+                'box': (box[0] + at_x, box[1] + at_y, box[2], box[3]),
+                'next': button['next'],
+                'latency': button.get('latency', default_latency),
+            })
+
+        states[name] = {'frame': canvas, 'buttons': buttons, 'after': spec.get('after'), 'next': spec.get('next')}
+
+    for name, state in states.items():
+        targets = [button['next'] for button in state['buttons']] + ([state['next']] if state['after'] else [])
+        for target in targets:
+            if target not in states:
+                raise ValueError(f"State {name}: unknown next state {target}")
+
+    return SimulatedGame(states, graph['start'], (screen_w, screen_h), origin)
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a run's throughput numbers."""
+    print()
+    print("=" * 70)
+    print("SIMULATION REPORT")
+    print("=" * 70)
+    print(f"Elapsed:            {report['elapsed']:.1f}s")
+    print(f"Cycles:             {report['cycles']} ({report['cycles_per_hour']:.1f}/hour)")
+    print(f"Clicks:             {report['clicks']} ({report['clicks_per_cycle']:.1f} per cycle)")
+    print(f"Clicks on nothing:  {report['missed_clicks']}")
+    print(f"Clicks mid-transition: {report['early_clicks']}")
+    print()
+    print("Time ready screens waited for the bot:")
+    for state, visits in sorted(report['visits'].items()):
+        waited = report['waiting'].get(state, 0.0)
+        print(f"  {state:30s} {visits:4d} visits  {waited:7.1f}s total  {waited / visits:5.2f}s per visit")
+    print(f"  {'total':30s}             {sum(report['waiting'].values()):7.1f}s")
+
+
+def main():
+    """Run the automation against the simulated game."""
+    parser = argparse.ArgumentParser(description="Run the automation against a simulated game")
+    parser.add_argument("--graph", default="simulation.yaml", help="Screen graph file")
+    parser.add_argument("--config", default="config.yaml", help="Path to configuration file")
+    parser.add_argument("--cycles", type=int, default=3, help="Stop after this many completed cycles")
+    parser.add_argument("--max-minutes", type=float, default=10.0, help="Stop after this long regardless")
+    args = parser.parse_args()
+
+    # Imported late: the automation module pulls in the hotkey library
+    import umamusume_autoplay
+    from umamusume_autoplay import UmamusumeAutoplay
+
+    config = {}
+    if Path(args.config).exists():
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+
+    game = load_game(Path(args.graph), config)
+
+    def stop(reason: str):
+        if not umamusume_autoplay._should_stop:
+            print(f"\n✓ {reason} - stopping")
+            umamusume_autoplay._should_stop = True
+
+    def on_cycle(cycles: int):
+        print(f"\n[simulator] cycle {cycles} completed")
+        if cycles >= args.cycles:
+            stop(f"{cycles} cycles completed")
+
+    game.on_cycle = on_cycle
+    timer = threading.Timer(args.max_minutes * 60, stop, ["Time limit reached"])
+    timer.daemon = True
+    timer.start()
+
+    autoplay = UmamusumeAutoplay(args.config, SimulatedFrameSource(game), SimulatedInput(game))
+    # Simulated visits must not end up in the real statistics (or the watchdog's dwell times)
+    if autoplay.stats_store:
+        autoplay.stats_store.close()
+    autoplay.stats_store = RunStatsStore(Path(":memory:"))
+    autoplay.run_continuous(hotkeys=False)
+    timer.cancel()
+    print_report(game.report())
+
+
+if __name__ == "__main__":
+    main()
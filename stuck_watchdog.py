@@ -0,0 +1,146 @@
+"""Stuck-state watchdog: notices screens that stay far longer than usual and escalates recovery."""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Recovery steps, tried in this order while a screen stays overdue
+ESCALATION_STEPS = ("widen_region", "full_scan", "recover", "snapshot")
+
+# Screen value of frames nothing was recognized on
+UNKNOWN = "unknown"
+
+
+class Watchdog:
+    """
+    Track how long the current screen has been shown and escalate when it is overdue.
+
+    A screen is overdue once it has been shown for margin times its
+    expected dwell time (usually a high percentile of earlier visits, see
+    RunStatsStore.dwell_times), but at least min_dwell seconds. From then on
+    the next step of ESCALATION_STEPS is due every escalation_interval
+    seconds; after the last one, 'recover' is repeated.
+
+    The time a stuck screen stayed beyond its expected dwell time is
+    counted as lost once a different screen shows up. Short stretches of
+    'unknown' (a frame or two under the matching threshold) do not count
+    as leaving the screen.
+    """
+
+    def __init__(
+        self,
+        expected_dwell: Optional[Dict[str, float]] = None,
+        default_dwell: float = 120.0,
+        margin: float = 2.0,
+        min_dwell: float = 20.0,
+        escalation_interval: float = 15.0,
+        unknown_grace: float = 5.0,
+        ignore: Iterable[str] = ()
+    ):
+        """
+        Args:
+            expected_dwell: Screen value -> usual seconds on that screen
+            default_dwell: Expected seconds for screens without statistics
+            margin: Factor on the expected dwell time before a screen counts as stuck
+            min_dwell: Never call a screen stuck before this many seconds
+            escalation_interval: Seconds between escalation steps
+            unknown_grace: Seconds of 'unknown' tolerated before a screen counts as left
+            ignore: Screen values that are never stuck (e.g. ones that wait on their own)
+        """
+        self.expected_dwell = dict(expected_dwell or {})
+        self.default_dwell = default_dwell
+        self.margin = margin
+        self.min_dwell = min_dwell
+        self.escalation_interval = escalation_interval
+        self.unknown_grace = unknown_grace
+        self.ignore = set(ignore)
+
+        self.episodes: List[Dict[str, Any]] = []
+        self._screen = None
+        self._entered_at = 0.0
+        self._unknown_since = None
+        self._steps: List[str] = []
+
+    @property
+    def stuck(self) -> bool:
+        """Whether the current screen has been escalated at least once."""
+        return bool(self._steps)
+
+    def deadline(self, screen: str) -> float:
+        """Seconds a screen may be shown before it counts as stuck."""
+        return max(self.expected_dwell.get(screen, self.default_dwell) * self.margin, self.min_dwell)
+
+    def observe(self, screen: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        Record a detection (call once per loop iteration).
+
+        Args:
+            screen: GameScreen value that was detected
+            now: Current time.monotonic() (taken if not given)
+
+        Returns:
+            The escalation step that just became due, or None
+        """
+        now = time.monotonic() if now is None else now
+        if screen == UNKNOWN and self._screen not in (None, UNKNOWN):
+            # Possibly a blip: only leave the screen once 'unknown' lasts
+            if self._unknown_since is None:
+                self._unknown_since = now
+            if now - self._unknown_since < self.unknown_grace:
+                return None
+        left_at = self._unknown_since if self._unknown_since is not None else now
+        self._unknown_since = None
+        if screen != self._screen:
+            self._end_episode(left_at)
+            self._screen = screen
+            self._entered_at = left_at
+            return None
+        if screen in self.ignore:
+            return None
+
+        due_at = self._entered_at + self.deadline(screen) + len(self._steps) * self.escalation_interval
+        if now < due_at:
+            return None
+        step = ESCALATION_STEPS[len(self._steps)] if len(self._steps) < len(ESCALATION_STEPS) else "recover"
+        self._steps.append(step)
+        return step
+
+    def _end_episode(self, now: float):
+        """Close the stuck episode of the screen being left, if there is one."""
+        if not self._steps:
+            return
+        seconds = now - self._entered_at
+        self.episodes.append({
+            'screen': self._screen,
+            'started_at': time.time() - (time.monotonic() - self._entered_at),  # Wall clock, for the statistics
+            'seconds': seconds,
+            'lost': max(0.0, seconds - self.expected_dwell.get(self._screen, self.default_dwell)),
+            'steps': list(self._steps),
+        })
+        self._steps = []
+
+    def close(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        End tracking (e.g. when the automation stops).
+
+        Returns:
+            The episode that was still open, or None
+        """
+        count = len(self.episodes)
+        now = time.monotonic() if now is None else now
+        self._end_episode(self._unknown_since if self._unknown_since is not None else now)
+        self._unknown_since = None
+        self._screen = None
+        return self.episodes[-1] if len(self.episodes) > count else None
+
+    def last_episode(self) -> Optional[Dict[str, Any]]:
+        """The most recently closed stuck episode."""
+        return self.episodes[-1] if self.episodes else None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Screen value -> {'episodes', 'lost'} (seconds) over all closed episodes."""
+        summary = {}
+        for episode in self.episodes:
+            entry = summary.setdefault(episode['screen'], {'episodes': 0, 'lost': 0.0})
+            entry['episodes'] += 1
+            entry['lost'] += episode['lost']
+        return summary
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Offline threshold tuner: computes per-template confidences from labeled screenshots."""
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+
+from image_utils import ImageMatcher, build_frame_views
+from screen_detector import GameScreen, ScreenDetector, merge_template_settings
+
+
+CACHE_FILE = ".tune_cache.npz"
+LABELS_FILE = "labels.yaml"
+
+# Safety margin used when there are no negative frames for a template
+DEFAULT_POSITIVE_SLACK = 0.05
+
+
+def load_labels(screenshots_dir: Path, screen_templates: Dict[GameScreen, List[str]]) -> Dict[Path, List[str]]:
+    """
+    Load which templates are visible in each labeled screenshot.
+
+    Labels come from two places:
+      - labels.yaml in the screenshot directory, mapping a file name (relative to the
+        directory) to either a list of visible templates or a GameScreen value
+      - sub-directories named after a GameScreen value (e.g. tp_recovery_items/*.png)
+
+    A frame labeled with an empty list is a negative for every template.
+
+    Args:
+        screenshots_dir: Directory with the labeled screenshots
+        screen_templates: ScreenDetector template mapping, used for GameScreen labels
+
+    Returns:
+        Dict of screenshot path -> list of visible template names
+    """
+    screens_by_value = {screen.value: screen for screen in GameScreen}
+
+    def templates_for(label: Any) -> List[str]:
+        if isinstance(label, str):
+            if label not in screens_by_value:
+                raise ValueError(f"Unknown screen label: {label}")
+            return list(screen_templates.get(screens_by_value[label], []))
+        return list(label or [])
+
+    labels = {}
+
+    for screen_value in screens_by_value:
+        screen_dir = screenshots_dir / screen_value
+        if screen_dir.is_dir():
+            for frame_path in sorted(screen_dir.glob("*.png")):
+                labels[frame_path] = templates_for(screen_value)
+
+    labels_path = screenshots_dir / LABELS_FILE
+    if labels_path.exists():
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            for name, label in (yaml.safe_load(f) or {}).items():
+                labels[screenshots_dir / name] = templates_for(label)
+
+    return labels
+
+
+def _file_key(path: Path, extra: str = "") -> str:
+    """Cache key for a file: changes whenever the file (or extra settings) change."""
+    stat = path.stat()
+    raw = f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{extra}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def compute_score_matrix(
+    matcher: ImageMatcher,
+    template_paths: List[Path],
+    frame_paths: List[Path],
+    cache_path: Optional[Path] = None
+) -> np.ndarray:
+    """
+    Score every template against every frame with every matching method.
+
+    Scores are cached per (frame, template) pair, so re-runs only compute
+    pairs whose files or scoring settings (mask, engine, methods, OpenCL) changed.
+
+    Args:
+        matcher: Matcher holding template settings (masks)
+        template_paths: Templates to score
+        frame_paths: Screenshots to score against
+        cache_path: Optional .npz cache file
+
+    Returns:
+        Array of shape (templates, frames, methods); NaN where a template does not fit
+    """
+    methods = matcher.METHODS
+    cached = {}
+    if cache_path and cache_path.exists():
+        with np.load(cache_path) as data:
+            cached = dict(zip(data['keys'].tolist(), data['scores']))
+
+    # Everything that changes a template's scores: its mask, engine and methods, and the device
+    template_keys = []
+    for path in template_paths:
+        settings = matcher.get_template_settings(str(path))
+        scoring = {
+            'mask': settings.get('mask'),
+            'engine': settings.get('engine', 'template'),
+            'methods': settings.get('methods'),
+            'use_opencl': matcher.use_opencl,
+        }
+        template_keys.append(_file_key(path, json.dumps(scoring, sort_keys=True)))
+    frame_keys = [_file_key(path) for path in frame_paths]
+
+    scores = np.full((len(template_paths), len(frame_paths), len(methods)), np.nan, dtype=np.float32)
+    computed = 0
+
+    for j, frame_path in enumerate(frame_paths):
+        pair_keys = [f"{frame_keys[j]}:{template_key}" for template_key in template_keys]
+        missing = [i for i, key in enumerate(pair_keys) if key not in cached]
+
+        if missing:
+            frame = cv2.imread(str(frame_path), cv2.IMREAD_COLOR)
+            if frame is None:
+                print(f"✗ Could not load screenshot: {frame_path}")
+                continue
+            views = build_frame_views(frame)
+
+            for i in missing:
+                template = matcher.load_template(str(template_paths[i]))
+                row = np.full(len(methods), np.nan, dtype=np.float32)
+                for method, score, _ in matcher.score_views(views, template, methods=methods):
+                    row[methods.index(method)] = score
+                cached[pair_keys[i]] = row
+                computed += 1
+
+        for i, key in enumerate(pair_keys):
+            scores[i, j] = cached[key]
+
+    if cache_path and computed:
+        keys = np.array(list(cached.keys()))
+        values = np.stack(list(cached.values())) if cached else np.empty((0, len(methods)), np.float32)
+        np.savez_compressed(cache_path, keys=keys, scores=values)
+
+    print(f"Score matrix: {len(template_paths)} templates x {len(frame_paths)} frames "
+          f"x {len(methods)} methods ({computed} pairs computed, rest from cache)")
+    return scores
+
+
+def recommend_thresholds(
+    scores: np.ndarray,
+    positives: np.ndarray,
+    methods: Tuple[str, ...]
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Recommend a method and confidence for each template.
+
+    For every method (and for the default "best of all methods") the margin
+    is min(positive scores) - max(negative scores). The candidate with the
+    largest margin wins and the threshold is put in the middle of the gap.
+    Frames the template does not fit in (no scores at all) are left out.
+
+    Args:
+        scores: (templates, frames, methods) score matrix
+        positives: (templates, frames) bool matrix, True where the template is visible
+        methods: Method names matching the last axis of scores
+
+    Returns:
+        Per template: dict with method, confidence and margin statistics (None if no scored positives)
+    """
+    # Candidate score tables: each single method, plus max over all methods (current behaviour)
+    candidates = {method: scores[:, :, k] for k, method in enumerate(methods)}
+    candidates['all'] = np.nanmax(np.nan_to_num(scores, nan=-1.0), axis=2)
+
+    names = list(candidates)
+    table = np.stack([np.nan_to_num(candidates[name], nan=-1.0) for name in names])  # (cand, T, F)
+
+    fits = ~np.isnan(scores).all(axis=2)
+    pos = (positives & fits)[np.newaxis]
+    neg = (~positives & fits)[np.newaxis]
+    with np.errstate(invalid='ignore'):
+        min_pos = np.where(pos, table, np.inf).min(axis=2)
+        max_neg = np.where(neg, table, -np.inf).max(axis=2)
+        mean_pos = np.where(pos, table, 0).sum(axis=2) / np.maximum(pos.sum(axis=2), 1)
+        mean_neg = np.where(neg, table, 0).sum(axis=2) / np.maximum(neg.sum(axis=2), 1)
+    margin = min_pos - max_neg
+
+    recommendations = []
+    for t in range(scores.shape[0]):
+        if not pos[0, t].any():
+            recommendations.append(None)
+            continue
+
+        has_negatives = bool(neg[0, t].any())
+        # Without negatives every margin is infinite: go by the positives alone
+        best = int(np.argmax(margin[:, t] if has_negatives else min_pos[:, t]))
+        if has_negatives:
+            threshold = (min_pos[best, t] + max_neg[best, t]) / 2
+        else:
+            threshold = min_pos[best, t] - DEFAULT_POSITIVE_SLACK
+
+        recommendations.append({
+            'method': names[best],
+            'confidence': round(float(np.clip(threshold, 0.0, 1.0)), 3),
+            'margin': float(margin[best, t]) if has_negatives else None,
+            'min_positive': float(min_pos[best, t]),
+            'max_negative': float(max_neg[best, t]) if has_negatives else None,
+            'mean_positive': float(mean_pos[best, t]),
+            'mean_negative': float(mean_neg[best, t]) if has_negatives else None,
+            'positives': int(pos[0, t].sum()),
+            'negatives': int(neg[0, t].sum()),
+        })
+
+    return recommendations
+
+
+def write_config(config_path: Path, recommendations: Dict[str, Dict[str, Any]], min_margin: float):
+    """
+    Write recommended confidences/methods into config.yaml's template_settings.
+
+    Templates whose margin is below min_margin (or negative) are left untouched.
+    Other per-template settings (masks, requirements) are preserved.
+    """
+    config = {}
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+
+    template_settings = config.setdefault('template_settings', {}) or {}
+    config['template_settings'] = template_settings
+
+    updated = 0
+    for name, rec in recommendations.items():
+        if rec['margin'] is None or rec['margin'] < min_margin:
+            continue
+        settings = template_settings.setdefault(name, {}) or {}
+        template_settings[name] = settings
+        settings['confidence'] = rec['confidence']
+        if rec['method'] == 'all':
+            # Explicit list only needed when the global default is narrower
+            if config.get('matching_methods'):
+                settings['methods'] = list(ImageMatcher.METHODS)
+            else:
+                settings.pop('methods', None)
+        else:
+            settings['methods'] = [rec['method']]
+        updated += 1
+
+    with open(config_path, 'w', encoding='utf-8') as f:
+        yaml.dump(config, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+
+    print(f"✓ Updated {updated} template(s) in {config_path}")
+
+
+def main():
+    """Tune per-template thresholds from a directory of labeled screenshots."""
+    parser = argparse.ArgumentParser(
+        description="Compute per-template confidence thresholds from labeled screenshots"
+    )
+    parser.add_argument("screenshots", help="Directory of labeled screenshots (labels.yaml and/or <screen>/ folders)")
+    parser.add_argument("--config", default="config.yaml", help="Path to configuration file")
+    parser.add_argument("--templates", default="templates", help="Templates directory")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not write the score cache")
+    parser.add_argument("--write", action="store_true", help="Write recommendations into config template_settings")
+    parser.add_argument("--min-margin", type=float, default=0.05,
+                        help="Only write templates whose positive/negative margin is at least this")
+    args = parser.parse_args()
+
+    config_path = Path(args.config)
+    config = {}
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+
+    screenshots_dir = Path(args.screenshots)
+    detector = ScreenDetector(templates_dir=args.templates)
+    matcher = ImageMatcher(
+        config.get('confidence_threshold', 0.8),
+        merge_template_settings(config.get('template_settings'))
+    )
+
+    labels = load_labels(screenshots_dir, detector.screen_templates)
+    if not labels:
+        print(f"✗ No labeled screenshots found in {screenshots_dir}")
+        print(f"  Add {LABELS_FILE} (file name -> templates or screen) or <screen_name>/ folders")
+        sys.exit(1)
+
+    frame_paths = sorted(labels)
+    template_paths = sorted(Path(args.templates).glob("*.png"))
+    template_names = [path.name for path in template_paths]
+
+    print("=" * 70)
+    print("THRESHOLD TUNER")
+    print("=" * 70)
+    print()
+    print(f"Labeled screenshots: {len(frame_paths)}")
+    print(f"Templates:           {len(template_paths)}")
+    print()
+
+    cache_path = None if args.no_cache else screenshots_dir / CACHE_FILE
+    scores = compute_score_matrix(matcher, template_paths, frame_paths, cache_path)
+
+    positives = np.zeros((len(template_paths), len(frame_paths)), dtype=bool)
+    for j, frame_path in enumerate(frame_paths):
+        for name in labels[frame_path]:
+            if name in template_names:
+                positives[template_names.index(name), j] = True
+            else:
+                print(f"⚠️  {frame_path.name}: unknown template label {name}")
+
+    recommendations = recommend_thresholds(scores, positives, matcher.METHODS)
+
+    print()
+    print("=" * 70)
+    print("RECOMMENDATIONS")
+    print("=" * 70)
+    print()
+    print(f"{'template':40s} {'method':9s} {'conf':>5s} {'margin':>7s} {'minPos':>7s} {'maxNeg':>7s}  pos/neg")
+
+    by_name = {}
+    for name, rec in zip(template_names, recommendations):
+        if rec is None:
+            print(f"{name:40s} (no positive labels - skipped)")
+            continue
+        by_name[name] = rec
+        margin = f"{rec['margin']:7.3f}" if rec['margin'] is not None else "    n/a"
+        max_neg = f"{rec['max_negative']:7.3f}" if rec['max_negative'] is not None else "    n/a"
+        warn = "  ⚠️  overlapping" if rec['margin'] is not None and rec['margin'] <= 0 else ""
+        print(f"{name:40s} {rec['method']:9s} {rec['confidence']:5.3f} {margin} "
+              f"{rec['min_positive']:7.3f} {max_neg}  {rec['positives']}/{rec['negatives']}{warn}")
+
+    print()
+    if args.write:
+        write_config(config_path, by_name, args.min_margin)
+    else:
+        print("Run with --write to save these into config.yaml (template_settings)")
+
+
+if __name__ == "__main__":
+    main()
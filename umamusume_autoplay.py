@@ -5,13 +5,20 @@ import time
 import yaml
 import signal
 import sys
+import cv2
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pynput import keyboard
 
 from automation import ButtonClicker
-from screen_detector import ScreenDetector, GameScreen
-from image_utils import save_screenshot
+from screen_detector import ScreenDetector, GameScreen, merge_template_settings
+from frame_source import FrameSource, create_frame_source
+from input_backend import FailSafeError, InputBackend, create_input_backend
+from screen_classifier import ScreenClassifier
+from signature_index import SignatureIndex
+from debug_capture import DebugRecorder
+from run_stats import RunRecorder, RunStatsStore
+from stuck_watchdog import Watchdog
 
 
 # Global flag for graceful shutdown
@@ -45,27 +52,75 @@ def signal_handler(signum, frame):
 class UmamusumeAutoplay:
     """Main automation controller for Umamusume Pretty Derby."""
 
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(
+        self,
+        config_path: str = "config.yaml",
+        frame_source: Optional[FrameSource] = None,
+        input_backend: Optional[InputBackend] = None
+    ):
         """
         Initialize the autoplay automation.
 
         Args:
             config_path: Path to the configuration file
+            frame_source: Capture backend to use instead of capture_backend (e.g. the simulator)
+            input_backend: Click backend to use instead of input_backend (e.g. the simulator)
         """
         self.config = self._load_config(config_path)
 
         confidence = self.config.get("confidence_threshold", 0.8)
         action_delay = self.config.get("action_delay", 1.0)
+        template_settings = self.config.get("template_settings") or {}
+        matching_methods = self.config.get("matching_methods")
+        capture_rois = self.config.get("capture_rois", False)
+        roi_options = {
+            "capture_rois": capture_rois,
+            "roi_padding": self.config.get("roi_padding", 40),
+            "roi_full_scan_interval": self.config.get("roi_full_scan_interval", 30.0),
+            "use_opencl": self.config.get("use_opencl", False),
+        }
+
+        # One capture backend shared by the detector and the clicker
+        self.frame_source = frame_source or create_frame_source(self.config.get("capture_backend", "auto"))
+        self.input_backend = input_backend or create_input_backend(self.config.get("input_backend", "auto"))
+
+        classifier_path = self.config.get("screen_classifier")
+        classifier = ScreenClassifier.load(Path(classifier_path)) if classifier_path else None
+        verify_clicks = self.config.get("verify_clicks", False)
+
+        # Known screens by perceptual hash, shared so the clicker reuses the detector's entries
+        index_path = self.config.get("signature_index")
+        self.signature_index = SignatureIndex(
+            Path(index_path),
+            max_distance=self.config.get("signature_max_distance", 12)
+        ) if index_path else None
 
         self.clicker = ButtonClicker(
             templates_dir="templates",
             confidence=confidence,
-            action_delay=action_delay
+            action_delay=action_delay,
+            template_settings=merge_template_settings(template_settings),
+            frame_source=self.frame_source,
+            methods=matching_methods,
+            input_backend=self.input_backend,
+            verify_clicks=verify_clicks,
+            click_timeout=self.config.get("click_timeout", 3.0),
+            click_retries=self.config.get("click_retries", 1),
+            click_backoff=self.config.get("click_backoff", 2.0),
+            signature_index=self.signature_index,
+            **roi_options
         )
 
         self.detector = ScreenDetector(
             templates_dir="templates",
-            confidence=confidence
+            confidence=confidence,
+            template_settings=template_settings,
+            frame_source=self.frame_source,
+            methods=matching_methods,
+            classifier=classifier,
+            classifier_confidence=self.config.get("classifier_confidence", 0.6),
+            signature_index=self.signature_index,
+            **roi_options
         )
 
         self.max_retries = self.config.get("max_retries", 5)
@@ -74,6 +129,13 @@ class UmamusumeAutoplay:
         self.cooldown_time = self.config.get("cooldown_time", 2.0)
         self.unknown_screen_delay = self.config.get("unknown_screen_delay", 0.5)
         self.debug = self.config.get("debug", False)
+        self.debug_recorder = DebugRecorder(
+            scale=self.config.get("debug_scale", 0.5),
+            image_format=self.config.get("debug_format", "jpg"),
+            quality=self.config.get("debug_quality", 80),
+            ring_seconds=self.config.get("debug_ring_seconds", 30.0),
+            queue_size=self.config.get("debug_queue_size", 16)
+        ) if self.debug else None
         self.search_region = self.config.get("search_region", None)
 
         # TP recovery position offsets (configurable per screen)
@@ -81,11 +143,53 @@ class UmamusumeAutoplay:
         self.tp_recovery_button_x = self.config.get("tp_recovery_button_x", 350)
         self.auto_recover_tp = self.config.get("auto_recover_tp", False)
 
+        # Per-cycle statistics, kept across restarts
+        stats_db = self.config.get("stats_db")
+        self.stats_store = RunStatsStore(Path(stats_db)) if stats_db else None
+
+        # Stuck-screen watchdog (usual time per screen comes from the statistics)
+        self.watchdog = self.config.get("watchdog", False)
+        self.watchdog_margin = self.config.get("watchdog_margin", 2.0)
+        self.watchdog_min_dwell = self.config.get("watchdog_min_dwell", 20.0)
+        self.watchdog_default_dwell = self.config.get("watchdog_default_dwell", 120.0)
+        self.watchdog_interval = self.config.get("watchdog_interval", 15.0)
+        self.watchdog_unknown_grace = self.config.get("watchdog_unknown_grace", 5.0)
+        self.watchdog_safe_click = self.config.get("watchdog_safe_click")
+        # Region detection searches (wider than search_region while the watchdog says stuck);
+        # handlers always click relative to search_region
+        self.detect_region = self.search_region
+        self._stuck_full_scan = False
+
+        # Seconds between looks at the auto-play indicator while it is shown
+        self.auto_play_poll_interval = self.config.get("auto_play_poll_interval", 2.0)
+
+        # Race burst mode: keep pressing fast forward from a tight loop until the race ends
+        self.race_burst = self.config.get("race_burst", False)
+        self.race_burst_interval = self.config.get("race_burst_interval", 0.1)
+        self.race_burst_idle_timeout = self.config.get("race_burst_idle_timeout", 3.0)
+
         print("Umamusume Autoplay initialized")
         print(f"Confidence threshold: {confidence}")
+        if template_settings:
+            print(f"Per-template settings: {', '.join(sorted(template_settings))}")
         print(f"Action delay: {action_delay}s")
+        print(f"Capture backend: {self.frame_source.name}")
+        print(f"Input backend: {self.input_backend.name}" + (" (verifying clicks)" if verify_clicks else ""))
+        if matching_methods:
+            print(f"Matching methods: {', '.join(matching_methods)}")
+        print(f"Region-of-interest capture: {capture_rois}")
+        if classifier:
+            print(f"Screen classifier: {classifier_path} ({len(classifier.labels)} screens)")
+        if self.signature_index:
+            print(f"Signature index: {index_path} ({len(self.signature_index.entries)} known screens)")
+            if capture_rois:
+                print("  Note: the index hashes the whole frame, so capture_rois no longer saves the full grab")
+        if self.detector.matcher.use_opencl:
+            print("Matching on OpenCL")
         print(f"Debug mode: {self.debug}")
         print(f"Auto TP recovery: {self.auto_recover_tp}")
+        if self.race_burst:
+            print(f"Race burst mode: every {self.race_burst_interval}s")
 
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file."""
@@ -100,15 +204,93 @@ class UmamusumeAutoplay:
             return {}
 
     def _debug_screenshot(self, prefix: str):
-        """Save a debug screenshot if debug mode is enabled."""
-        if self.debug:
-            # Create debug directory if it doesn't exist
-            debug_dir = Path("debug_screenshots")
-            debug_dir.mkdir(exist_ok=True)
+        """Keep the frame the current screen was detected on, if debug mode is enabled."""
+        if self.debug_recorder:
+            # Same frame the detector just matched - no extra capture
+            frame = self.detector.matcher.get_frame_views(self.detect_region)['color']
+            self.debug_recorder.record(frame, prefix)
+
+    def _debug_failure(self, reason: str):
+        """Write the buffered debug frames after a failure."""
+        if self.debug_recorder:
+            self.debug_recorder.flush(reason)
+
+    def _create_watchdog(self) -> Optional[Watchdog]:
+        """Build the stuck-screen watchdog with usual times per screen from earlier runs."""
+        if not self.watchdog:
+            return None
+        expected_dwell = self.stats_store.dwell_times() if self.stats_store else {}
+        print(f"Watchdog: usual times for {len(expected_dwell)} screens from statistics, "
+              f"{self.watchdog_default_dwell:.0f}s for the rest")
+        return Watchdog(
+            expected_dwell,
+            default_dwell=self.watchdog_default_dwell,
+            margin=self.watchdog_margin,
+            min_dwell=self.watchdog_min_dwell,
+            escalation_interval=self.watchdog_interval,
+            unknown_grace=self.watchdog_unknown_grace,
+            ignore=[GameScreen.AUTO_PLAY_IN_PROGRESS.value]  # Waits for itself
+        )
+
+    def _escalate(self, step: str, screen: GameScreen) -> bool:
+        """
+        Take one watchdog step for a screen that has been shown far longer than usual.
+
+        Args:
+            step: Step from stuck_watchdog.ESCALATION_STEPS
+            screen: The screen that seems stuck
 
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            filename = debug_dir / f"debug_{prefix}_{timestamp}.png"
-            save_screenshot(str(filename), self.search_region)
+        Returns:
+            True if the screen's handler should run again right away (ignoring the cooldown)
+        """
+        print(f"\n⚠️  Watchdog: [{screen.value}] is overdue - {step.replace('_', ' ')}")
+        if step == "widen_region":
+            if self.detect_region:
+                # The game window may have moved: detect on the whole screen until the screen changes.
+                # Handlers keep clicking relative to search_region.
+                self.detect_region = None
+                self.detector.matcher.forget_rois()
+            else:
+                print("  Already searching the whole screen")
+        elif step == "full_scan":
+            # The signature index, classifier or a learned region may be wrong about this frame
+            self._stuck_full_scan = True
+            self.clicker.matcher.forget_rois()
+        elif step == "recover":
+            if self.watchdog_safe_click:
+                x, y = self.watchdog_safe_click
+                if self.search_region:
+                    x, y = x + self.search_region[0], y + self.search_region[1]
+                print(f"  Clicking safe spot ({x}, {y})")
+                self.clicker.click_at_position(x, y, self.search_region)
+            return True
+        elif step == "snapshot":
+            self._stuck_snapshot(screen)
+        return False
+
+    def _stuck_snapshot(self, screen: GameScreen):
+        """Save what the screen looks like while stuck (the debug ring buffer if there is one)."""
+        label = f"stuck_{screen.value}"
+        if self.debug_recorder:
+            self._debug_screenshot(label)
+            self._debug_failure(label)
+            return
+        path = Path("debug_screenshots") / f"{label}_{time.strftime('%Y%m%d_%H%M%S')}.png"
+        path.parent.mkdir(exist_ok=True)
+        # The frame the stuck screen was just detected on
+        cv2.imwrite(str(path), self.detector.matcher.get_frame_views(self.detect_region)['color'])
+        print(f"  Saved {path}")
+
+    def _unstuck(self, episode: Dict[str, Any], recorder: Optional[RunRecorder]):
+        """Undo the watchdog's temporary changes once a different screen shows up."""
+        print(f"✓ Watchdog: left [{episode['screen']}] after {episode['seconds']:.0f}s "
+              f"({episode['lost']:.0f}s lost; steps: {', '.join(episode['steps'])})")
+        if self.detect_region != self.search_region:
+            self.detect_region = self.search_region
+            self.detector.matcher.forget_rois()
+        self._stuck_full_scan = False
+        if recorder:
+            recorder.stuck(episode)
 
     def handle_home_screen(self) -> bool:
         """
@@ -264,7 +446,7 @@ class UmamusumeAutoplay:
         print(f"Clicking 使う button for second item at ({click_x}, {click_y})")
         print(f"  Using offsets: X={self.tp_recovery_button_x}, Y={self.tp_recovery_row_y}")
         print(f"  (Adjust these in config.yaml if button position is wrong)")
-        self.clicker.click_at_position(click_x, click_y)
+        self.clicker.click_at_position(click_x, click_y, self.search_region)
         return True
 
     def handle_item_quantity(self) -> bool:
@@ -327,6 +509,19 @@ class UmamusumeAutoplay:
         print("Handling fast forward...")
         self._debug_screenshot("fast_forward")
 
+        if self.race_burst:
+            # Track just the >> button until the race result's buttons show up
+            presses, _ = self.clicker.burst_click(
+                "fast_forward.png",
+                ["tojiru_button.png", "mouichido_button.png"],
+                region=self.search_region,
+                interval=self.race_burst_interval,
+                idle_timeout=self.race_burst_idle_timeout,
+                should_stop=lambda: _should_stop
+            )
+            if presses:
+                return True
+
         return self.clicker.click_button_with_retry(
             "fast_forward.png",
             max_retries=2,  # Don't retry too much for this
@@ -499,53 +694,75 @@ class UmamusumeAutoplay:
             (GameScreen.EVENT_SKIP_SETTINGS, self.handle_event_skip_settings, False),
         ]
 
-        for screen_type, handler, optional in sequence:
-            print(f"\nWaiting for screen: {screen_type.value}")
+        index = 0
+        while index < len(sequence):
+            # Every screen up to (and including) the next required one could come next
+            reachable = []
+            for screen_type, _, optional in sequence[index:]:
+                reachable.append(screen_type)
+                if not optional:
+                    break
+            print(f"\nWaiting for screen: {' / '.join(screen.value for screen in reachable)}")
 
-            # Wait for the screen to appear
-            if self.detector.wait_for_screen(
-                screen_type,
+            # Wait for whichever appears first (sequence order wins if several are visible)
+            detected = self.detector.wait_for_any_screen(
+                reachable,
                 timeout=30,
                 check_interval=0.5,
                 region=self.search_region
-            ):
-                print(f"Screen detected: {screen_type.value}")
-
-                # Handle the screen
-                if not handler():
-                    if not optional:
-                        print(f"Failed to handle required screen: {screen_type.value}")
-                        return False
-                    else:
-                        print(f"Failed to handle optional screen: {screen_type.value}")
+            )
 
-                print(f"Successfully handled: {screen_type.value}")
-            else:
-                if optional:
-                    print(f"Screen {screen_type.value} did not appear (optional)")
+            if detected is None:
+                last_type, _, last_optional = sequence[index + len(reachable) - 1]
+                if last_optional:
+                    print(f"Screens {', '.join(screen.value for screen in reachable)} did not appear (optional)")
+                else:
+                    print(f"Required screen {last_type.value} did not appear - continuing anyway")
+                index += len(reachable)
+                continue
+
+            position = index + reachable.index(detected)
+            screen_type, handler, optional = sequence[position]
+            for skipped, _, _ in sequence[index:position]:
+                print(f"Skipping optional {skipped.value}: {screen_type.value} appeared")
+            print(f"Screen detected: {screen_type.value}")
+
+            # Handle the screen
+            if not handler():
+                if not optional:
+                    print(f"Failed to handle required screen: {screen_type.value}")
+                    self._debug_failure(screen_type.value)
+                    return False
                 else:
-                    print(f"Required screen {screen_type.value} did not appear - continuing anyway")
+                    print(f"Failed to handle optional screen: {screen_type.value}")
+
+            print(f"Successfully handled: {screen_type.value}")
+            index = position + 1
 
         print("\n" + "=" * 50)
         print("Automation sequence completed!")
         print("=" * 50 + "\n")
         return True
 
-    def run_continuous(self):
+    def run_continuous(self, hotkeys: bool = True):
         """
         Run the automation continuously.
         This will keep detecting and handling screens in a loop.
+
+        Args:
+            hotkeys: Install the global Esc stop hotkey (the simulator runs without one)
         """
         global _should_stop, _hotkey_listener
 
         # Set up signal handler for graceful shutdown
         signal.signal(signal.SIGINT, signal_handler)
 
-        # Set up global hotkey listener (works even when game window is focused)
-        _hotkey_listener = keyboard.GlobalHotKeys({
-            '<esc>': on_stop_hotkey
-        })
-        _hotkey_listener.start()
+        if hotkeys:
+            # Set up global hotkey listener (works even when game window is focused)
+            _hotkey_listener = keyboard.GlobalHotKeys({
+                '<esc>': on_stop_hotkey
+            })
+            _hotkey_listener.start()
 
         print("\n" + "=" * 50)
         print("Starting Continuous Automation Mode")
@@ -562,6 +779,9 @@ class UmamusumeAutoplay:
         print("  - Press ESC twice to force quit immediately")
         print("  - Or press Ctrl+C in terminal\n")
 
+        recorder = RunRecorder(self.stats_store) if self.stats_store else None
+        watchdog = self._create_watchdog()
+
         try:
             last_action = None
             last_action_time = 0
@@ -573,7 +793,16 @@ class UmamusumeAutoplay:
                     print("\n✓ Stopping automation gracefully...")
                     break
 
-                current_screen = self.detector.detect_current_screen(self.search_region)
+                current_screen = self.detector.detect_current_screen(self.detect_region, self._stuck_full_scan)
+                if recorder:
+                    recorder.observe(current_screen.value)
+                if watchdog:
+                    was_stuck = watchdog.stuck
+                    step = watchdog.observe(current_screen.value)
+                    if was_stuck and not watchdog.stuck:
+                        self._unstuck(watchdog.last_episode(), recorder)
+                    if step and self._escalate(step, current_screen):
+                        last_action = None
 
                 # Prevent spam-clicking the same screen
                 current_time = time.time()
@@ -593,96 +822,148 @@ class UmamusumeAutoplay:
                     continue
 
                 action_taken = False
+                handled = True
+                retries_before = self.clicker.retries
                 print(f"\n[{current_screen.value}] detected")
 
                 if current_screen == GameScreen.AUTO_PLAY_IN_PROGRESS:
-                    # Auto-play is active - wait until it finishes
+                    # Auto-play is active - watch only its indicator until it finishes
                     print("⏸️  Auto-play in progress - waiting...")
-                    time.sleep(1.0)  # Wait 1 second before checking again
-                    action_taken = True  # Mark as action taken to avoid unknown screen delay
+                    waited = self.detector.wait_until_gone(
+                        GameScreen.AUTO_PLAY_IN_PROGRESS,
+                        self.search_region,
+                        poll_interval=self.auto_play_poll_interval,
+                        should_stop=lambda: _should_stop
+                    )
+                    print(f"▶️  Auto-play indicator gone after {waited:.0f}s")
+                    # No action to wait for - detect the next screen right away
                 elif current_screen == GameScreen.POST_TRAINING_NEXT:
                     # Post-training flow - 次へ button
-                    self.handle_post_training_next()
+                    handled = self.handle_post_training_next()
                     action_taken = True
                 elif current_screen == GameScreen.FACTOR_CONFIRM:
                     # Factor/inheritance confirmation
-                    self.handle_factor_confirm()
+                    handled = self.handle_factor_confirm()
                     action_taken = True
                 elif current_screen == GameScreen.POST_TRAINING_COMPLETE:
                     # Post-training complete - 完了する button
-                    self.handle_post_training_complete()
+                    handled = self.handle_post_training_complete()
                     action_taken = True
                 elif current_screen == GameScreen.TRAINING_COMPLETE:
                     # Training complete - 育成完了 button
-                    self.handle_training_complete()
+                    handled = self.handle_training_complete()
                     action_taken = True
                 elif current_screen == GameScreen.RACE_RETRY:
                     # Race retry - もう一度 button (takes priority over 閉じる)
-                    self.handle_race_retry()
+                    handled = self.handle_race_retry()
                     action_taken = True
                 elif current_screen == GameScreen.RACE_COMPLETION:
                     # Race completion - 閉じる button
-                    self.handle_race_completion()
+                    handled = self.handle_race_completion()
                     action_taken = True
                 elif current_screen == GameScreen.FAST_FORWARD_BUTTON:
-                    self.handle_fast_forward()
+                    handled = self.handle_fast_forward()
                     action_taken = True
                 elif current_screen == GameScreen.EVENT_BANNER:
-                    self.handle_event_banner()
+                    handled = self.handle_event_banner()
                     action_taken = True
                 elif current_screen == GameScreen.HOME_SCREEN:
-                    self.handle_home_screen()
+                    handled = self.handle_home_screen()
                     action_taken = True
                 elif current_screen == GameScreen.SUPPORT_CARD_SELECTION:
-                    self.handle_support_card_selection()
+                    handled = self.handle_support_card_selection()
                     action_taken = True
                 elif current_screen == GameScreen.TRAINING_PREP:
-                    self.handle_training_prep()
+                    handled = self.handle_training_prep()
                     action_taken = True
                 elif current_screen == GameScreen.MY_RULER_CONFIRM:
-                    self.handle_my_ruler_confirm()
+                    handled = self.handle_my_ruler_confirm()
                     action_taken = True
                 elif current_screen == GameScreen.TP_RECOVERY_CONFIRM:
-                    self.handle_tp_recovery_confirm()  # Will click cancel if auto_recover_tp is False
+                    handled = self.handle_tp_recovery_confirm()  # Will click cancel if auto_recover_tp is False
                     action_taken = True
                 elif current_screen == GameScreen.TP_RECOVERY_ITEMS:
                     if self.auto_recover_tp:
-                        self.handle_tp_recovery_items()
+                        handled = self.handle_tp_recovery_items()
                         action_taken = True
                     else:
                         print("⚠️  Skipping TP recovery items (auto_recover_tp is False)")
                         time.sleep(0.5)
                 elif current_screen == GameScreen.ITEM_QUANTITY:
                     if self.auto_recover_tp:
-                        self.handle_item_quantity()
+                        handled = self.handle_item_quantity()
                         action_taken = True
                     else:
                         print("⚠️  Skipping item quantity (auto_recover_tp is False)")
                         time.sleep(0.5)
                 elif current_screen == GameScreen.EVENT_SKIP_SETTINGS:
-                    self.handle_event_skip_settings()
+                    handled = self.handle_event_skip_settings()
                     action_taken = True
                 elif current_screen == GameScreen.OMAKASE_MENU:
-                    self.handle_omakase_menu()
+                    handled = self.handle_omakase_menu()
                     action_taken = True
                 else:
                     # Unknown screen, wait a bit
                     time.sleep(1)
 
+                if not handled:
+                    self._debug_failure(current_screen.value)
+                if recorder and action_taken:
+                    recorder.handled(current_screen.value, handled, self.clicker.retries - retries_before)
+
                 if action_taken:
                     last_action = current_screen
                     last_action_time = current_time
-                    print(f"Action completed, waiting for next screen...")
-                    time.sleep(self.screen_change_delay)
+                    if not self.clicker.verify_clicks:
+                        # Verified clicks already waited for the screen to react
+                        print(f"Action completed, waiting for next screen...")
+                        time.sleep(self.screen_change_delay)
 
         except KeyboardInterrupt:
             print("\n\nAutomation stopped by user")
+        except FailSafeError as e:
+            print(f"\n\n{e}")
         finally:
             # Clean up hotkey listener
             if _hotkey_listener:
                 _hotkey_listener.stop()
+            self._print_reaction_times()
+            if watchdog:
+                episode = watchdog.close()
+                if episode and recorder:
+                    recorder.stuck(episode)
+                self._print_stuck_time(watchdog)
+            if recorder:
+                recorder.close()
+            if self.stats_store:
+                self.stats_store.close()
+            if self.signature_index:
+                self.signature_index.save()
+            if self.debug_recorder:
+                self.debug_recorder.close()
             print("✓ Automation stopped")
 
+    def _print_stuck_time(self, watchdog: Watchdog):
+        """Print the time lost to stuck screens this run."""
+        summary = watchdog.summary()
+        if not summary:
+            return
+        print("\nTime lost to stuck screens:")
+        for screen, stats in sorted(summary.items(), key=lambda item: -item[1]['lost']):
+            print(f"  {screen:35s} {stats['episodes']:4d} times  {stats['lost']:7.0f}s lost")
+        print(f"  {'total':35s}             {sum(stats['lost'] for stats in summary.values()):7.0f}s lost")
+
+    def _print_reaction_times(self):
+        """Print how long the game took to react to each clicked button."""
+        summary = self.clicker.reaction_summary()
+        if not summary:
+            return
+        print("\nClick reaction times:")
+        for label, stats in summary.items():
+            missed = f", {stats['missed']} unanswered" if stats['missed'] else ""
+            print(f"  {label:35s} {stats['count']:4d} clicks  median {stats['median']:.2f}s  "
+                  f"max {stats['max']:.2f}s{missed}")
+
 
 def main():
     """Main entry point."""